@@ -42,7 +42,7 @@ class BufferView(wx.Frame):
             buffer = None
             if pipe is not None:
                 try:
-                    buffer = pipe.buffer + pipe.queue
+                    buffer = bytes(pipe.buffer) + pipe.queue
                 except AttributeError:
                     buffer = None
             if buffer is None:
@@ -0,0 +1,189 @@
+import time
+
+from CH341DriverBase import *
+from K40Controller import STATUS_OK, STATUS_BUSY, STATUS_FINISH, STATUS_PACKET_REJECTED
+from LaserSpeed import LaserSpeed
+from PacketFraming import onewire_crc
+
+"""
+Simulated CH341 with a Lhystudios board behind it. This provides the same interface as the CH341Driver of
+CH341LibusbDriver and CH341WindllDriver, so the K40Controller flow control can be exercised without hardware.
+
+The board accepts framed packets into a FIFO, rejecting any with a bad CRC, and executes the LHYMICRO-GL commands
+in the FIFO in simulated time. The moves are timed at the speed of the speedcode in effect, or at rapid speed outside
+of compact mode. The board is busy while the FIFO has no room for another packet and reports finished once it has
+emptied.
+"""
+
+MILS_PER_MM = 39.3701
+RAPID_SPEED = 100.0  # mm/s, speed of default mode moves.
+CHIP_VERSION = 48
+
+DISTANCE_LETTERS = b'abcdefghijklmnopqrstuvwxy'
+DIGITS = b'0123456789'
+
+
+class CH341Driver:
+    """
+    Simulated CH341 driver.
+
+    :param board: board the speedcodes are made for.
+    :param fifo_packets: number of packets the board can hold.
+    :param time_scale: simulated seconds per real second, values above 1 run the board faster than real time.
+    :param latency: real seconds each USB transfer takes.
+    """
+
+    def __init__(self, index=-1, bus=-1, address=-1, serial=-1, chipv=-1, state_listener=None,
+                 board='M2', fifo_packets=8, time_scale=1.0, latency=0.001):
+        if state_listener is None:
+            self.state_listener = lambda code: None  # Code, Name, Message
+        else:
+            self.state_listener = state_listener
+        self.index = index
+        self.bus = bus
+        self.address = address
+        self.serial = serial
+        self.chipv = chipv
+        self.driver_value = None
+        self.state = None
+
+        self.board = board
+        self.capacity = fifo_packets * 30
+        self.time_scale = time_scale
+        self.latency = latency
+
+        self.fifo = bytearray()
+        self.received = bytearray()  # Every payload byte the board accepted.
+        self.packets_accepted = 0
+        self.packets_rejected = 0
+        self.rejected = False
+        self.finish_pending = False
+        self.compact = False
+        self.speed = RAPID_SPEED
+        self.clock = None
+        self.ready = 0.0  # Simulated time at which the current command is done.
+
+    def set_status(self, code):
+        self.state_listener(code)
+        self.state = code
+
+    def open(self):
+        if self.driver_value is None:
+            self.set_status(STATE_DRIVER_MOCK)
+            self.set_status(STATE_CONNECTING)
+            if self.chipv != -1 and self.chipv != CHIP_VERSION:
+                self.set_status(STATE_DEVICE_REJECTED)
+                raise ConnectionRefusedError
+            self.driver_value = 0
+            self.clock = time.time()
+            self.set_status(STATE_USB_CONNECTED)
+            self.set_status(STATE_CONNECTED)
+
+    def close(self):
+        self.driver_value = None
+        self.set_status(STATE_USB_DISCONNECTED)
+
+    def transfer(self):
+        if self.driver_value is None:
+            raise ConnectionError
+        if self.latency:
+            time.sleep(self.latency)
+        self.run()
+
+    def write(self, packet):
+        """
+        Writes a 32 byte packet, \x00 + 30 bytes + CRC. Packets with a bad CRC or sent while the board is busy are
+        rejected.
+        """
+        self.transfer()
+        payload = bytes(packet[1:31])
+        if len(packet) != 32 or packet[0] != 0 or onewire_crc(payload) != packet[31] \
+                or len(self.fifo) + 30 > self.capacity:
+            self.rejected = True
+            self.packets_rejected += 1
+            return
+        if len(self.fifo) == 0:
+            self.ready = max(self.ready, self.now())
+        self.fifo += payload
+        self.received += payload
+        self.packets_accepted += 1
+        self.finish_pending = False
+
+    def get_status(self):
+        self.transfer()
+        if self.rejected:
+            self.rejected = False
+            status = STATUS_PACKET_REJECTED
+        elif len(self.fifo) + 30 > self.capacity:
+            status = STATUS_BUSY
+        elif self.finish_pending:
+            self.finish_pending = False
+            status = STATUS_FINISH
+        else:
+            status = STATUS_OK
+        return [255, status, 0, 0, 0, 1]
+
+    def get_chip_version(self):
+        self.transfer()
+        return CHIP_VERSION
+
+    def now(self):
+        return (time.time() - self.clock) * self.time_scale
+
+    def run(self):
+        """Executes the commands in the FIFO which are done by the current simulated time."""
+        now = self.now()
+        while len(self.fifo) and self.ready <= now:
+            length, duration = self.parse(self.fifo)
+            if length == 0:
+                break  # The command continues in a packet not yet sent.
+            del self.fifo[:length]
+            self.ready += duration
+            if len(self.fifo) == 0:
+                self.finish_pending = True
+
+    def parse(self, data):
+        """
+        Parses the command at the start of the data.
+
+        :return: length of the command, seconds it takes. Length 0 if the command is incomplete.
+        """
+        c = data[0]
+        if c in b'zZ':
+            return 1, self.move_time(255)
+        if c == ord('|'):
+            if len(data) < 2:
+                return 0, 0.0
+            return 2, self.move_time(26 + DISTANCE_LETTERS.index(data[1]))
+        if c in DISTANCE_LETTERS:
+            return 1, self.move_time(1 + DISTANCE_LETTERS.index(c))
+        if c in DIGITS:
+            if len(data) < 3:
+                return 0, 0.0
+            return 3, self.move_time(int(data[:3]))
+        if c == ord('S'):
+            if len(data) < 3:
+                return 0, 0.0
+            if data[2] == ord('E'):
+                self.compact = True
+            return 3, 0.0
+        if c == ord('C') and len(data) < 2:
+            return 0, 0.0  # A speedcode may start here, its 'V' is in the next packet.
+        if c == ord('V') or (c == ord('C') and data[1] == ord('V')):
+            end = data.find(b'N')
+            if end == -1:
+                return 0, 0.0
+            try:
+                self.speed = LaserSpeed.get_speed_from_code(data[:end].decode(), self.board)
+            except (ValueError, IndexError):
+                self.speed = RAPID_SPEED
+            return end, 0.0
+        if c in b'@F':
+            self.compact = False
+        return 1, 0.0
+
+    def move_time(self, distance):
+        speed = self.speed if self.compact else RAPID_SPEED
+        if speed <= 0:
+            speed = RAPID_SPEED
+        return distance / (speed * MILS_PER_MM)
@@ -2,6 +2,7 @@ import threading
 
 import wx
 
+from Kernel import JOB_SKIP_IF_RUNNING
 from ZMatrix import ZMatrix
 from icons import *
 from svgelements import SVGImage, Matrix, Point
@@ -337,7 +338,7 @@ class CameraInterface(wx.Frame):
         except ZeroDivisionError:
             tick = 5
         if self.kernel is not None:
-            self.job = self.kernel.cron.add_job(self.fetch_image, interval=tick)
+            self.job = self.kernel.cron.add_job(self.fetch_image, interval=tick, execution=JOB_SKIP_IF_RUNNING)
 
     def reset_perspective(self, event):
         self.perspective = None
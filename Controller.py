@@ -83,7 +83,7 @@ class Controller(wx.Frame):
             result = dlg.ShowModal()
             dlg.Destroy()
         else:
-            self.device.listen("pipe;status", self.update_status)
+            self.device.listen("pipe;status", self.update_status, rate=10)
             self.device.listen("pipe;packet", self.update_packet)
             self.device.listen("pipe;packet_text", self.update_packet_text)
             self.device.listen("pipe;buffer", self.on_buffer_update)
@@ -321,8 +321,8 @@ class Controller(wx.Frame):
             elif state == THREAD_STATE_STARTED:
                 self.device.pipe.pause()
             elif state == THREAD_STATE_ABORT:
-                self.device.pipe.buffer = b''
-                self.device.pipe.queue = b''
+                self.device.pipe.buffer.clear()
+                self.device.pipe.queue = bytearray()
                 self.device.pipe.reset()
 
     def on_button_emergency_stop(self, event):  # wxGlade: Controller.<event_handler>
@@ -8,9 +8,11 @@ from K40Controller import K40Controller
 from Kernel import Spooler, Module, Backend, Device
 from LaserCommandConstants import *
 from LhymicroInterpreter import LhymicroInterpreter, STATE_COMPACT
+from Profiler import Profiler
 from svgelements import *
 
 MILS_PER_MM = 39.3701
+BUFFER_LOW_WATERMARK = 0.5  # Fraction of buffer_max the pipe drains to before a held spooler resumes.
 
 
 class K40StockDevice(Device):
@@ -31,6 +33,7 @@ class K40StockDevice(Device):
         self.setting(int, 'usb_version', -1)
 
         self.setting(bool, 'mock', False)
+        self.setting(bool, 'simulate', False)
         self.setting(bool, 'quit', False)
         self.setting(int, 'packet_count', 0)
         self.setting(int, 'rejected_count', 0)
@@ -54,6 +57,12 @@ class K40StockDevice(Device):
 
         self.add_control("Emergency Stop", self.emergency_stop)
         self.add_control("Debug Device", self._start_debugging)
+        self.profiler = Profiler(self)
+        self.add_control("Profile Start", self.profiler.start)
+        self.add_control("Profile Stop", self.profiler.stop)
+        self.add_control("Profile Reset", self.profiler.reset)
+        self.add_control("Profile Dump", self.profiler.dump)
+        self.add_control("Spooler Telemetry", lambda: self.spooler.dump_telemetry())
 
         kernel.add_device(name, self)
         self.open()
@@ -66,6 +75,8 @@ class K40StockDevice(Device):
         self.interpreter = LhymicroInterpreter(self)
         self.spooler = Spooler(self)
         self.hold_condition = lambda v: self.buffer_limit and len(self.pipe) > self.buffer_max
+        self.resume_condition = lambda v: not self.buffer_limit or \
+                                          len(self.pipe) <= self.buffer_max * BUFFER_LOW_WATERMARK
 
     def close(self):
         self.spooler.clear_queue()
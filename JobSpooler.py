@@ -67,6 +67,7 @@ class JobSpooler(wx.Frame):
         self.device.setting(bool, "buffer_limit", True)
         self.device.listen('spooler;thread', self.on_spooler_state)
         self.device.listen("spooler;queue", self.on_spooler_update)
+        self.device.listen("spooler;job", self.on_spooler_update)
         self.device.listen("pipe;buffer", self.on_buffer_update)
 
         self.set_spooler_button_by_state()
@@ -78,6 +79,7 @@ class JobSpooler(wx.Frame):
         if self.device is not None:
             self.device.unlisten('spooler;thread', self.on_spooler_state)
             self.device.unlisten("spooler;queue", self.on_spooler_update)
+            self.device.unlisten("spooler;job", self.on_spooler_update)
             self.device.unlisten("pipe;buffer", self.on_buffer_update)
         self.kernel.mark_window_closed("JobSpooler")
         self.kernel = None
@@ -167,6 +169,17 @@ class JobSpooler(wx.Frame):
                     self.list_job_spool.SetItem(m, 7, _("n/a"))
                     self.list_job_spool.SetItem(m, 8, _("unknown"))  # time estimate
                 i += 1
+        i = self.list_job_spool.GetItemCount()
+        for telemetry in reversed(self.device.spooler.history):
+            m = self.list_job_spool.InsertItem(i, "")
+            if m != -1:
+                self.list_job_spool.SetItem(m, 1, telemetry.name)
+                self.list_job_spool.SetItem(m, 2, _("Done"))
+                self.list_job_spool.SetItem(m, 3, self.device.board)
+                self.list_job_spool.SetItem(m, 6, _("%d commands, %d bytes, held %.1fs") %
+                                            (telemetry.commands, telemetry.bytes, telemetry.hold_time))
+                self.list_job_spool.SetItem(m, 8, _("%.1fs") % telemetry.total_time)
+            i += 1
 
     def on_list_drag(self, event):  # wxGlade: JobSpooler.<event_handler>
         event.Skip()
@@ -2,6 +2,7 @@ import threading
 
 from CH341DriverBase import *
 from Kernel import *
+from PacketFraming import PacketFramer
 
 STATUS_BAD_STATE = 204
 # 0xCC, 11001100
@@ -18,6 +19,10 @@ STATUS_POWER = 239
 
 # 0xEF, 11101111
 
+POLL_INTERVAL_MIN = 0.005  # Shortest wait between status polls while the board is busy.
+POLL_INTERVAL_MAX = 0.05  # Longest wait between status polls while the board is busy.
+STATISTICS_INTERVAL = 1.0  # Seconds between 'pipe;statistics' signals.
+
 # 255, 206, 111, 148, 19, 255
 # 255, 206, 111, 12, 18, 0
 
@@ -54,27 +59,58 @@ def get_code_string_from_code(code):
         return "UNK %02x" % code
 
 
-crc_table = [
-    0x00, 0x5E, 0xBC, 0xE2, 0x61, 0x3F, 0xDD, 0x83,
-    0xC2, 0x9C, 0x7E, 0x20, 0xA3, 0xFD, 0x1F, 0x41,
-    0x00, 0x9D, 0x23, 0xBE, 0x46, 0xDB, 0x65, 0xF8,
-    0x8C, 0x11, 0xAF, 0x32, 0xCA, 0x57, 0xE9, 0x74]
-
-
-def onewire_crc_lookup(line):
+class PacketBuffer:
     """
-    License: 2-clause "simplified" BSD license
-    Copyright (C) 1992-2017 Arjen Lentz
-    https://lentz.com.au/blog/calculating-crc-with-a-tiny-32-entry-lookup-table
+    Buffer of the commands waiting to be sent as packets.
 
-    :param line: line to be CRC'd
-    :return: 8 bit crc of line.
+    Data is appended at the end and consumed from the front by advancing a read cursor, so sending a packet does not
+    copy the pending data. The consumed space is reclaimed once it is at least half the buffer, and preempt commands
+    are written into it ahead of the cursor when they fit.
     """
-    crc = 0
-    for i in range(0, 30):
-        crc = line[i] ^ crc
-        crc = crc_table[crc & 0x0f] ^ crc_table[16 + ((crc >> 4) & 0x0f)]
-    return crc
+
+    def __init__(self):
+        self.data = bytearray()
+        self.start = 0
+
+    def __len__(self):
+        return len(self.data) - self.start
+
+    def __bytes__(self):
+        return bytes(self.data[self.start:])
+
+    def append(self, data):
+        self.data += data
+
+    def prepend(self, data):
+        length = len(data)
+        if length <= self.start:
+            self.start -= length
+            self.data[self.start:self.start + length] = data
+        else:
+            self.data[:self.start] = data
+            self.start = 0
+
+    def find(self, sub, end):
+        """Position of sub within the first end bytes, or -1."""
+        index = self.data.find(sub, self.start, self.start + end)
+        if index == -1:
+            return -1
+        return index - self.start
+
+    def peek(self, length):
+        return bytes(self.data[self.start:self.start + length])
+
+    def consume(self, length):
+        self.start += length
+        if self.start >= len(self.data):
+            self.clear()
+        elif self.start >= len(self.data) >> 1:
+            del self.data[:self.start]
+            self.start = 0
+
+    def clear(self):
+        self.data = bytearray()
+        self.start = 0
 
 
 class ControllerQueueThread(threading.Thread):
@@ -101,12 +137,13 @@ class ControllerQueueThread(threading.Thread):
 
         self.set_state(THREAD_STATE_STARTED)
         while self.controller.state == THREAD_STATE_UNSTARTED:
-            time.sleep(0.1)  # Already started. Unstarted is the desired state. Wait.
+            self.controller.wait(0.1)  # Already started. Unstarted is the desired state. Wait.
 
         refuse_counts = 0
         connection_errors = 0
         count = 0
         while self.controller.state != THREAD_STATE_ABORT:
+            self.controller.wakeup.clear()  # Anything after this point wakes the wait below.
             try:
                 queue_processed = self.controller.process_queue()
                 refuse_counts = 0
@@ -131,12 +168,13 @@ class ControllerQueueThread(threading.Thread):
                         self.controller.state = THREAD_STATE_FINISHED
                 if count > 100:
                     count = 100
-                time.sleep(0.01 * count)  # will tick up to 1 second waits if process queue never works.
+                # will tick up to 1 second waits if process queue never works, writes and state changes wake it.
+                self.controller.wait(0.01 * count)
                 count += 2
                 if self.controller.state == THREAD_STATE_PAUSED:
                     self.set_state(THREAD_STATE_PAUSED)
                     while self.controller.state == THREAD_STATE_PAUSED:
-                        time.sleep(1)
+                        self.controller.wait(1)
                         if self.controller.state == THREAD_STATE_ABORT:
                             self.set_state(THREAD_STATE_ABORT)
                             return
@@ -158,17 +196,26 @@ class K40Controller(Pipe):
         self.driver = None
         self.state = THREAD_STATE_UNSTARTED
 
-        self.buffer = b''  # Threadsafe buffered commands to be sent to controller.
-        self.queue = b''  # Thread-unsafe additional commands to append.
+        self.buffer = PacketBuffer()  # Threadsafe buffered commands to be sent to controller.
+        self.queue = bytearray()  # Thread-unsafe additional commands to append.
         self.preempt = b''  # Thread-unsafe preempt commands to prepend to the buffer.
         self.queue_lock = threading.Lock()
         self.preempt_lock = threading.Lock()
+        self.wakeup = threading.Event()  # Set when there is new data or a state change for the thread.
+        self.framer = PacketFramer()
         self.device.setting(int, 'packet_count',0)
         self.device.setting(int, 'rejected_count', 0)
 
         self.status = [0] * 6
         self.usb_state = -1
 
+        self.accepting = False  # The last post-send status was OK, the next packet needs no pre-send check.
+        self.poll_interval = POLL_INTERVAL_MAX
+        self.busy_average = None  # Running average of the observed busy durations.
+        self.busy_time = 0.0  # Total seconds spent waiting for the board to accept packets.
+        self.statistics_time = time.time()
+        self.statistics_packets = 0
+
         self.driver = None
         self.thread = None
         self.reset()
@@ -226,6 +273,7 @@ class K40Controller(Pipe):
             raise ConnectionRefusedError
 
     def close(self):
+        self.accepting = False
         if self.driver is not None:
             self.driver.close()
 
@@ -233,6 +281,7 @@ class K40Controller(Pipe):
         self.queue_lock.acquire(True)
         self.queue += bytes_to_write
         self.queue_lock.release()
+        self.wakeup.set()
         self.start()
         return self
 
@@ -247,6 +296,7 @@ class K40Controller(Pipe):
         self.preempt_lock.acquire(True)
         self.preempt = bytes_to_write + self.preempt
         self.preempt_lock.release()
+        self.wakeup.set()
         self.start()
         if self.state == THREAD_STATE_PAUSED:
             self.state = THREAD_STATE_STARTED
@@ -269,6 +319,14 @@ class K40Controller(Pipe):
         serial = self.device.usb_serial
         chipv = self.device.usb_version
 
+        if self.device.simulate:
+            from CH341SimulatorDriver import CH341Driver
+            self.driver = driver = CH341Driver(index=index, bus=bus, address=address, serial=serial, chipv=chipv,
+                                               state_listener=self.state_listener, board=self.device.board)
+            driver.open()
+            self.state_listener(INFO_USB_CHIP_VERSION | driver.get_chip_version())
+            self.state_listener(STATE_CONNECTED)
+            return
         try:
             from CH341LibusbDriver import CH341Driver
             self.driver = driver = CH341Driver(index=index, bus=bus, address=address, serial=serial, chipv=chipv,
@@ -304,7 +362,13 @@ class K40Controller(Pipe):
     def state(self):
         return self.thread.state
 
+    def wait(self, timeout):
+        """Waits for the timeout or until the thread is woken by new data or a state change."""
+        self.wakeup.wait(timeout)
+        self.wakeup.clear()
+
     def start(self):
+        self.wakeup.set()
         if self.state == THREAD_STATE_ABORT:
             # We cannot reset an aborted thread without specifically calling reset.
             return
@@ -316,19 +380,25 @@ class K40Controller(Pipe):
 
     def resume(self):
         self.state = THREAD_STATE_STARTED
+        self.accepting = False
+        self.wakeup.set()
         if self.thread.state == THREAD_STATE_UNSTARTED:
             self.thread.start()
 
     def pause(self):
         self.state = THREAD_STATE_PAUSED
+        self.wakeup.set()
         if self.thread.state == THREAD_STATE_UNSTARTED:
             self.thread.start()
 
     def abort(self):
         self.state = THREAD_STATE_ABORT
-        self.buffer = b''
-        self.queue = b''
+        self.accepting = False
+        self.buffer.clear()
+        self.queue = bytearray()
+        self.wakeup.set()
         self.device.signal('pipe;buffer', 0)
+        self.device.release_hold()
 
     def reset(self):
         self.thread = ControllerQueueThread(self)
@@ -355,31 +425,32 @@ class K40Controller(Pipe):
         """
         if len(self.queue):  # check for and append queue
             self.queue_lock.acquire(True)
-            self.buffer += self.queue
-            self.queue = b''
+            queue = self.queue
+            self.queue = bytearray()
             self.queue_lock.release()
-            self.device.signal('pipe;buffer', len(self.buffer))
+            self.buffer.append(queue)
+            self.device.lazy_signal('pipe;buffer', lambda length=len(self.buffer): length)
 
         if len(self.preempt):  # check for and prepend preempt
             self.preempt_lock.acquire(True)
-            self.buffer = self.preempt + self.buffer
+            self.buffer.prepend(self.preempt)
             self.preempt = b''
             self.preempt_lock.release()
         if len(self.buffer) == 0:
             return False
 
         # Find buffer of 30 or containing '\n'.
-        find = self.buffer.find(b'\n', 0, 30)
+        find = self.buffer.find(b'\n', 30)
         if find == -1:  # No end found.
             length = min(30, len(self.buffer))
         else:  # Line end found.
             length = min(30, len(self.buffer), find + 1)
-        packet = self.buffer[:length]
+        packet = self.buffer.peek(length)
 
         # edge condition of catching only pipe command without '\n'
         if packet.endswith((b'-', b'*', b'&', b'!')):
-            packet += self.buffer[length:length + 1]
             length += 1
+            packet = self.buffer.peek(length)
         post_send_command = None
         # find pipe commands.
         if packet.endswith(b'\n'):
@@ -408,11 +479,13 @@ class K40Controller(Pipe):
             self.open()
 
         if len(packet) == 30:
-            # check that latest state is okay.
-            try:
-                self.wait_until_accepting_packets()
-            except ConnectionError:
-                return False  # Wait suffered connection error.
+            # check that latest state is okay, unless the status right after the last packet already was.
+            if not self.accepting:
+                try:
+                    self.wait_until_accepting_packets()
+                except ConnectionError:
+                    return False  # Wait suffered connection error.
+            self.accepting = False
 
             if self.state == THREAD_STATE_PAUSED:
                 return False  # Paused during packet fetch.
@@ -437,14 +510,17 @@ class K40Controller(Pipe):
                 return False
             if status == 0:
                 raise ConnectionError  # Broken pipe.
+            self.accepting = status == STATUS_OK
             self.device.packet_count += 1 # Everything went off without a problem.
+            self.update_statistics()
         else:
             if len(packet) != 0:  # packet isn't purely a commands len=0, or filled 30.
                 return False  # This packet cannot be sent. Toss it back.
 
         # Packet was processed.
-        self.buffer = self.buffer[length:]
-        self.device.signal('pipe;buffer', len(self.buffer))
+        self.buffer.consume(length)
+        self.device.lazy_signal('pipe;buffer', lambda length=len(self.buffer): length)
+        self.device.release_hold()
 
         if post_send_command is not None:
             # Post send command could be wait_finished, and might have a broken pipe.
@@ -459,10 +535,10 @@ class K40Controller(Pipe):
         if self.device.mock:
             time.sleep(0.04)
         else:
-            packet = b'\x00' + packet + bytes([onewire_crc_lookup(packet)])
-            self.driver.write(packet)
-        self.device.signal("pipe;packet", convert_to_list_bytes(packet))
-        self.device.signal("pipe;packet_text", packet)
+            self.driver.write(self.framer(packet))
+        # The debug representations are only built for a listener.
+        self.device.lazy_signal("pipe;packet", lambda: convert_to_list_bytes(packet))
+        self.device.lazy_signal("pipe;packet_text", lambda: packet)
 
     def update_status(self):
         if self.device.mock:
@@ -470,10 +546,32 @@ class K40Controller(Pipe):
             time.sleep(0.01)
         else:
             self.status = self.driver.get_status()
-        self.device.signal("pipe;status", self.status)
+        self.device.lazy_signal("pipe;status", lambda status=self.status: status)
+
+    def update_statistics(self):
+        self.statistics_packets += 1
+        elapsed = time.time() - self.statistics_time
+        if elapsed >= STATISTICS_INTERVAL:
+            self.device.signal("pipe;statistics", self.statistics_packets / elapsed, self.busy_time,
+                               self.device.rejected_count, self.poll_interval)
+            self.statistics_time += elapsed
+            self.statistics_packets = 0
+
+    def busy_observed(self, duration):
+        """
+        Learns the poll interval from how long the board stays busy. Polling at a quarter of the typical busy
+        duration notices the board accepting again soon after it does without flooding the USB with status requests.
+        """
+        self.busy_time += duration
+        if self.busy_average is None:
+            self.busy_average = duration
+        else:
+            self.busy_average = 0.8 * self.busy_average + 0.2 * duration
+        self.poll_interval = min(POLL_INTERVAL_MAX, max(POLL_INTERVAL_MIN, self.busy_average / 4.0))
 
     def wait_until_accepting_packets(self):
         i = 0
+        start = time.time()
         while self.state != THREAD_STATE_ABORT:
             self.update_status()
             status = self.status[1]
@@ -482,12 +580,14 @@ class K40Controller(Pipe):
             # StateBitWAIT = 0x00002000, 204, 206, 207
             if status & 0x20 == 0:
                 break
-            time.sleep(0.05)
+            time.sleep(self.poll_interval)
             self.device.signal("pipe;wait", STATUS_OK, i)
             i += 1
             if self.abort_waiting:
                 self.abort_waiting = False
                 return  # Wait abort was requested.
+        if i != 0:
+            self.busy_observed(time.time() - start)
 
     def wait_finished(self):
         i = 0
@@ -1,8 +1,11 @@
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from heapq import heappush, heappop, heapify
 from threading import *
 
 from LaserOperation import *
-from svgelements import Path, SVGText
+from svgelements import Path, SVGText, PLOT_CACHE, PLOT_CACHE_BUDGET
 
 THREAD_STATE_UNKNOWN = -1
 THREAD_STATE_UNSTARTED = 0
@@ -24,9 +27,71 @@ SHUTDOWN_THREAD_FINISHED = 6
 SHUTDOWN_LISTENER_ERROR = -10
 SHUTDOWN_FINISH = 100
 
+JOB_INLINE = 0  # Run in the scheduler thread.
+JOB_POOL = 1  # Run in the kernel worker pool, runs may overlap.
+JOB_SKIP_IF_RUNNING = 2  # Run in the kernel worker pool, skipping runs while the previous is still executing.
+
+JOB_WORKERS = 4
+
+SPOOLER_HISTORY = 100  # Completed elements kept in the spooler telemetry.
+HOLD_TIMEOUT = 0.5  # Longest a hold waits before checking its conditions again without being woken.
+
+
+class BatchListener:
+    """
+    Listener delivered the list of messages signalled since the last delivery, the most recent size of them.
+    """
+
+    def __init__(self, funct, size):
+        self.funct = funct
+        self.size = size
+
+    def __eq__(self, other):
+        return other is self or other == self.funct
+
+    def __hash__(self):
+        return hash(self.funct)
+
+    def __call__(self, messages):
+        self.funct(messages[-self.size:])
+
+
+class ThrottledListener:
+    """
+    Listener delivered the latest message at most rate times a second. A message arriving too soon is held
+    until the interval has passed, replaced by any later message.
+    """
+
+    def __init__(self, funct, rate):
+        self.funct = funct
+        self.interval = 1.0 / rate
+        self.last = 0.0
+        self.pending = None
+
+    def __eq__(self, other):
+        return other is self or other == self.funct
+
+    def __hash__(self):
+        return hash(self.funct)
+
+    def __call__(self, *message):
+        self.pending = message
+        self.flush()
+
+    def flush(self):
+        if self.pending is None:
+            return
+        now = time.time()
+        if now - self.last < self.interval:
+            return
+        message = self.pending
+        self.pending = None
+        self.last = now
+        self.funct(*message)
+
 
 class KernelJob:
-    def __init__(self, scheduler, process, args, interval=1.0, times=None):
+    def __init__(self, scheduler, process, args, interval=1.0, times=None, execution=JOB_INLINE):
         self.scheduler = scheduler
         self.interval = interval
         self.last_run = time.time()
@@ -34,8 +99,14 @@ class KernelJob:
         self.process = process
         self.args = args
         self.times = times
+        self.execution = execution
         self.paused = False
         self.executing = False
+        self.future = None
+        self.name = getattr(process, '__name__', str(process))
+        self.runtime = 0.0  # Seconds the last execution took.
+        self.overruns = 0  # Executions taking longer than the interval.
+        self.skipped = 0  # Runs skipped as the previous execution was still running.
 
     @property
     def scheduled(self):
@@ -43,42 +114,82 @@ class KernelJob:
 
     def cancel(self):
         self.times = -1
-        self.scheduler.jobs.remove(self)
+        self.scheduler.remove_job(self)
 
     def run(self):
         """
-        Scheduler Job: updates the values for next_run and times. Removing if necessary.
+        Scheduler Job: updates the values for next_run and times.
         Executes the process requested in the SchedulerThread.
 
         :return:
         """
         if self.paused:
+            self.next_run = time.time() + self.interval
             return
         self.next_run = None
 
         if self.times is not None:
             self.times = self.times - 1
-            if self.times <= 0:
-                self.scheduler.jobs.remove(self)
             if self.times < 0:
                 return
-        if isinstance(self.args, tuple):
-            self.process(*self.args)
+        if self.execution == JOB_INLINE:
+            self.execute()
+        elif self.execution == JOB_SKIP_IF_RUNNING and self.future is not None and not self.future.done():
+            self.skipped += 1
         else:
-            self.process(self.args)
+            self.future = self.scheduler.kernel.submit(self.execute)
         self.last_run = time.time()
-        self.next_run = self.last_run + self.interval
+        if self.times is None or self.times > 0:
+            self.next_run = self.last_run + self.interval
+
+    def execute(self):
+        """
+        Executes the process, signalling 'job' with the name, runtime, overruns and skipped runs of the job.
+        """
+        self.executing = True
+        start = time.time()
+        try:
+            if isinstance(self.args, tuple):
+                self.process(*self.args)
+            else:
+                self.process(self.args)
+        finally:
+            self.executing = False
+            self.runtime = time.time() - start
+            if self.runtime > self.interval:
+                self.overruns += 1
+            message = (self.name, self.runtime, self.overruns, self.skipped)
+            self.scheduler.kernel.lazy_signal('job', lambda: message)
 
 
 class Scheduler(Thread):
+    """
+    Runs the jobs as they come due. The jobs are kept in a heap on their next_run time, the thread sleeps on the
+    condition until the earliest is due or it is woken by a change to the jobs or the thread state.
+    """
+
     def __init__(self, kernel):
         Thread.__init__(self, name='Meerk40t-Scheduler')
         self.daemon = True
         self.kernel = kernel
         self.state = THREAD_STATE_UNSTARTED
-        self.jobs = []
-
-    def add_job(self, run, args=(), interval=1.0, times=None):
+        self.jobs = []  # Heap of [next_run, count, job].
+        self.count = 0
+        self.condition = Condition()
+
+    def schedule(self, job):
+        with self.condition:
+            self.count += 1
+            heappush(self.jobs, [job.next_run, self.count, job])
+            self.condition.notify()
+
+    def remove_job(self, job):
+        with self.condition:
+            self.jobs = [entry for entry in self.jobs if entry[2] is not job]
+            heapify(self.jobs)
+            self.condition.notify()
+
+    def add_job(self, run, args=(), interval=1.0, times=None, execution=JOB_INLINE):
         """
         Adds a job to the scheduler.
 
@@ -86,31 +197,46 @@ class Scheduler(Thread):
         :param args: arguments to give to that function.
         :param interval: in seconds, how often should the job be run.
         :param times: limit on number of executions.
+        :param execution: JOB_INLINE, JOB_POOL or JOB_SKIP_IF_RUNNING.
         :return: Reference to the job added.
         """
-        job = KernelJob(self, run, args, interval, times)
-        self.jobs.append(job)
+        job = KernelJob(self, run, args, interval, times, execution)
+        self.schedule(job)
         return job
 
+    def next_job(self):
+        """
+        Waits until a job is due, or the scheduler is stopped.
+
+        :return: the job due, None if the scheduler should stop.
+        """
+        with self.condition:
+            while True:
+                if self.state in (THREAD_STATE_ABORT, THREAD_STATE_FINISHED):
+                    return None
+                if self.state == THREAD_STATE_PAUSED or len(self.jobs) == 0:
+                    self.condition.wait()
+                    continue
+                delay = self.jobs[0][0] - time.time()
+                if delay > 0:
+                    self.condition.wait(delay)
+                    continue
+                return heappop(self.jobs)[2]
+
     def run(self):
         """
         Scheduler main loop.
-        Check the Scheduler thread state, and whether it should abort or pause.
-        Check each job, and if that job is scheduled to run. Executes that job.
+        Waits for the next job due and executes that job, until the thread is aborted.
         :return:
         """
         self.state = THREAD_STATE_STARTED
-        while self.state != THREAD_STATE_FINISHED:
-            time.sleep(0.005)  # 200 ticks a second.
-            if self.state == THREAD_STATE_ABORT:
+        while True:
+            job = self.next_job()
+            if job is None:
                 break
-            while self.state == THREAD_STATE_PAUSED:
-                # The scheduler is paused.
-                time.sleep(1.0)
-            for job in self.jobs:
-                # Checking if jobs should run.
-                if job.scheduled:
-                    job.run()
+            job.run()
+            if job.next_run is not None and job.times != -1:
+                self.schedule(job)
         self.state = THREAD_STATE_FINISHED
         # If we aborted the thread, we trigger Kernel Shutdown in this thread.
         self.kernel.shutdown()
@@ -118,14 +244,19 @@ class Scheduler(Thread):
     def state(self):
         return self.state
 
+    def set_state(self, state):
+        with self.condition:
+            self.state = state
+            self.condition.notify()
+
     def resume(self):
-        self.state = THREAD_STATE_STARTED
+        self.set_state(THREAD_STATE_STARTED)
 
     def pause(self):
-        self.state = THREAD_STATE_PAUSED
+        self.set_state(THREAD_STATE_PAUSED)
 
     def stop(self):
-        self.state = THREAD_STATE_ABORT
+        self.set_state(THREAD_STATE_ABORT)
 
 
 class Module:
@@ -165,6 +296,10 @@ class Device:
         self.state = -1
         self.location = ''
         self.hold_condition = lambda e: False
+        self.resume_condition = None  # Ends a hold, by default the hold_condition no longer being met.
+        self._holding = False
+        self.hold_wakeup = Condition()
+        self._hold_time = 0.0  # Total seconds the spooling has been held.
 
     def _start_debugging(self):
         import functools
@@ -206,12 +341,40 @@ class Device:
                 setattr(obj, attr, debug(fn, obj))
 
     def hold(self):
+        """
+        Blocks the spooling once the hold_condition is met, until the resume_condition is. The hold waits to be woken
+        by release_hold(), typically called by the pipe as it drains.
+        """
         if self.spooler.thread.state == THREAD_STATE_ABORT:
             raise InterruptedError
-        while self.hold_condition(0):
-            if self.spooler.thread.state == THREAD_STATE_ABORT:
-                raise InterruptedError
-            time.sleep(0.1)
+        if not self.hold_condition(0):
+            return
+        start = time.time()
+        try:
+            with self.hold_wakeup:
+                self._holding = True
+                while not self.can_resume():
+                    if self.spooler.thread.state == THREAD_STATE_ABORT:
+                        raise InterruptedError
+                    self.hold_wakeup.wait(HOLD_TIMEOUT)
+        finally:
+            self._holding = False
+            self._hold_time += time.time() - start
+
+    def can_resume(self):
+        if self.resume_condition is None:
+            return not self.hold_condition(0)
+        return self.resume_condition(0)
+
+    def release_hold(self, force=False):
+        """
+        Wakes a hold that can resume, or any hold if forced.
+        """
+        if not self._holding:
+            return
+        if force or self.can_resume():
+            with self.hold_wakeup:
+                self.hold_wakeup.notify_all()
 
     def close(self):
         self.flush()
@@ -225,6 +388,12 @@ class Device:
     def signal(self, code, *message):
         self.kernel.signal(self.uid + ';' + code, *message)
 
+    def lazy_signal(self, code, message_function):
+        self.kernel.lazy_signal(self.uid + ';' + code, message_function)
+
+    def has_listeners(self, code):
+        return self.kernel.has_listeners(self.uid + ';' + code)
+
     def log(self, message):
         self._device_log += message
         self.signal('pipe;device_log', message)
@@ -262,8 +431,8 @@ class Device:
         if hasattr(self.kernel, key):
             return getattr(self.kernel, key)
 
-    def listen(self, signal, function):
-        self.kernel.listen(self.uid + ';' + signal, function)
+    def listen(self, signal, function, batch=None, rate=None):
+        self.kernel.listen(self.uid + ';' + signal, function, batch=batch, rate=rate)
 
     def unlisten(self, signal, function):
         self.kernel.unlisten(self.uid + ';' + signal, function)
@@ -329,18 +498,28 @@ class SpoolerThread(Thread):
         """
         command_index = 0
         self.set_state(THREAD_STATE_STARTED)
+        device = self.spooler.device
         try:
-            self.spooler.device.hold()
+            device.hold()
             while True:
                 element = self.spooler.peek()
                 if element is None:
                     break  # Nothing left in spooler.
-                self.spooler.device.hold()
+                telemetry = SpoolerTelemetry(element, device)
+                device.hold()
                 try:
                     gen = element.generate
                 except AttributeError:
                     gen = element
-                for e in gen():
+                gen = device.interpreter.spool(element, gen)
+                generator = gen()
+                while True:
+                    t = time.time()
+                    try:
+                        e = next(generator)
+                    except StopIteration:
+                        break
+                    telemetry.generate_time += time.time() - t
                     if isinstance(e, (tuple, list)):
                         command = e[0]
                         if len(e) >= 2:
@@ -353,9 +532,10 @@ class SpoolerThread(Thread):
                     command_index += 1
                     if self.state == THREAD_STATE_ABORT:
                         break
-                    self.spooler.device.hold()
                     self.spooler.execute(command, *values)
+                    telemetry.executed()
                 self.spooler.pop()
+                self.spooler.completed(telemetry.finish())
         except InterruptedError:
             pass
         if self.state == THREAD_STATE_ABORT:
@@ -363,6 +543,49 @@ class SpoolerThread(Thread):
         self.set_state(THREAD_STATE_FINISHED)
 
 
+class SpoolerTelemetry:
+    """
+    Timings of a spooled element: the time to the first byte written, the time spent in the element's generator,
+    the time the spooling was held, the total time, and the commands and bytes it produced.
+    """
+
+    def __init__(self, element, device):
+        self.device = device
+        self.name = str(element)
+        self.start = time.time()
+        self.start_bytes = device.interpreter.bytes_written
+        self.start_hold = device._hold_time
+        self.first_byte_time = None
+        self.generate_time = 0.0
+        self.hold_time = 0.0
+        self.total_time = 0.0
+        self.commands = 0
+        self.bytes = 0
+
+    def executed(self):
+        self.commands += 1
+        if self.first_byte_time is None and self.device.interpreter.bytes_written != self.start_bytes:
+            self.first_byte_time = time.time() - self.start
+
+    def finish(self):
+        self.total_time = time.time() - self.start
+        self.bytes = self.device.interpreter.bytes_written - self.start_bytes
+        self.hold_time = self.device._hold_time - self.start_hold
+        return self
+
+    def report(self):
+        return {
+            'name': self.name,
+            'start': self.start,
+            'first_byte_time': self.first_byte_time,
+            'generate_time': self.generate_time,
+            'hold_time': self.hold_time,
+            'total_time': self.total_time,
+            'commands': self.commands,
+            'bytes': self.bytes,
+        }
+
+
 class Spooler:
     """
     Given spoolable objects it uses an interpreter to convert these to code.
@@ -375,6 +598,7 @@ class Spooler:
 
         self.queue_lock = Lock()
         self.queue = []
+        self.history = deque(maxlen=SPOOLER_HISTORY)  # Telemetry of the completed elements.
         self.thread = None
         self.reset_thread()
 
@@ -386,6 +610,7 @@ class Spooler:
             self.device.signal('spooler;thread', THREAD_STATE_UNSTARTED)
         else:
             self.device.signal('spooler;thread', self.thread.state)
+        self.device.release_hold(force=True)
 
     def execute(self, command, *values):
         self.device.hold()
@@ -422,6 +647,32 @@ class Spooler:
         self.device.signal("spooler;queue", len(self.queue))
         return queue_head
 
+    def completed(self, telemetry):
+        self.history.append(telemetry)
+        self.device.signal("spooler;job", telemetry.report())
+
+    def telemetry(self):
+        """
+        :return: list of the telemetry reports of the completed elements, oldest first.
+        """
+        return [telemetry.report() for telemetry in list(self.history)]
+
+    def dump_telemetry(self, filename=None):
+        """
+        Writes the telemetry of the completed elements as JSON, by default to a dated MeerK40t-telemetry file.
+
+        :return: the filename written.
+        """
+        import json
+        if filename is None:
+            import datetime
+            filename = "MeerK40t-telemetry-{date:%Y-%m-%d_%H_%M_%S}.json".format(date=datetime.datetime.now())
+        history = self.telemetry()
+        with open(filename, 'w') as f:
+            json.dump(history, f, indent=2)
+        self.device.signal("spooler;history", history)
+        return filename
+
     def send_job(self, element):
         self.queue_lock.acquire(True)
         if isinstance(element, (list, tuple)):
@@ -461,6 +712,10 @@ class Interpreter:
 
     def __init__(self, device=None):
         self.device = device
+        self.bytes_written = 0  # Bytes sent to the pipe by spooled commands.
+        self.command_handlers = {}  # LaserCommandConstant: function(values), performed by command.
+        self.realtime_handlers = {}  # LaserCommandConstant: function(values), performed by realtime_command.
+        self.realtime_fallback = True  # Realtime commands without a realtime handler are given to command.
 
     def __len__(self):
         if self.device.pipe is None:
@@ -470,14 +725,28 @@ class Interpreter:
 
     def command(self, command, values=None):
         """Commands are middle language LaserCommandConstants there values are given."""
-        return NotImplementedError
+        try:
+            handler = self.command_handlers[command]
+        except KeyError:
+            return NotImplementedError
+        return handler(values)
+
+    def spool(self, element, generate):
+        """Returns the generate function to be run for the spooled element, by default its own."""
+        return generate
 
     def realtime_command(self, command, values=None):
         """Asks for the execution of a realtime command. Unlike the spooled commands these
         return False if rejected and something else if able to be performed. These will not
         be queued. If rejected. They must be performed in realtime or cancelled.
         """
-        return self.command(command, values)
+        try:
+            handler = self.realtime_handlers[command]
+        except KeyError:
+            if self.realtime_fallback:
+                return self.command(command, values)
+            return None
+        return handler(values)
 
 
 class Pipe:
@@ -580,6 +849,7 @@ class Kernel:
         self.filenodes = {}
 
         self.config = None
+        self._plot_cache_budget = None
 
         self.modules = {}
         self.loaders = {}
@@ -598,7 +868,12 @@ class Kernel:
         self.listeners = {}
         self.adding_listeners = []
         self.removing_listeners = []
+        self.batch_listeners = {}
+        self.throttled_listeners = []
+        self.batches = {}  # Messages signalled since the last delivery, for signals with batch listeners.
+        self.listening = {}  # Listener count per signal, counting those not yet added.
         self.last_message = {}
+        self.lazy_messages = {}  # Message functions of lazy signals nothing listened to, built only if asked for.
         self.queue_lock = Lock()
         self.message_queue = {}
         self._is_queue_processing = False
@@ -612,6 +887,10 @@ class Kernel:
         if config is not None:
             self.set_config(config)
         self.cron = None
+        self.executor = None
+
+        self.add_control("Plot Cache Stats", self.plot_cache_stats)
+        self.add_control("Plot Cache Clear", PLOT_CACHE.clear)
 
     def __str__(self):
         return "Project"
@@ -622,8 +901,36 @@ class Kernel:
     def signal(self, code, *message):
         self.queue_lock.acquire(True)
         self.message_queue[code] = message
+        if code in self.lazy_messages:
+            del self.lazy_messages[code]
+        batch = self.batches.get(code)
+        if batch is not None:
+            batch.append(message)
         self.queue_lock.release()
 
+    def lazy_signal(self, code, message_function):
+        """
+        Signals the message returned by message_function, which is only called if anything listens to the code.
+        While nothing listens, the function is kept instead and only called if a listener is added or last_signal()
+        is asked for the code.
+        """
+        if self.listening.get(code):
+            self.signal(code, message_function())
+        else:
+            self.lazy_messages[code] = message_function
+
+    def resolve_lazy_message(self, code):
+        message_function = self.lazy_messages.pop(code, None)
+        if message_function is not None:
+            self.last_message[code] = (message_function(),)
+
+    def has_listeners(self, code):
+        """
+        Whether anything listens, or is about to listen, to the signal code.
+        Signals that are expensive to build can be skipped when nothing would receive them.
+        """
+        return bool(self.listening.get(code))
+
     def delegate_messages(self):
         if self._is_queue_processing:
             return
@@ -631,12 +938,21 @@ class Kernel:
 
     def process_queue(self, *args):
         if len(self.message_queue) == 0 and len(self.adding_listeners) == 0 and len(self.removing_listeners) == 0:
+            for listener in self.throttled_listeners:
+                listener.flush()
             return
         self._is_queue_processing = True
         add = None
         remove = None
+        batches = None
         self.queue_lock.acquire(True)
         queue = self.message_queue
+        for code, batch in self.batches.items():
+            if len(batch):
+                if batches is None:
+                    batches = {}
+                batches[code] = list(batch)
+                batch.clear()
         if len(self.adding_listeners) != 0:
             add = self.adding_listeners
             self.adding_listeners = []
@@ -647,22 +963,43 @@ class Kernel:
         self.queue_lock.release()
         if add is not None:
             for signal, funct in add:
-                if signal in self.listeners:
-                    listeners = self.listeners[signal]
+                if isinstance(funct, BatchListener):
+                    registry = self.batch_listeners
+                else:
+                    registry = self.listeners
+                    if isinstance(funct, ThrottledListener):
+                        self.throttled_listeners.append(funct)
+                if signal in registry:
+                    listeners = registry[signal]
                     listeners.append(funct)
                 else:
-                    self.listeners[signal] = [funct]
+                    registry[signal] = [funct]
+                self.resolve_lazy_message(signal)
                 if signal in self.last_message:
                     last_message = self.last_message[signal]
-                    funct(*last_message)
+                    if isinstance(funct, BatchListener):
+                        funct([last_message])
+                    else:
+                        funct(*last_message)
         if remove is not None:
             for signal, funct in remove:
-                if signal in self.listeners:
-                    listeners = self.listeners[signal]
-                    try:
-                        listeners.remove(funct)
-                    except ValueError:
-                        print("Value error removing: %s  %s" % (str(listeners), signal))
+                if funct in self.listeners.get(signal, ()):
+                    self.listeners[signal].remove(funct)
+                    if funct in self.throttled_listeners:
+                        self.throttled_listeners.remove(funct)
+                elif funct in self.batch_listeners.get(signal, ()):
+                    listeners = self.batch_listeners[signal]
+                    listeners.remove(funct)
+                    if len(listeners) == 0:
+                        self.queue_lock.acquire(True)
+                        del self.batches[signal]
+                        self.queue_lock.release()
+                else:
+                    print("Value error removing: %s  %s" % (str(self.listeners.get(signal)), signal))
+                    continue
+                self.queue_lock.acquire(True)
+                self.listening[signal] -= 1  # Only listeners actually removed are no longer counted.
+                self.queue_lock.release()
 
         for code, message in queue.items():
             # if 'spooler' in code:
@@ -672,9 +1009,16 @@ class Kernel:
                 for listener in listeners:
                     listener(*message)
             self.last_message[code] = message
+        if batches is not None:
+            for code, messages in batches.items():
+                for listener in self.batch_listeners.get(code, ()):
+                    listener(messages)
+        for listener in self.throttled_listeners:
+            listener.flush()
         self._is_queue_processing = False
 
     def last_signal(self, code):
+        self.resolve_lazy_message(code)
         try:
             return self.last_message[code]
         except KeyError:
@@ -776,12 +1120,23 @@ class Kernel:
                 while thread.is_alive():
                     time.sleep(0.1)
                 kill(SHUTDOWN_THREAD_FINISHED, thread_name, thread)
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
         for key, listener in self.listeners.items():
             if len(listener):
                 kill(SHUTDOWN_LISTENER_ERROR, key, listener)
+        for key, listener in self.batch_listeners.items():
+            if len(listener):
+                kill(SHUTDOWN_LISTENER_ERROR, key, listener)
         kill(SHUTDOWN_FINISH, 'shutdown', self)
         self.last_message = {}
+        self.lazy_messages = {}
         self.listeners = {}
+        self.batch_listeners = {}
+        self.throttled_listeners = []
+        self.batches = {}
+        self.listening = {}
         self.device = None
 
     def read_config(self, t, key, default=None):
@@ -829,6 +1184,7 @@ class Kernel:
                 if not hasattr(self, value):
                     setattr(self, value, None)
             more, value, index = config.GetNextEntry(index)
+        self.setting(int, 'plot_cache_budget', PLOT_CACHE_BUDGET)
 
     def setting(self, setting_type, setting_name, default=None):
         """
@@ -894,9 +1250,23 @@ class Kernel:
         self.open_windows[window_name] = window
         return window
 
-    def listen(self, signal, funct):
+    def listen(self, signal, funct, batch=None, rate=None):
+        """
+        Listens to the signal. By default the listener gets the latest message signalled since the last delivery.
+
+        :param batch: the listener gets the list of the messages signalled since the last delivery, up to batch of them.
+        :param rate: the listener gets the latest message at most rate times a second.
+        """
         self.queue_lock.acquire(True)
+        if batch is not None:
+            funct = BatchListener(funct, batch)
+            queue = self.batches.get(signal)
+            if queue is None or queue.maxlen < batch:
+                self.batches[signal] = deque(() if queue is None else queue, maxlen=batch)
+        elif rate is not None:
+            funct = ThrottledListener(funct, rate)
         self.adding_listeners.append((signal, funct))
+        self.listening[signal] = self.listening.get(signal, 0) + 1
         self.queue_lock.release()
 
     def unlisten(self, signal, funct):
@@ -904,6 +1274,16 @@ class Kernel:
         self.removing_listeners.append((signal, funct))
         self.queue_lock.release()
 
+    def submit(self, function, *args):
+        """
+        Runs the function in the kernel worker pool.
+
+        :return: future of the function's result.
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=JOB_WORKERS)
+        return self.executor.submit(function, *args)
+
     def add_module(self, module_name, module):
         self.modules[module_name] = module
         module.initialize(self, name=module_name)
@@ -936,6 +1316,27 @@ class Kernel:
     def add_control(self, control_name, function):
         self.controls[control_name] = function
 
+    @property
+    def plot_cache_budget(self):
+        """Approximate bytes the curve plot cache may keep. None until a config is set."""
+        return self._plot_cache_budget
+
+    @plot_cache_budget.setter
+    def plot_cache_budget(self, value):
+        self._plot_cache_budget = value
+        if value is not None:
+            PLOT_CACHE.set_budget(value)
+
+    def plot_cache_stats(self):
+        """
+        Signals and returns the statistics of the curve plot cache shared by all the plotted paths.
+
+        :return: dict of the entries, bytes, budget, hits, misses and evictions.
+        """
+        stats = PLOT_CACHE.stats()
+        self.signal('plot_cache', stats)
+        return stats
+
     def remove_control(self, control_name):
         del self.controls[control_name]
 
@@ -1,8 +1,10 @@
 from copy import copy
+from math import ceil
 
 from LaserCommandConstants import *
-from RasterPlotter import RasterPlotter, X_AXIS, TOP, BOTTOM, Y_AXIS, RIGHT, LEFT
-from svgelements import Length, SVGImage, SVGElement
+from RasterPlotter import BAND_PIXELS, RasterPlotter, NumpyRasterPlotter, BandedRasterPlotter, X_AXIS, TOP, \
+    BOTTOM, Y_AXIS, RIGHT, LEFT
+from svgelements import Length, Matrix, Path, SVGImage, SVGElement
 
 VARIABLE_NAME_NAME = 'name'
 VARIABLE_NAME_SPEED = 'speed'
@@ -12,6 +14,24 @@ VARIABLE_NAME_DRATIO = 'd_ratio'
 VARIABLE_NAME_RASTER_STEP = 'raster_step'
 VARIABLE_NAME_RASTER_DIRECTION = 'raster_direction'
 
+PLOT_BATCH = 256  # Paths reified together by LaserOperation.plots().
+
+
+def element_fingerprint(element):
+    """
+    Hashable value for the element, which changes when its geometry or transform does. Images are identified by the
+    image object, images are replaced rather than modified.
+    """
+    try:
+        m = element.transform
+        matrix = m.a, m.b, m.c, m.d, m.e, m.f
+        if isinstance(element, SVGImage):
+            image = element.image
+            return 'image', id(image), image.mode, image.size, matrix
+        return type(element).__name__, element.d(transformed=False), matrix
+    except AttributeError:
+        return 'element', id(element)
+
 
 class LaserOperation(list):
     """
@@ -48,6 +68,23 @@ class LaserOperation(list):
     def __copy__(self):
         return LaserOperation(self)
 
+    def fingerprint(self):
+        """Hashable value for everything the generated commands depend on."""
+        return (type(self).__name__, self.speed, self.power, self.dratio,
+                tuple(element_fingerprint(element) for element in self))
+
+    def plots(self):
+        """
+        Yields the transformed copy of each element, as abs() gives. Paths are reified PLOT_BATCH at a time so paths
+        sharing a transform have their points transformed together, without reifying the whole operation up front.
+        """
+        for i in range(0, len(self), PLOT_BATCH):
+            batch = [copy(element) if isinstance(element, Path) else abs(element)
+                     for element in self[i:i + PLOT_BATCH]]
+            Path.reify_all([plot for plot in batch if isinstance(plot, Path)])
+            for plot in batch:
+                yield plot
+
     def has_same_properties(self, obj):
         if 'speed' in obj.values and obj.values['speed'] is not None:
             if self.speed != float(obj.values['speed']):
@@ -69,6 +106,112 @@ class LaserOperation(list):
             self.dratio = float(obj.values['d_ratio'])
 
 
+class RasterBands:
+    """
+    Provides the filtered laser values of an SVGImage one region at a time, for BandedRasterPlotter.
+
+    If the image transform is not uniform at the raster step, each region is actualized on its own. The canvas is
+    sized, cropped and placed as OperationPreprocessor.make_actual() does for the whole image, the crop box being
+    found with one pass over bands of the canvas. Neither the full-size actualized copy nor a full-size array of values
+    is ever made, only the source image is held. Canvas pixels outside the source image are filled with the image
+    background rather than black. Resampled values may round one level differently than in a whole-image
+    actualization.
+    """
+
+    def __init__(self, image_element, step_level=1):
+        image = image_element.image
+        if image.mode not in ("1", "P", "L", "RGB", "RGBA"):
+            image = image.convert("RGBA")  # Any mode without a filter should get converted.
+        self.image = image
+        self.largest_region = 0  # Pixels in the largest region image made.
+        m = Matrix(image_element.transform)
+        if m.a != step_level or m.b != 0.0 or m.c != 0.0 or m.d != step_level:
+            width, height = image.size
+            corners = [m.point_in_matrix_space(p) for p in ((0, 0), (width, 0), (0, height), (width, height))]
+            tx = min(p[0] for p in corners)
+            ty = min(p[1] for p in corners)
+            element_width = int(ceil(max(p[0] for p in corners) - tx))
+            element_height = int(ceil(max(p[1] for p in corners) - ty))
+            m.post_translate(-tx, -ty)
+            step_scale = 1 / step_level
+            m.pre_scale(step_scale, step_scale)
+            m.inverse()
+            if (m.value_skew_x() != 0.0 or m.value_skew_y() != 0.0) and image.mode != 'RGBA':
+                # Rotating an image without alpha invents black pixels.
+                self.image = image = image.convert('RGBA')
+            self.matrix = m
+            self.origin_x = 0
+            self.origin_y = 0
+            self.width = element_width
+            self.height = element_height
+            box = self.bounding_box()
+            if box is not None:
+                width = box[2] - box[0]
+                height = box[3] - box[1]
+                if width != element_width and height != element_height:
+                    self.origin_x, self.origin_y = box[0], box[1]
+                    self.width, self.height = width, height
+            self.offset_x = tx + self.origin_x * step_level
+            self.offset_y = ty + self.origin_y * step_level
+            self.background = RasterBands.background(image)
+        else:
+            self.width, self.height = image.size
+            self.matrix = None
+            self.offset_x = m.value_trans_x()
+            self.offset_y = m.value_trans_y()
+
+    @staticmethod
+    def background(image):
+        """Fill color of the image mode which the laser leaves off."""
+        mode = image.mode
+        if mode == "RGB":
+            return 255, 255, 255
+        elif mode == "RGBA":
+            return 0, 0, 0, 0
+        elif mode == "P":
+            p = image.getpalette()
+            return max(range(len(p) // 3), key=lambda i: p[3 * i] + p[3 * i + 1] + p[3 * i + 2])
+        return 255
+
+    def transformed(self, x0, y0, x1, y1, fill=0):
+        """Returns the PIL image of the given region of the uncropped canvas."""
+        from PIL import Image
+        m = self.matrix
+        self.largest_region = max(self.largest_region, (x1 - x0) * (y1 - y0))
+        return self.image.transform((x1 - x0, y1 - y0), Image.AFFINE,
+                                    (m.a, m.c, m.e + m.a * x0 + m.c * y0,
+                                     m.b, m.d, m.f + m.b * x0 + m.d * y0),
+                                    resample=Image.BICUBIC, fillcolor=fill)
+
+    def bounding_box(self):
+        """The getbbox() of the black filled canvas, found band by band."""
+        rows = max(1, BAND_PIXELS // max(1, self.width))
+        box = None
+        for y0 in range(0, self.height, rows):
+            y1 = min(self.height, y0 + rows)
+            band_box = self.transformed(0, y0, self.width, y1).getbbox()
+            if band_box is None:
+                continue
+            band_box = (band_box[0], band_box[1] + y0, band_box[2], band_box[3] + y0)
+            if box is None:
+                box = band_box
+            else:
+                box = (min(box[0], band_box[0]), box[1], max(box[2], band_box[2]), band_box[3])
+        return box
+
+    def region(self, x0, y0, x1, y1):
+        """Returns the PIL image of the given region of the actualized image."""
+        if self.matrix is None:
+            self.largest_region = max(self.largest_region, (x1 - x0) * (y1 - y0))
+            return self.image.crop((x0, y0, x1, y1))
+        x = self.origin_x
+        y = self.origin_y
+        return self.transformed(x0 + x, y0 + y, x1 + x, y1 + y, self.background)
+
+    def __call__(self, x0, y0, x1, y1):
+        return RasterOperation.filtered_array(self.region(x0, y0, x1, y1))
+
+
 class RasterOperation(LaserOperation):
     """
     Defines the default raster operation to be done and the properties needed.
@@ -84,6 +227,8 @@ class RasterOperation(LaserOperation):
         self.raster_direction = 0
         self.unidirectional = False
         self.overscan = 20
+        self.vectorized = False
+        self.tiled = False
         if len(args) == 1:
             obj = args[0]
             if isinstance(obj, SVGElement):
@@ -93,6 +238,8 @@ class RasterOperation(LaserOperation):
                 self.raster_direction = obj.raster_direction
                 self.unidirectional = obj.unidirectional
                 self.overscan = obj.overscan
+                self.vectorized = obj.vectorized
+                self.tiled = obj.tiled
 
     def __str__(self):
         parts = []
@@ -114,6 +261,10 @@ class RasterOperation(LaserOperation):
             self.unidirectional = bool(obj.values['unidirectional'])
         if 'overscan' in obj.values and obj.values['overscan'] is not None:
             self.overscan = int(obj.values['overscan'])
+        if 'vectorized' in obj.values and obj.values['vectorized'] is not None:
+            self.vectorized = bool(obj.values['vectorized'])
+        if 'tiled' in obj.values and obj.values['tiled'] is not None:
+            self.tiled = bool(obj.values['tiled'])
 
     def has_same_properties(self, obj):
         if 'raster_step' in obj.values and obj.values['raster_step'] is not None:
@@ -128,8 +279,92 @@ class RasterOperation(LaserOperation):
         if 'overscan' in obj.values and obj.values['overscan'] is not None:
             if self.overscan != int(obj.values['overscan']):
                 return False
+        if 'vectorized' in obj.values and obj.values['vectorized'] is not None:
+            if self.vectorized != bool(obj.values['vectorized']):
+                return False
+        if 'tiled' in obj.values and obj.values['tiled'] is not None:
+            if self.tiled != bool(obj.values['tiled']):
+                return False
         return True
 
+    @staticmethod
+    def filtered_array(image):
+        """
+        Converts the PIL image into a NumPy array of laser values, 0.0 is off and 1.0 is fully on.
+        These are the same values the per-pixel filters in generate() produce, calculated in the same order.
+
+        :param image: PIL image in mode 1, P, L, RGB or RGBA.
+        :return: float64 array with shape (height, width)
+        """
+        import numpy as np
+        mode = image.mode
+        if mode == "1" or mode == "L":
+            data = np.asarray(image.convert("L"), dtype=np.float64)
+            return (255.0 - data) / 255.0
+        elif mode == "P":
+            p = image.getpalette()
+            lookup = np.array([1.0 - (p[i] + p[i + 1] + p[i + 2]) / 765.0 for i in range(0, len(p) - 2, 3)])
+            return lookup[np.asarray(image)]
+        data = np.asarray(image, dtype=np.float64)
+        v = 1.0 - (data[:, :, 0] + data[:, :, 1] + data[:, :, 2]) / 765.0
+        if mode == "RGB":
+            return v
+        elif mode == "RGBA":
+            return v * data[:, :, 3] / 255.0
+        raise ValueError  # this shouldn't happen.
+
+    def fingerprint(self):
+        return LaserOperation.fingerprint(self) + (self.raster_step, self.raster_direction, self.unidirectional,
+                                                   self.overscan, self.vectorized, self.tiled)
+
+    def image_plotter(self, svgimage, traverse, overscan, step):
+        """
+        Returns the plotter for the entire image of the SVGImage.
+        """
+        image = svgimage.image
+        width, height = image.size
+        mode = image.mode
+
+        if mode != "1" and mode != "P" and mode != "L" and mode != "RGB" and mode != "RGBA":
+            # Any mode without a filter should get converted.
+            image = image.convert("RGBA")
+            mode = image.mode
+        if mode == "1":
+            def image_filter(pixel):
+                return (255 - pixel) / 255.0
+        elif mode == "P":
+            p = image.getpalette()
+
+            def image_filter(pixel):
+                v = p[pixel * 3] + p[pixel * 3 + 1] + p[pixel * 3 + 2]
+                return 1.0 - v / 765.0
+        elif mode == "L":
+            def image_filter(pixel):
+                return (255 - pixel) / 255.0
+        elif mode == "RGB":
+            def image_filter(pixel):
+                return 1.0 - (pixel[0] + pixel[1] + pixel[2]) / 765.0
+        elif mode == "RGBA":
+            def image_filter(pixel):
+                return (1.0 - (pixel[0] + pixel[1] + pixel[2]) / 765.0) * pixel[3] / 255.0
+        else:
+            raise ValueError  # this shouldn't happen.
+        m = svgimage.transform
+        if self.vectorized:
+            try:
+                return NumpyRasterPlotter(RasterOperation.filtered_array(image), width, height, traverse, 0,
+                                          overscan,
+                                          m.value_trans_x(),
+                                          m.value_trans_y(),
+                                          step)
+            except ImportError:
+                pass  # NumPy is not available, use the per-pixel plotter.
+        data = image.load()
+        return RasterPlotter(data, width, height, traverse, 0, overscan,
+                             m.value_trans_x(),
+                             m.value_trans_y(),
+                             step, image_filter)
+
     def generate(self):
         yield COMMAND_SET_SPEED, self.speed
         direction = self.raster_direction
@@ -151,52 +386,28 @@ class RasterOperation(LaserOperation):
             traverse |= Y_AXIS
             traverse |= LEFT
 
+        overscan = self.overscan
+        if overscan is None:
+            overscan = 20
+        else:
+            try:
+                overscan = int(overscan)
+            except ValueError:
+                overscan = 20
+
         for svgimage in self:
             if not isinstance(svgimage, SVGImage):
                 continue  # We do not raster anything that is not classed properly.
-            image = svgimage.image
-            width, height = image.size
-            mode = image.mode
-
-            if mode != "1" and mode != "P" and mode != "L" and mode != "RGB" and mode != "RGBA":
-                # Any mode without a filter should get converted.
-                image = image.convert("RGBA")
-                mode = image.mode
-            if mode == "1":
-                def image_filter(pixel):
-                    return (255 - pixel) / 255.0
-            elif mode == "P":
-                p = image.getpalette()
-
-                def image_filter(pixel):
-                    v = p[pixel * 3] + p[pixel * 3 + 1] + p[pixel * 3 + 2]
-                    return 1.0 - v / 765.0
-            elif mode == "L":
-                def image_filter(pixel):
-                    return (255 - pixel) / 255.0
-            elif mode == "RGB":
-                def image_filter(pixel):
-                    return 1.0 - (pixel[0] + pixel[1] + pixel[2]) / 765.0
-            elif mode == "RGBA":
-                def image_filter(pixel):
-                    return (1.0 - (pixel[0] + pixel[1] + pixel[2]) / 765.0) * pixel[3] / 255.0
-            else:
-                raise ValueError  # this shouldn't happen.
-            m = svgimage.transform
-            data = image.load()
-
-            overscan = self.overscan
-            if overscan is None:
-                overscan = 20
-            else:
+            raster = None
+            if self.tiled:
                 try:
-                    overscan = int(overscan)
-                except ValueError:
-                    overscan = 20
-            raster = RasterPlotter(data, width, height, traverse, 0, overscan,
-                                   m.value_trans_x(),
-                                   m.value_trans_y(),
-                                   step, image_filter)
+                    bands = RasterBands(svgimage, step)
+                    raster = BandedRasterPlotter(bands, bands.width, bands.height, traverse, 0, overscan,
+                                                 bands.offset_x, bands.offset_y, step)
+                except ImportError:
+                    pass  # NumPy is not available, raster the whole image.
+            if raster is None:
+                raster = self.image_plotter(svgimage, traverse, overscan, step)
             yield COMMAND_MODE_CONCAT, 0
             yield COMMAND_SHIFT, raster.initial_position_in_scene()
             yield COMMAND_SET_DIRECTION, raster.initial_direction()
@@ -232,8 +443,7 @@ class EngraveOperation(LaserOperation):
         yield COMMAND_SET_POWER, self.power
         if self.dratio is not None:
             yield COMMAND_SET_D_RATIO, self.dratio
-        for object_path in self:
-            plot = abs(object_path)
+        for plot in self.plots():
             first_point = plot.first_point
             if first_point is None:
                 continue
@@ -271,8 +481,7 @@ class CutOperation(LaserOperation):
         yield COMMAND_SET_POWER, self.power
         if self.dratio is not None:
             yield COMMAND_SET_D_RATIO, self.dratio
-        for object_path in self:
-            plot = abs(object_path)
+        for plot in self.plots():
             first_point = plot.first_point
             if first_point is None:
                 continue
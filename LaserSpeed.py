@@ -1,7 +1,11 @@
 #!/usr/bin/env python
 
+from array import array
+from collections import OrderedDict
 from math import floor
+from threading import Lock
 
+SPEEDCODE_CACHE_ENTRIES = 512  # Number of speedcodes memoized by get_cached_code_from_speed().
 
 class LaserSpeed:
     """
@@ -36,6 +40,10 @@ class LaserSpeed:
     are used.
     """
 
+    _speedcode_cache = OrderedDict()
+    _speedcode_cache_lock = Lock()
+    _speed_tables = {}
+
     def __init__(self, *args, **kwargs):
         self.board = 'M2'
         self.speed = 30
@@ -113,12 +121,78 @@ class LaserSpeed:
 
     @property
     def speedcode(self):
-        return LaserSpeed.get_code_from_speed(
+        return LaserSpeed.get_cached_code_from_speed(
+            self.speed, self.raster_step, self.board,
+            self.d_ratio, self.acceleration, self.suffix_c,
+            fix_limit=self.fix_limit, fix_speeds=self.fix_speeds, fix_lows=self.fix_lows,
+            raster_horizontal=self.raster_horizontal)
+
+    @property
+    def speedcode_bytes(self):
+        return LaserSpeed.get_encoded_code_from_speed(
             self.speed, self.raster_step, self.board,
             self.d_ratio, self.acceleration, self.suffix_c,
             fix_limit=self.fix_limit, fix_speeds=self.fix_speeds, fix_lows=self.fix_lows,
             raster_horizontal=self.raster_horizontal)
 
+    @staticmethod
+    def get_cached_code_from_speed(*args, **kwargs):
+        """
+        Memoized get_code_from_speed(). Takes the same parameters and gives the same speedcode.
+
+        :return: speed code produced.
+        """
+        return LaserSpeed._lookup_speedcode(*args, **kwargs)[0]
+
+    @staticmethod
+    def get_encoded_code_from_speed(*args, **kwargs):
+        """
+        Memoized get_code_from_speed() giving the speedcode already encoded as ascii bytes, ready to be
+        written to the device.
+
+        :return: speed code produced, as bytes.
+        """
+        return LaserSpeed._lookup_speedcode(*args, **kwargs)[1]
+
+    @staticmethod
+    def clear_speedcode_cache():
+        with LaserSpeed._speedcode_cache_lock:
+            LaserSpeed._speedcode_cache.clear()
+
+    @staticmethod
+    def _lookup_speedcode(mm_per_second,
+                          raster_step=0,
+                          board='M2',
+                          d_ratio=None,
+                          acceleration=None,
+                          suffix_c=None,
+                          fix_limit=False,
+                          fix_speeds=False,
+                          fix_lows=False,
+                          raster_horizontal=True):
+        """
+        Finds the (speedcode, encoded speedcode) pair for the given parameters in the speedcode cache,
+        calculating and storing it if needed. The cache keeps the most recently used SPEEDCODE_CACHE_ENTRIES.
+        """
+        mm_per_second = float(mm_per_second)
+        key = (board, mm_per_second, raster_step, d_ratio, acceleration, suffix_c,
+               fix_limit, fix_speeds, fix_lows, raster_horizontal)
+        cache = LaserSpeed._speedcode_cache
+        with LaserSpeed._speedcode_cache_lock:
+            entry = cache.get(key)
+            if entry is not None:
+                cache.move_to_end(key)
+                return entry
+        code = LaserSpeed.get_code_from_speed(mm_per_second, raster_step, board, d_ratio, acceleration, suffix_c,
+                                              fix_limit=fix_limit, fix_speeds=fix_speeds, fix_lows=fix_lows,
+                                              raster_horizontal=raster_horizontal)
+        entry = (code, code.encode('utf8'))
+        with LaserSpeed._speedcode_cache_lock:
+            cache[key] = entry
+            while len(cache) > SPEEDCODE_CACHE_ENTRIES:
+                cache.popitem(last=False)
+        return entry
+
     @staticmethod
     def get_speed_from_code(speed_code, board="M2", fix_speeds=False):
         """
@@ -130,8 +204,190 @@ class LaserSpeed:
         """
         code_value, accel, step_value, diagonal, raster_step, suffix_c = LaserSpeed.parse_speed_code(speed_code)
         b, m = LaserSpeed.get_equation(board, accel=accel, suffix_c=suffix_c, fix_speeds=fix_speeds)
+        table = LaserSpeed.get_speed_table(b, m)
+        if 0 <= code_value < len(table):
+            return table[code_value]
+        # Bugged negative speedcodes fall outside the table.
         return LaserSpeed.get_speed_from_value(code_value, b, m)
 
+    @staticmethod
+    def get_speed_table(b, m):
+        """
+        Gets the lookup table of speeds for the equation b, m. The code values within a speedcode are 16 bit,
+        so for any equation there are only 65537 achievable speeds, code values 0 to 65536.
+
+        The tables are calculated on first use and shared by all boards with that equation.
+
+        :param b: equation offset, from get_equation()
+        :param m: equation slope, from get_equation()
+        :return: array of speeds indexed by code value.
+        """
+        table = LaserSpeed._speed_tables.get((b, m))
+        if table is None:
+            table = array('d', [LaserSpeed.get_speed_from_value(v, b, m) for v in range(65537)])
+            LaserSpeed._speed_tables[(b, m)] = table
+        return table
+
+    @staticmethod
+    def get_codes_from_speeds(speeds,
+                              raster_step=0,
+                              board='M2',
+                              d_ratio=None,
+                              acceleration=None,
+                              suffix_c=None,
+                              fix_limit=False,
+                              fix_speeds=False,
+                              fix_lows=False,
+                              raster_horizontal=True):
+        """
+        Batch form of get_code_from_speed(). Takes a sequence of speeds and the same parameters, and gives
+        the list of speedcodes in the same order. The values are calculated with NumPy when it is available.
+
+        :return: list of speed codes produced.
+        """
+        try:
+            values = LaserSpeed._get_values_from_speeds(speeds, raster_step, board, d_ratio, acceleration,
+                                                        suffix_c, fix_limit, fix_speeds, fix_lows, raster_horizontal)
+        except ImportError:
+            return [LaserSpeed.get_code_from_speed(speed, raster_step, board, d_ratio, acceleration, suffix_c,
+                                                   fix_limit=fix_limit, fix_speeds=fix_speeds, fix_lows=fix_lows,
+                                                   raster_horizontal=raster_horizontal)
+                    for speed in speeds]
+        accels, suffixes, speed_values, step_values, diagonals = values[:5]
+        encode = LaserSpeed.encode_16bit
+        if raster_step != 0:
+            if isinstance(raster_step, tuple):
+                return ["V%s%1dG%03dG%03d" % (encode(v), a, raster_step[0], raster_step[1])
+                        for a, v in zip(accels, speed_values)]
+            return ["V%s%1dG%03d" % (encode(v), a, raster_step) for a, v in zip(accels, speed_values)]
+        codes = []
+        if step_values is None:
+            for a, c, v in zip(accels, suffixes, speed_values):
+                if c:
+                    codes.append("CV%s1C" % encode(v))
+                else:
+                    codes.append("CV%s%1d" % (encode(v), a))
+            return codes
+        for a, c, v, step, d in zip(accels, suffixes, speed_values, step_values, diagonals):
+            if c:
+                codes.append("CV%s1%03d%sC" % (encode(v), step, encode(d)))
+            else:
+                codes.append("CV%s%1d%03d%s" % (encode(v), a, step, encode(d)))
+        return codes
+
+    @staticmethod
+    def get_actual_speeds(speeds,
+                          raster_step=0,
+                          board='M2',
+                          d_ratio=None,
+                          acceleration=None,
+                          suffix_c=None,
+                          fix_limit=False,
+                          fix_speeds=False,
+                          fix_lows=False,
+                          raster_horizontal=True):
+        """
+        Gets the speeds actually achieved for a sequence of requested speeds. Takes the same parameters as
+        get_codes_from_speeds() and gives the speed get_speed_from_code() reads from each of those speedcodes,
+        after the speed value was truncated to an integer. The values are calculated with NumPy when it is
+        available.
+
+        :return: list of achieved speeds in mm/s.
+        """
+        try:
+            values = LaserSpeed._get_values_from_speeds(speeds, raster_step, board, d_ratio, acceleration,
+                                                        suffix_c, fix_limit, fix_speeds, fix_lows, raster_horizontal)
+        except ImportError:
+            codes = LaserSpeed.get_codes_from_speeds(speeds, raster_step, board, d_ratio, acceleration, suffix_c,
+                                                     fix_limit, fix_speeds, fix_lows, raster_horizontal)
+            return [LaserSpeed.get_speed_from_code(code, board, fix_speeds) for code in codes]
+        return values[5]
+
+    @staticmethod
+    def _get_values_from_speeds(speeds, raster_step, board, d_ratio, acceleration, suffix_c,
+                                fix_limit, fix_speeds, fix_lows, raster_horizontal):
+        """
+        Vectorized core of get_code_from_speed(). Mirrors the scalar calculation operation for operation so
+        the results are identical.
+
+        :return: accelerations, suffix_c flags, speed values, step values, diagonal values, achieved speeds.
+        Step and diagonal values are None when the codes have no diagonal part.
+        :raises ImportError: NumPy is not available.
+        """
+        import numpy as np
+        mm_per_second = np.array(speeds, dtype=np.float64).reshape(-1)
+        if d_ratio is None:
+            d_ratio = 0.261199033289
+        if not fix_limit and raster_step == 0:
+            mm_per_second = np.where(mm_per_second > 240, 19.05, mm_per_second)
+        if acceleration is None:
+            accel_speed = mm_per_second
+            if fix_speeds:
+                accel_speed = mm_per_second / 0.919493599053179
+            if raster_step != 0 and raster_horizontal:
+                accel = np.select([accel_speed <= 25.4, accel_speed <= 60, accel_speed < 127, accel_speed <= 320],
+                                  [1, 2, 2, 3], 4)
+            else:
+                accel = np.select([accel_speed <= 25.4, accel_speed <= 60, accel_speed < 127], [1, 2, 3], 4)
+        else:
+            accel = np.full(len(mm_per_second), acceleration)
+        if suffix_c is None:
+            if board in ('B2', 'M2'):
+                suffix = mm_per_second < 7
+            else:
+                suffix = np.zeros(len(mm_per_second), dtype=bool)
+        else:
+            suffix = np.full(len(mm_per_second), bool(suffix_c))
+
+        b = np.empty(len(mm_per_second))
+        m = np.empty(len(mm_per_second))
+        for a in np.unique(accel).tolist():
+            for c in (False, True):
+                mask = (accel == a) & (suffix == c)
+                b[mask], m[mask] = LaserSpeed.get_equation(board, accel=a, suffix_c=c, fix_speeds=fix_speeds)
+
+        with np.errstate(divide='ignore'):
+            frequency_kHz = mm_per_second / 25.4
+            period_in_ms = 1.0 / frequency_kHz
+            speed_value = np.where(frequency_kHz == 0, 65536 - b, 65536 - (m * period_in_ms + b))
+        speed_value = np.trunc(speed_value)
+        if fix_lows:
+            speed_value = np.where(speed_value < 0, 0, speed_value)
+
+        step_value = None
+        d_value = None
+        if raster_step == 0 and not (d_ratio == 0 or board in ('A', 'B', 'M')):
+            step_value = np.minimum(np.floor(mm_per_second) + 1, 128)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                period_in_ms = np.where(frequency_kHz == 0, 0, period_in_ms)
+                d_value = d_ratio * m * period_in_ms / step_value
+            if fix_lows:
+                d_value = np.clip(d_value, 0, 0xFFFF)
+            d_value = np.trunc(d_value).astype(np.int64).tolist()
+            step_value = step_value.astype(np.int64).tolist()
+
+        # Speedcodes with the C suffix are read back as acceleration 1. Rasters are written without the suffix.
+        if raster_step == 0:
+            read_accel = np.where(suffix, 1, accel)
+            read_suffix = suffix
+        else:
+            read_accel = accel
+            read_suffix = np.zeros(len(mm_per_second), dtype=bool)
+        read_b = np.empty(len(mm_per_second))
+        read_m = np.empty(len(mm_per_second))
+        for a in np.unique(read_accel).tolist():
+            for c in (False, True):
+                mask = (read_accel == a) & (read_suffix == c)
+                read_b[mask], read_m[mask] = LaserSpeed.get_equation(board, accel=a, suffix_c=c,
+                                                                     fix_speeds=fix_speeds)
+        code_value = 65536 - speed_value
+        with np.errstate(divide='ignore'):
+            period_in_ms = (code_value - read_b) / read_m
+            actual = np.where(period_in_ms == 0, 0, 25.4 * (1 / period_in_ms))
+
+        return (accel.astype(np.int64).tolist(), suffix.tolist(), speed_value.astype(np.int64).tolist(),
+                step_value, d_value, actual.tolist())
+
     @staticmethod
     def get_code_from_speed(mm_per_second,
                             raster_step=0,
@@ -1,3 +1,6 @@
+from collections import OrderedDict
+from threading import local
+
 from Kernel import *
 from LaserCommandConstants import *
 from LaserSpeed import LaserSpeed
@@ -20,6 +23,9 @@ STATE_DEFAULT = 0
 STATE_CONCAT = 1
 STATE_COMPACT = 2
 
+COMPILED_ENTRIES = 16  # Number of compiled operations kept for replay.
+REPLAY_CHUNK = 256  # Bytes written to the pipe per spooled replay command.
+
 distance_lookup = [
     b'',
     b'a', b'b', b'c', b'd', b'e', b'f', b'g', b'h', b'i', b'j', b'k', b'l', b'm',
@@ -50,6 +56,8 @@ class LhymicroInterpreter(Interpreter):
         self.device.setting(bool, "home_bottom", False)
         self.device.setting(int, "home_adjust_x", 0)
         self.device.setting(int, "home_adjust_y", 0)
+        self.device.setting(bool, "compile_operations", False)
+        self.device.setting(int, "write_flush_size", 1024)
 
         self.CODE_RIGHT = b'B'
         self.CODE_LEFT = b'T'
@@ -83,10 +91,67 @@ class LhymicroInterpreter(Interpreter):
         self.min_y = current_y
         self.start_x = current_x
         self.start_y = current_y
+        self.compiled = OrderedDict()
+        self.write_buffer = bytearray()  # Only touched by the thread running command().
+        self.dispatching = local()  # Flags the thread running command().
+        self.recording = None  # Bytes flushed while compiling an element.
+
+        self.command_handlers.update({
+            COMMAND_LASER_OFF: self.laser_off_command,
+            COMMAND_LASER_ON: self.laser_on_command,
+            COMMAND_RAPID_MOVE: self.rapid_move_command,
+            COMMAND_SHIFT: self.shift_command,
+            COMMAND_MOVE: self.move_command,
+            COMMAND_CUT: self.cut_command,
+            COMMAND_HSTEP: self.hstep_command,
+            COMMAND_VSTEP: self.vstep_command,
+            COMMAND_HOME: self.home_command,
+            COMMAND_LOCK: self.lock_command,
+            COMMAND_UNLOCK: self.unlock_command,
+            COMMAND_PLOT: self.plot_command,
+            COMMAND_RASTER: self.raster_command,
+            COMMAND_CUT_QUAD: self.cut_quad_command,
+            COMMAND_CUT_CUBIC: self.cut_cubic_command,
+            COMMAND_SET_SPEED: self.set_speed_command,
+            COMMAND_SET_POWER: self.set_power_command,
+            COMMAND_SET_STEP: self.set_step_command,
+            COMMAND_SET_D_RATIO: self.set_d_ratio_command,
+            COMMAND_SET_DIRECTION: self.set_direction_command,
+            COMMAND_SET_INCREMENTAL: self.set_incremental_command,
+            COMMAND_SET_ABSOLUTE: self.set_absolute_command,
+            COMMAND_SET_POSITION: self.set_position_command,
+            COMMAND_MODE_COMPACT: self.mode_compact_command,
+            COMMAND_MODE_DEFAULT: self.mode_default_command,
+            COMMAND_MODE_CONCAT: self.mode_concat_command,
+            COMMAND_WAIT: self.wait_command,
+            COMMAND_WAIT_BUFFER_EMPTY: self.wait_buffer_empty_command,
+            COMMAND_BEEP: self.beep_command,
+            COMMAND_FUNCTION: self.function_command,
+            COMMAND_SIGNAL: self.signal_command,
+            COMMAND_CLOSE: self.close_command,
+            COMMAND_OPEN: self.open_command,
+            COMMAND_RESET: self.reset_command,
+            COMMAND_PAUSE: self.pause_command,
+            COMMAND_STATUS: self.status_command,
+            COMMAND_RESUME: self.resume_command,
+        })
+        self.realtime_fallback = False  # Spooled commands are not performed in realtime.
+        self.realtime_handlers.update({
+            COMMAND_SET_SPEED: self.set_speed_command,
+            COMMAND_SET_POWER: self.set_power_command,
+            COMMAND_SET_STEP: self.set_step_command,
+            COMMAND_SET_D_RATIO: self.set_d_ratio_command,
+            COMMAND_SET_POSITION: self.set_position_command,
+            COMMAND_RESET: self.reset_command,
+            COMMAND_PAUSE: self.pause_command,
+            COMMAND_STATUS: self.status_command,
+            COMMAND_RESUME: self.realtime_resume_command,
+        })
 
         device.add_control("Realtime Pause", self.pause)
         device.add_control("Realtime Resume", self.resume)
         device.add_control("Update Codes", self.update_codes)
+        device.add_control("Clear Compiled", self.compiled.clear)
 
     def __repr__(self):
         return "LhymicroInterpreter()"
@@ -111,8 +176,101 @@ class LhymicroInterpreter(Interpreter):
             self.CODE_TOP = self.CODE_BOTTOM
             self.CODE_BOTTOM = q
 
+    def snapshot(self):
+        """Returns the state of the interpreter and device position, everything the written bytes depend on."""
+        return (self.state, self.properties, self.is_relative, self.is_on, self.raster_step, self.speed, self.power,
+                self.d_ratio, self.acceleration, self.pulse_total, self.pulse_modulation, self.group_modulation,
+                self.device.current_x, self.device.current_y)
+
+    def restore(self, snapshot):
+        (self.state, self.properties, self.is_relative, self.is_on, self.raster_step, self.speed, self.power,
+         self.d_ratio, self.acceleration, self.pulse_total, self.pulse_modulation, self.group_modulation,
+         self.device.current_x, self.device.current_y) = snapshot
+        self.check_bounds()
+        self.device.signal('interpreter;mode', self.state)
+        self.device.signal('interpreter;position', (self.device.current_x, self.device.current_y,
+                                                    self.device.current_x, self.device.current_y))
+
+    def spool(self, element, generate):
+        """
+        With compile_operations set, elements with a fingerprint() are compiled. The bytes written the first time
+        the element is spooled are recorded, and when the same element is spooled again from the same interpreter
+        state with the same device settings the recorded bytes are written directly to the pipe.
+
+        Any change to the elements, their transforms or the operation and device settings changes the key, so the
+        stale entry is not used and is eventually evicted.
+        """
+        self.recording = None  # Ends any recording left by an element abandoned part way.
+        if not self.device.compile_operations:
+            return generate
+        try:
+            fingerprint = element.fingerprint()
+        except AttributeError:
+            return generate
+        device = self.device
+        key = (fingerprint, device.board, device.swap_xy, device.flip_x, device.flip_y, device.autolock,
+               self.snapshot())
+        compiled = self.compiled.get(key)
+        if compiled is None:
+            return lambda: self.record(key, element, generate)
+        self.compiled.move_to_end(key)
+        return lambda: self.replay(compiled)
+
+    def record(self, key, element, generate):
+        """
+        Records the bytes the commands of the element flush to the pipe. Direct and realtime writes are not part of
+        the spooled stream and are not recorded.
+        """
+        recording = self.recording = bytearray()
+        try:
+            for e in generate():
+                yield e
+            # Only completed runs are kept. The element is held so ids within the fingerprint stay unique.
+            self.compiled[key] = (bytes(recording), self.snapshot(), list(element))
+            while len(self.compiled) > COMPILED_ENTRIES:
+                self.compiled.popitem(last=False)
+        finally:
+            if self.recording is recording:
+                self.recording = None
+
+    def replay(self, compiled):
+        data, snapshot, elements = compiled
+
+        def write(chunk):
+            return lambda: self.write(chunk)
+
+        for i in range(0, len(data), REPLAY_CHUNK):
+            yield COMMAND_FUNCTION, write(data[i:i + REPLAY_CHUNK])
+        yield COMMAND_FUNCTION, lambda: self.restore(snapshot)
+
+    def write(self, bytes_to_write):
+        """
+        Writes made by command() are buffered and sent to the pipe in chunks of write_flush_size or when the
+        command is done. Anything else, realtime commands and direct calls such as jogging from the GUI thread,
+        goes straight to the pipe, so nothing is left waiting in the buffer or taken from another thread.
+        """
+        if not getattr(self.dispatching, 'active', False):
+            self.bytes_written += len(bytes_to_write)
+            self.device.pipe.write(bytes(bytes_to_write))
+            return
+        self.write_buffer += bytes_to_write
+        if len(self.write_buffer) >= self.device.write_flush_size:
+            self.flush()
+
+    def flush(self):
+        if len(self.write_buffer) == 0 or not getattr(self.dispatching, 'active', False):
+            return
+        data = self.write_buffer
+        self.write_buffer = bytearray()
+        self.bytes_written += len(data)
+        if self.recording is not None:
+            self.recording += data
+        self.device.pipe.write(bytes(data))
+
     def on_plot(self, x, y, on):
-        self.device.signal('interpreter;plot', (x, y, on))
+        self.device.lazy_signal('interpreter;plot', lambda: (x, y, on))
+        if self.device.hold_condition(0):
+            self.flush()  # Buffered bytes must reach the pipe before waiting on it.
         self.device.hold()
 
     def ungroup_plots(self, generate):
@@ -195,254 +353,374 @@ class LhymicroInterpreter(Interpreter):
         yield last_x, last_y, last_on
         self.on_plot(last_x, last_y, last_on)
 
+    def group_runs(self, start_x, start_y, generate):
+        """
+        Groups plotted runs, as RasterPlotter.plot() and Line.plot_line_runs() give them, without exploding them
+        into single pixels.
+
+        Each event (x, y, value) ends a run which starts after the previous event, the first event is a single
+        pixel. The result, the pulse_total and the on_plot() calls are identical to
+        group_plots(start_x, start_y, ungroup_plots(generate)). Units within a run that the pulse modulation
+        decides in closed form are consumed at once: blank units with the pulse below threshold, and units at or
+        above full power while the pulse arithmetic is exact. Other units are modulated one at a time, only the
+        changes are yielded.
+        """
+        last_x = start_x
+        last_y = start_y
+        last_on = 0
+        dx = 0
+        dy = 0
+        current_x = None
+        current_y = None
+        for next_x, next_y, plot_on in generate:
+            if current_x is None or current_y is None:
+                # The first event is a single pixel.
+                ux = next_x - start_x
+                uy = next_y - start_y
+                current_x = start_x
+                current_y = start_y
+                count = 1
+            else:
+                total_dx = next_x - current_x
+                total_dy = next_y - current_y
+                ux = (total_dx > 0) - (total_dx < 0)
+                uy = (total_dy > 0) - (total_dy < 0)
+                if total_dy * ux != total_dx * uy:
+                    raise ValueError("Must be uniformly diagonal or orthogonal: (%d, %d) is not."
+                                     % (total_dx, total_dy))
+                count = max(abs(total_dx), abs(total_dy))
+            pulse = self.power * plot_on
+            while count > 0:
+                grouped = self.group_modulation and last_on == 1
+                if not self.pulse_modulation:
+                    on = int(round(plot_on))
+                    units = count
+                elif pulse == 0 and self.pulse_total < 1000.0 and not grouped:
+                    # Adding nothing, the pulse stays below the threshold for every unit.
+                    on = 0
+                    units = count
+                elif pulse >= 1000.0 and float(pulse).is_integer() and float(self.pulse_total).is_integer() and \
+                        (self.pulse_total + pulse > 0.0 if grouped else self.pulse_total + pulse >= 1000.0):
+                    # Integer pulses are exact, at full power every unit triggers and the total never drops.
+                    on = 1
+                    units = count
+                    self.pulse_total += units * (pulse - 1000.0)
+                else:
+                    self.pulse_total += pulse
+                    if grouped:
+                        if self.pulse_total > 0.0:
+                            on = 1
+                            self.pulse_total -= 1000.0
+                        else:
+                            on = 0
+                    else:
+                        if self.pulse_total >= 1000.0:
+                            on = 1
+                            self.pulse_total -= 1000.0
+                        else:
+                            on = 0
+                    units = 1
+                x = current_x + ux
+                y = current_y + uy
+                current_x += ux * units
+                current_y += uy * units
+                count -= units
+                if x == last_x + dx and y == last_y + dy and on == last_on:
+                    last_x = current_x
+                    last_y = current_y
+                    continue
+                yield last_x, last_y, last_on
+                self.on_plot(last_x, last_y, last_on)
+                dx = x - last_x
+                dy = y - last_y
+                if abs(dx) > 1 or abs(dy) > 1:
+                    raise ValueError("dx(%d) or dy(%d) exceeds 1" % (dx, dy))
+                last_x = x
+                last_y = y
+                last_on = on
+                if units > 1:
+                    if dx != ux or dy != uy:
+                        # The rest of the units turn from the first.
+                        yield last_x, last_y, last_on
+                        self.on_plot(last_x, last_y, last_on)
+                        dx = ux
+                        dy = uy
+                    last_x = current_x
+                    last_y = current_y
+        yield last_x, last_y, last_on
+        self.on_plot(last_x, last_y, last_on)
+
     def command(self, command, values=None):
-        if command == COMMAND_LASER_OFF:
-            self.up()
-        elif command == COMMAND_LASER_ON:
-            self.down()
-        elif command == COMMAND_RAPID_MOVE:
-            self.to_default_mode()
-            x, y = values
+        dispatching = self.dispatching
+        nested = getattr(dispatching, 'active', False)
+        dispatching.active = True
+        try:
+            return Interpreter.command(self, command, values)
+        finally:
+            self.flush()
+            dispatching.active = nested
+
+    def laser_off_command(self, values):
+        self.up()
+
+    def laser_on_command(self, values):
+        self.down()
+
+    def rapid_move_command(self, values):
+        self.to_default_mode()
+        x, y = values
+        self.move(x, y)
+
+    def shift_command(self, values):
+        x, y = values
+        sx = self.device.current_x
+        sy = self.device.current_y
+        self.up()
+        self.pulse_modulation = False
+        if self.state == STATE_COMPACT:
+            for x, y, on in self.group_runs(sx, sy, Line.plot_line_runs(sx, sy, x, y)):
+                self.move(x, y)
+        else:
             self.move(x, y)
-        elif command == COMMAND_SHIFT:
-            x, y = values
-            sx = self.device.current_x
-            sy = self.device.current_y
-            self.up()
-            self.pulse_modulation = False
-            if self.state == STATE_COMPACT:
-                for x, y, on in self.group_plots(sx, sy, Line.plot_line(sx, sy, x, y)):
-                    self.move(x, y)
-            else:
+
+    def move_command(self, values):
+        x, y = values
+        sx = self.device.current_x
+        sy = self.device.current_y
+        self.pulse_modulation = self.is_on
+
+        if self.state == STATE_COMPACT:
+            for x, y, on in self.group_runs(sx, sy, Line.plot_line_runs(sx, sy, x, y)):
                 self.move(x, y)
-        elif command == COMMAND_MOVE:
-            x, y = values
-            sx = self.device.current_x
-            sy = self.device.current_y
-            self.pulse_modulation = self.is_on
-
-            if self.state == STATE_COMPACT:
-                for x, y, on in self.group_plots(sx, sy, Line.plot_line(sx, sy, x, y)):
-                    self.move(x, y)
+        else:
+            self.move(x, y)
+
+    def cut_command(self, values):
+        x, y = values
+        sx = self.device.current_x
+        sy = self.device.current_y
+        self.pulse_modulation = True
+        for x, y, on in self.group_runs(sx, sy, Line.plot_line_runs(sx, sy, x, y)):
+            if on == 0:
+                self.up()
             else:
-                self.move(x, y)
-        elif command == COMMAND_CUT:
-            x, y = values
-            sx = self.device.current_x
-            sy = self.device.current_y
-            self.pulse_modulation = True
-            for x, y, on in self.group_plots(sx, sy, Line.plot_line(sx, sy, x, y)):
+                self.down()
+            self.move(x, y)
+
+    def hstep_command(self, values):
+        self.v_switch()
+
+    def vstep_command(self, values):
+        self.h_switch()
+
+    def home_command(self, values):
+        self.home()
+
+    def lock_command(self, values):
+        self.lock_rail()
+
+    def unlock_command(self, values):
+        self.unlock_rail()
+
+    def plot_command(self, values):
+        path = values
+        if len(path) == 0:
+            return
+        first_point = path.first_point
+        self.move_absolute(first_point[0], first_point[1])
+        sx = self.device.current_x
+        sy = self.device.current_y
+        self.pulse_modulation = True
+        try:
+            for x, y, on in self.group_plots(sx, sy, path.plot()):
                 if on == 0:
                     self.up()
                 else:
                     self.down()
-                self.move(x, y)
-        elif command == COMMAND_HSTEP:
-            self.v_switch()
-        elif command == COMMAND_VSTEP:
-            self.h_switch()
-        elif command == COMMAND_HOME:
-            self.home()
-        elif command == COMMAND_LOCK:
-            self.lock_rail()
-        elif command == COMMAND_UNLOCK:
-            self.unlock_rail()
-        elif command == COMMAND_PLOT:
-            path = values
-            if len(path) == 0:
-                return
-            first_point = path.first_point
-            self.move_absolute(first_point[0], first_point[1])
-            sx = self.device.current_x
-            sy = self.device.current_y
-            self.pulse_modulation = True
-            try:
-                for x, y, on in self.group_plots(sx, sy, path.plot()):
+                self.move_absolute(x, y)
+        except RuntimeError:
+            return
+
+    def raster_command(self, values):
+        raster = values
+        sx = self.device.current_x
+        sy = self.device.current_y
+        self.pulse_modulation = True
+        try:
+            for e in self.group_runs(sx, sy, raster.plot()):
+                x, y, on = e
+                dx = x - sx
+                dy = y - sy
+                sx = x
+                sy = y
+
+                if self.is_prop(DIRECTION_FLAG_X) and dy != 0:
+                    if self.is_prop(DIRECTION_FLAG_TOP):
+                        if abs(dy) > self.raster_step:
+                            self.to_concat_mode()
+                            self.move_relative(0, dy + self.raster_step)
+                            self.set_prop(DIRECTION_FLAG_X)
+                            self.unset_prop(DIRECTION_FLAG_Y)
+                            self.to_compact_mode()
+                        self.h_switch()
+                    else:
+                        if abs(dy) > self.raster_step:
+                            self.to_concat_mode()
+                            self.move_relative(0, dy - self.raster_step)
+                            self.set_prop(DIRECTION_FLAG_X)
+                            self.unset_prop(DIRECTION_FLAG_Y)
+                            self.to_compact_mode()
+                        self.h_switch()
+                elif self.is_prop(DIRECTION_FLAG_Y) and dx != 0:
+                    if self.is_prop(DIRECTION_FLAG_LEFT):
+                        if abs(dx) > self.raster_step:
+                            self.to_concat_mode()
+                            self.move_relative(dx + self.raster_step, 0)
+                            self.set_prop(DIRECTION_FLAG_Y)
+                            self.unset_prop(DIRECTION_FLAG_X)
+                            self.to_compact_mode()
+                        self.v_switch()
+                    else:
+                        if abs(dx) > self.raster_step:
+                            self.to_concat_mode()
+                            self.move_relative(dx - self.raster_step, 0)
+                            self.set_prop(DIRECTION_FLAG_Y)
+                            self.unset_prop(DIRECTION_FLAG_X)
+                            self.to_compact_mode()
+                        self.v_switch()
+                else:
                     if on == 0:
                         self.up()
                     else:
                         self.down()
-                    self.move_absolute(x, y)
-            except RuntimeError:
-                return
-        elif command == COMMAND_RASTER:
-            raster = values
-            sx = self.device.current_x
-            sy = self.device.current_y
-            self.pulse_modulation = True
-            try:
-                for e in self.group_plots(sx, sy, self.ungroup_plots(raster.plot())):
-                    x, y, on = e
-                    dx = x - sx
-                    dy = y - sy
-                    sx = x
-                    sy = y
-
-                    if self.is_prop(DIRECTION_FLAG_X) and dy != 0:
-                        if self.is_prop(DIRECTION_FLAG_TOP):
-                            if abs(dy) > self.raster_step:
-                                self.to_concat_mode()
-                                self.move_relative(0, dy + self.raster_step)
-                                self.set_prop(DIRECTION_FLAG_X)
-                                self.unset_prop(DIRECTION_FLAG_Y)
-                                self.to_compact_mode()
-                            self.h_switch()
-                        else:
-                            if abs(dy) > self.raster_step:
-                                self.to_concat_mode()
-                                self.move_relative(0, dy - self.raster_step)
-                                self.set_prop(DIRECTION_FLAG_X)
-                                self.unset_prop(DIRECTION_FLAG_Y)
-                                self.to_compact_mode()
-                            self.h_switch()
-                    elif self.is_prop(DIRECTION_FLAG_Y) and dx != 0:
-                        if self.is_prop(DIRECTION_FLAG_LEFT):
-                            if abs(dx) > self.raster_step:
-                                self.to_concat_mode()
-                                self.move_relative(dx + self.raster_step, 0)
-                                self.set_prop(DIRECTION_FLAG_Y)
-                                self.unset_prop(DIRECTION_FLAG_X)
-                                self.to_compact_mode()
-                            self.v_switch()
-                        else:
-                            if abs(dx) > self.raster_step:
-                                self.to_concat_mode()
-                                self.move_relative(dx - self.raster_step, 0)
-                                self.set_prop(DIRECTION_FLAG_Y)
-                                self.unset_prop(DIRECTION_FLAG_X)
-                                self.to_compact_mode()
-                            self.v_switch()
-                    else:
-                        if on == 0:
-                            self.up()
-                        else:
-                            self.down()
-                        self.move_relative(dx, dy)
-            except RuntimeError:
-                return
-        elif command == COMMAND_CUT_QUAD:
-            cx, cy, x, y, = values
-            sx = self.device.current_x
-            sy = self.device.current_y
-            self.pulse_modulation = True
-            for x, y, on in self.group_plots(sx, sy, QuadraticBezier.plot_quad_bezier(sx, sy, cx, cy, x, y)):
-                if on == 0:
-                    self.up()
-                else:
-                    self.down()
-                self.move_absolute(x, y)
-        elif command == COMMAND_CUT_CUBIC:
-            c1x, c1y, c2x, c2y, ex, ey = values
-            sx = self.device.current_x
-            sy = self.device.current_y
-            self.pulse_modulation = True
-            for x, y, on in self.group_plots(sx, sy, CubicBezier.plot_cubic_bezier(sx, sy, c1x, c1y, c2x, c2y, ex, ey)):
-                if on == 0:
-                    self.up()
-                else:
-                    self.down()
-                self.move_absolute(x, y)
-        elif command == COMMAND_SET_SPEED:
-            speed = values
-            self.set_speed(speed)
-        elif command == COMMAND_SET_POWER:
-            power = values
-            self.set_power(power)
-        elif command == COMMAND_SET_STEP:
-            step = values
-            self.set_step(step)
-        elif command == COMMAND_SET_D_RATIO:
-            d_ratio = values
-            self.set_d_ratio(d_ratio)
-        elif command == COMMAND_SET_DIRECTION:
-            # Left, Top, X-Momentum, Y-Momentum
-            left, top, x_dir, y_dir = values
-            self.properties = 0
-            if left:
-                self.set_prop(DIRECTION_FLAG_LEFT)
-            if top:
-                self.set_prop(DIRECTION_FLAG_TOP)
-            if x_dir:
-                self.set_prop(DIRECTION_FLAG_X)
-            if y_dir:
-                self.set_prop(DIRECTION_FLAG_Y)
-        elif command == COMMAND_SET_INCREMENTAL:
-            self.is_relative = True
-        elif command == COMMAND_SET_ABSOLUTE:
-            self.is_relative = False
-        elif command == COMMAND_SET_POSITION:
-            x, y = values
-            self.device.current_x = x
-            self.device.current_y = y
-        elif command == COMMAND_MODE_COMPACT:
-            self.to_compact_mode()
-        elif command == COMMAND_MODE_DEFAULT:
-            self.to_default_mode()
-        elif command == COMMAND_MODE_CONCAT:
-            self.to_concat_mode()
-        elif command == COMMAND_WAIT:
-            t = values
-            time.sleep(t)
-        elif command == COMMAND_WAIT_BUFFER_EMPTY:
-            while len(self.device.pipe) > 0:
-                time.sleep(0.05)
-        elif command == COMMAND_BEEP:
-            print('\a')  # Beep.
-        elif command == COMMAND_FUNCTION:
-            t = values
-            if callable(t):
-                t()
-        elif command == COMMAND_SIGNAL:
-            if isinstance(values, str):
-                self.device.signal(values, None)
-            elif len(values) >= 2:
-                self.device.signal(values[0], *values[1:])
-        elif command == COMMAND_CLOSE:
-            self.to_default_mode()
-        elif command == COMMAND_OPEN:
-            self.reset_modes()
-            self.state = STATE_DEFAULT
-            self.device.signal('interpreter;mode', self.state)
-        elif command == COMMAND_RESET:
-            self.device.pipe.realtime_write(b'I*\n')
-            self.state = STATE_DEFAULT
-            self.device.signal('interpreter;mode', self.state)
-        elif command == COMMAND_PAUSE:
-            self.pause()
-        elif command == COMMAND_STATUS:
-            self.device.signal("interpreter;status", self.get_status())
-        elif command == COMMAND_RESUME:
-            pass  # This command can't be processed since we should be paused.
-
-    def realtime_command(self, command, values=None):
-        if command == COMMAND_SET_SPEED:
-            speed = values
-            self.set_speed(speed)
-        elif command == COMMAND_SET_POWER:
-            power = values
-            self.set_power(power)
-        elif command == COMMAND_SET_STEP:
-            step = values
-            self.set_step(step)
-        elif command == COMMAND_SET_D_RATIO:
-            d_ratio = values
-            self.set_d_ratio(d_ratio)
-        elif command == COMMAND_SET_POSITION:
-            x, y = values
-            self.device.current_x = x
-            self.device.current_y = y
-        elif command == COMMAND_RESET:
-            self.device.pipe.realtime_write(b'I*\n')
-            self.state = STATE_DEFAULT
-            self.device.signal('interpreter;mode', self.state)
-        elif command == COMMAND_PAUSE:
-            self.pause()
-        elif command == COMMAND_STATUS:
-            status = self.get_status()
-            self.device.signal('interpreter;status', status)
-            return status
-        elif command == COMMAND_RESUME:
-            self.resume()
+                    self.move_relative(dx, dy)
+        except RuntimeError:
+            return
+
+    def cut_quad_command(self, values):
+        cx, cy, x, y, = values
+        sx = self.device.current_x
+        sy = self.device.current_y
+        self.pulse_modulation = True
+        for x, y, on in self.group_plots(sx, sy, QuadraticBezier.plot_quad_bezier(sx, sy, cx, cy, x, y)):
+            if on == 0:
+                self.up()
+            else:
+                self.down()
+            self.move_absolute(x, y)
+
+    def cut_cubic_command(self, values):
+        c1x, c1y, c2x, c2y, ex, ey = values
+        sx = self.device.current_x
+        sy = self.device.current_y
+        self.pulse_modulation = True
+        for x, y, on in self.group_plots(sx, sy, CubicBezier.plot_cubic_bezier(sx, sy, c1x, c1y, c2x, c2y, ex, ey)):
+            if on == 0:
+                self.up()
+            else:
+                self.down()
+            self.move_absolute(x, y)
+
+    def set_speed_command(self, values):
+        speed = values
+        self.set_speed(speed)
+
+    def set_power_command(self, values):
+        power = values
+        self.set_power(power)
+
+    def set_step_command(self, values):
+        step = values
+        self.set_step(step)
+
+    def set_d_ratio_command(self, values):
+        d_ratio = values
+        self.set_d_ratio(d_ratio)
+
+    def set_direction_command(self, values):
+        # Left, Top, X-Momentum, Y-Momentum
+        left, top, x_dir, y_dir = values
+        self.properties = 0
+        if left:
+            self.set_prop(DIRECTION_FLAG_LEFT)
+        if top:
+            self.set_prop(DIRECTION_FLAG_TOP)
+        if x_dir:
+            self.set_prop(DIRECTION_FLAG_X)
+        if y_dir:
+            self.set_prop(DIRECTION_FLAG_Y)
+
+    def set_incremental_command(self, values):
+        self.is_relative = True
+
+    def set_absolute_command(self, values):
+        self.is_relative = False
+
+    def set_position_command(self, values):
+        x, y = values
+        self.device.current_x = x
+        self.device.current_y = y
+
+    def mode_compact_command(self, values):
+        self.to_compact_mode()
+
+    def mode_default_command(self, values):
+        self.to_default_mode()
+
+    def mode_concat_command(self, values):
+        self.to_concat_mode()
+
+    def wait_command(self, values):
+        t = values
+        self.flush()
+        time.sleep(t)
+
+    def wait_buffer_empty_command(self, values):
+        self.flush()
+        while len(self.device.pipe) > 0:
+            time.sleep(0.05)
+
+    def beep_command(self, values):
+        print('\a')  # Beep.
+
+    def function_command(self, values):
+        t = values
+        if callable(t):
+            self.flush()
+            t()
+
+    def signal_command(self, values):
+        if isinstance(values, str):
+            self.device.signal(values, None)
+        elif len(values) >= 2:
+            self.device.signal(values[0], *values[1:])
+
+    def close_command(self, values):
+        self.to_default_mode()
+
+    def open_command(self, values):
+        self.reset_modes()
+        self.state = STATE_DEFAULT
+        self.device.signal('interpreter;mode', self.state)
+
+    def reset_command(self, values):
+        self.device.pipe.realtime_write(b'I*\n')
+        self.state = STATE_DEFAULT
+        self.device.signal('interpreter;mode', self.state)
+
+    def pause_command(self, values):
+        self.pause()
+
+    def status_command(self, values):
+        status = self.get_status()
+        self.device.signal('interpreter;status', status)
+        return status
+
+    def resume_command(self, values):
+        pass  # This command can't be processed since we should be paused.
+
+    def realtime_resume_command(self, values):
+        self.resume()
 
     def get_status(self):
         parts = list()
@@ -489,20 +767,21 @@ class LhymicroInterpreter(Interpreter):
         dx = int(round(dx))
         dy = int(round(dy))
         if self.state == STATE_DEFAULT:
-            self.device.pipe.write(b'I')
+            self.write(b'I')
             if dx != 0:
                 self.move_x(dx)
             if dy != 0:
                 self.move_y(dy)
-            self.device.pipe.write(b'S1P\n')
+            self.write(b'S1P\n')
             if not self.device.autolock:
-                self.device.pipe.write(b'IS2P\n')
+                self.write(b'IS2P\n')
         elif self.state == STATE_COMPACT:
             if dx != 0 and dy != 0 and abs(dx) != abs(dy):
-                for x, y, on in self.group_plots(self.device.current_x, self.device.current_y,
-                                                 Line.plot_line(self.device.current_x, self.device.current_y,
-                                                                self.device.current_x + dx, self.device.current_y + dy)
-                                                 ):
+                for x, y, on in self.group_runs(self.device.current_x, self.device.current_y,
+                                                Line.plot_line_runs(self.device.current_x, self.device.current_y,
+                                                                    self.device.current_x + dx,
+                                                                    self.device.current_y + dy)
+                                                ):
                     self.move_absolute(x, y)
             elif abs(dx) == abs(dy):
                 self.move_angle(dx, dy)
@@ -515,10 +794,11 @@ class LhymicroInterpreter(Interpreter):
                 self.move_x(dx)
             if dy != 0:
                 self.move_y(dy)
-            self.device.pipe.write(b'N')
+            self.write(b'N')
         self.check_bounds()
-        self.device.signal('interpreter;position', (self.device.current_x, self.device.current_y,
-                                                    self.device.current_x - dx, self.device.current_y - dy))
+        x = self.device.current_x
+        y = self.device.current_y
+        self.device.lazy_signal('interpreter;position', lambda: (x, y, x - dx, y - dy))
 
     def move_xy_line(self, delta_x, delta_y):
         """Strictly speaking if this happens it is because of a bug.
@@ -616,91 +896,82 @@ class LhymicroInterpreter(Interpreter):
     def down(self):
         if self.is_on:
             return False
-        controller = self.device.pipe
         if self.state == STATE_DEFAULT:
-            controller.write(b'I')
-            controller.write(self.CODE_ON)
-            controller.write(b'S1P\n')
+            self.write(b'I')
+            self.write(self.CODE_ON)
+            self.write(b'S1P\n')
             if not self.device.autolock:
-                controller.write(b'IS2P\n')
+                self.write(b'IS2P\n')
         elif self.state == STATE_COMPACT:
-            controller.write(self.CODE_ON)
+            self.write(self.CODE_ON)
         elif self.state == STATE_CONCAT:
-            controller.write(self.CODE_ON)
-            controller.write(b'N')
+            self.write(self.CODE_ON)
+            self.write(b'N')
         self.is_on = True
         return True
 
     def up(self):
-        controller = self.device.pipe
         if not self.is_on:
             return False
         if self.state == STATE_DEFAULT:
-            controller.write(b'I')
-            controller.write(self.CODE_OFF)
-            controller.write(b'S1P\n')
+            self.write(b'I')
+            self.write(self.CODE_OFF)
+            self.write(b'S1P\n')
             if not self.device.autolock:
-                controller.write(b'IS2P\n')
+                self.write(b'IS2P\n')
         elif self.state == STATE_COMPACT:
-            controller.write(self.CODE_OFF)
+            self.write(self.CODE_OFF)
         elif self.state == STATE_CONCAT:
-            controller.write(self.CODE_OFF)
-            controller.write(b'N')
+            self.write(self.CODE_OFF)
+            self.write(b'N')
         self.is_on = False
         return True
 
     def to_default_mode(self):
-        controller = self.device.pipe
         if self.state == STATE_CONCAT:
-            controller.write(b'S1P\n')
+            self.write(b'S1P\n')
             if not self.device.autolock:
-                controller.write(b'IS2P\n')
+                self.write(b'IS2P\n')
         elif self.state == STATE_COMPACT:
-            controller.write(b'FNSE-\n')
+            self.write(b'FNSE-\n')
             self.reset_modes()
+        self.flush()
         self.state = STATE_DEFAULT
         self.device.signal('interpreter;mode', self.state)
 
     def to_concat_mode(self):
-        controller = self.device.pipe
         if self.state == STATE_COMPACT:
-            controller.write(b'@NSE')
+            self.write(b'@NSE')
             self.reset_modes()
         elif self.state == STATE_DEFAULT:
-            controller.write(b'I')
+            self.write(b'I')
         self.state = STATE_CONCAT
         self.device.signal('interpreter;mode', self.state)
 
     def to_compact_mode(self):
-        controller = self.device.pipe
         self.to_concat_mode()
-        speed_code = LaserSpeed(
-            self.device.board,
+        speed_code = LaserSpeed.get_encoded_code_from_speed(
             self.speed,
             self.raster_step,
+            self.device.board,
             d_ratio=self.d_ratio,
             fix_limit=True,
             fix_lows=True,
             fix_speeds=False,
-            raster_horizontal=True).speedcode
-        try:
-            speed_code = bytes(speed_code)
-        except TypeError:
-            speed_code = bytes(speed_code, 'utf8')
-        controller.write(speed_code)
-        controller.write(b'N')
+            raster_horizontal=True)
+        self.write(speed_code)
+        self.write(b'N')
         self.declare_directions()
-        controller.write(b'S1E')
+        self.write(b'S1E')
         self.state = STATE_COMPACT
         self.device.signal('interpreter;mode', self.state)
 
     def h_switch(self):
-        controller = self.device.pipe
         if self.is_prop(DIRECTION_FLAG_LEFT):
-            controller.write(self.CODE_RIGHT)
+            self.write(self.CODE_RIGHT)
             self.unset_prop(DIRECTION_FLAG_LEFT)
         else:
-            controller.write(self.CODE_LEFT)
+            self.write(self.CODE_LEFT)
             self.set_prop(DIRECTION_FLAG_LEFT)
         if self.is_prop(DIRECTION_FLAG_TOP):
             self.device.current_y -= self.raster_step
@@ -709,12 +980,11 @@ class LhymicroInterpreter(Interpreter):
         self.is_on = False
 
     def v_switch(self):
-        controller = self.device.pipe
         if self.is_prop(DIRECTION_FLAG_TOP):
-            controller.write(self.CODE_BOTTOM)
+            self.write(self.CODE_BOTTOM)
             self.unset_prop(DIRECTION_FLAG_TOP)
         else:
-            controller.write(self.CODE_TOP)
+            self.write(self.CODE_TOP)
             self.set_prop(DIRECTION_FLAG_TOP)
         if self.is_prop(DIRECTION_FLAG_LEFT):
             self.device.current_x -= self.raster_step
@@ -733,9 +1003,8 @@ class LhymicroInterpreter(Interpreter):
 
     def home(self):
         x, y = self.calc_home_position()
-        controller = self.device.pipe
         self.to_default_mode()
-        controller.write(b'IPP\n')
+        self.write(b'IPP\n')
         old_x = self.device.current_x
         old_y = self.device.current_y
         self.device.current_x = x
@@ -755,18 +1024,15 @@ class LhymicroInterpreter(Interpreter):
         self.device.signal('interpreter;position', (self.device.current_x, self.device.current_y, old_x, old_y))
 
     def lock_rail(self):
-        controller = self.device.pipe
         self.to_default_mode()
-        controller.write(b'IS1P\n')
+        self.write(b'IS1P\n')
 
     def unlock_rail(self, abort=False):
-        controller = self.device.pipe
         self.to_default_mode()
-        controller.write(b'IS2P\n')
+        self.write(b'IS2P\n')
 
     def abort(self):
-        controller = self.device.pipe
-        controller.write(b'I\n')
+        self.write(b'I\n')
 
     def check_bounds(self):
         self.min_x = min(self.min_x, self.device.current_x)
@@ -791,36 +1057,34 @@ class LhymicroInterpreter(Interpreter):
             self.move_top(dy)
 
     def move_angle(self, dx, dy):
-        controller = self.device.pipe
         if abs(dx) != abs(dy):
             raise ValueError('abs(dx) must equal abs(dy)')
         self.set_prop(DIRECTION_FLAG_X)  # Set both on
         self.set_prop(DIRECTION_FLAG_Y)
         if dx > 0:  # Moving right
             if self.is_prop(DIRECTION_FLAG_LEFT):
-                controller.write(self.CODE_RIGHT)
+                self.write(self.CODE_RIGHT)
                 self.unset_prop(DIRECTION_FLAG_LEFT)
         else:  # Moving left
             if not self.is_prop(DIRECTION_FLAG_LEFT):
-                controller.write(self.CODE_LEFT)
+                self.write(self.CODE_LEFT)
                 self.set_prop(DIRECTION_FLAG_LEFT)
         if dy > 0:  # Moving bottom
             if self.is_prop(DIRECTION_FLAG_TOP):
-                controller.write(self.CODE_BOTTOM)
+                self.write(self.CODE_BOTTOM)
                 self.unset_prop(DIRECTION_FLAG_TOP)
         else:  # Moving top
             if not self.is_prop(DIRECTION_FLAG_TOP):
-                controller.write(self.CODE_TOP)
+                self.write(self.CODE_TOP)
                 self.set_prop(DIRECTION_FLAG_TOP)
         self.device.current_x += dx
         self.device.current_y += dy
         self.check_bounds()
-        controller.write(self.CODE_ANGLE + lhymicro_distance(abs(dy)))
+        self.write(self.CODE_ANGLE + lhymicro_distance(abs(dy)))
 
     def declare_directions(self):
         """Declare direction declares raster directions of left, top, with the primary momentum direction going last.
         You cannot declare a diagonal direction."""
-        controller = self.device.pipe
 
         if self.is_prop(DIRECTION_FLAG_LEFT):
             x_dir = self.CODE_LEFT
@@ -831,9 +1095,9 @@ class LhymicroInterpreter(Interpreter):
         else:
             y_dir = self.CODE_BOTTOM
         if self.is_prop(DIRECTION_FLAG_X):  # FLAG_Y is assumed to be !FLAG_X
-            controller.write(y_dir + x_dir)
+            self.write(y_dir + x_dir)
         else:
-            controller.write(x_dir + y_dir)
+            self.write(x_dir + y_dir)
 
     @property
     def is_left(self):
@@ -885,41 +1149,37 @@ class LhymicroInterpreter(Interpreter):
         self.unset_prop(DIRECTION_FLAG_TOP)
 
     def move_right(self, dx=0):
-        controller = self.device.pipe
         self.device.current_x += dx
         if not self.is_right or self.state != STATE_COMPACT:
-            controller.write(self.CODE_RIGHT)
+            self.write(self.CODE_RIGHT)
             self.set_right()
         if dx != 0:
-            controller.write(lhymicro_distance(abs(dx)))
+            self.write(lhymicro_distance(abs(dx)))
             self.check_bounds()
 
     def move_left(self, dx=0):
-        controller = self.device.pipe
         self.device.current_x -= abs(dx)
         if not self.is_left or self.state != STATE_COMPACT:
-            controller.write(self.CODE_LEFT)
+            self.write(self.CODE_LEFT)
             self.set_left()
         if dx != 0:
-            controller.write(lhymicro_distance(abs(dx)))
+            self.write(lhymicro_distance(abs(dx)))
             self.check_bounds()
 
     def move_bottom(self, dy=0):
-        controller = self.device.pipe
         self.device.current_y += dy
         if not self.is_bottom or self.state != STATE_COMPACT:
-            controller.write(self.CODE_BOTTOM)
+            self.write(self.CODE_BOTTOM)
             self.set_bottom()
         if dy != 0:
-            controller.write(lhymicro_distance(abs(dy)))
+            self.write(lhymicro_distance(abs(dy)))
             self.check_bounds()
 
     def move_top(self, dy=0):
-        controller = self.device.pipe
         self.device.current_y -= abs(dy)
         if not self.is_top or self.state != STATE_COMPACT:
-            controller.write(self.CODE_TOP)
+            self.write(self.CODE_TOP)
             self.set_top()
         if dy != 0:
-            controller.write(lhymicro_distance(abs(dy)))
+            self.write(lhymicro_distance(abs(dy)))
             self.check_bounds()
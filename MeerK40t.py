@@ -40,6 +40,8 @@ parser.add_argument('-v', '--verbose', action='store_true', help='display verbos
 parser.add_argument('-t', '--transform', type=str, help="adds SVG Transform command")
 parser.add_argument('-m', '--mock', action='store_true', help='uses mock usb device')
 parser.add_argument('-s', '--set', action='append', nargs='+', help='set a device variable')
+parser.add_argument('--profile', type=str, help='profile the device, writing a JSON report to the file at exit')
+parser.add_argument('--telemetry', type=str, help='writes the spooled job telemetry as JSON to the file at exit')
 args = parser.parse_args(sys.argv[1:])
 
 if not args.no_gui:
@@ -118,6 +120,15 @@ if args.mock:
     kernel.device.setting(bool, 'mock', True)
     kernel.device.mock = True
 
+if args.profile is not None:
+    import atexit
+    kernel.device.profiler.start()
+    atexit.register(kernel.device.profiler.dump, args.profile)
+
+if args.telemetry is not None:
+    import atexit
+    atexit.register(lambda: kernel.device.spooler.dump_telemetry(args.telemetry))
+
 if args.egv is not None:
     kernel.device.pipe.write(bytes(args.egv.replace('$', '\n') + '\n',"utf8"))
 
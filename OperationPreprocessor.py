@@ -2,7 +2,6 @@
 from svgelements import *
 from LaserCommandConstants import *
 from LaserOperation import LaserOperation, RasterOperation
-from LaserRender import LaserRender
 
 
 class OperationPreprocessor:
@@ -44,6 +43,7 @@ class OperationPreprocessor:
                 if isinstance(op, RasterOperation):
                     if len(op) == 1 and isinstance(op[0], SVGImage):
                         continue
+                    from LaserRender import LaserRender
                     renderer = LaserRender(self.kernel)
                     bounds = OperationPreprocessor.bounding_box(op)
                     if bounds is None:
@@ -60,7 +60,7 @@ class OperationPreprocessor:
 
     def conditional_jobadd_actualize_image(self):
         for op in self.operations:
-            if isinstance(op, RasterOperation):
+            if isinstance(op, RasterOperation) and not op.tiled:  # Tiled rasters actualize per band.
                 for elem in op:
                     if OperationPreprocessor.needs_actualization(elem, op.raster_step):
                         self.jobadd_actualize_image()
@@ -69,7 +69,7 @@ class OperationPreprocessor:
     def jobadd_actualize_image(self):
         def actualize():
             for op in self.operations:
-                if isinstance(op, RasterOperation):
+                if isinstance(op, RasterOperation) and not op.tiled:
                     for elem in op:
                         if OperationPreprocessor.needs_actualization(elem, op.raster_step):
                             OperationPreprocessor.make_actual(elem, op.raster_step)
@@ -83,11 +83,16 @@ class OperationPreprocessor:
         def scale_for_rotary():
             p = self.device
             scale_str = 'scale(%f,%f,%f,%f)' % (p.scale_x, p.scale_y, p.current_x, p.current_y)
+            matrix = Matrix(scale_str)
+            scaled = set()
             for o in self.operations:
                 if isinstance(o, LaserOperation):
                     for e in o:
+                        if id(e) in scaled:
+                            continue  # Element shared by several operations.
+                        scaled.add(id(e))
                         try:
-                            e *= scale_str
+                            e *= matrix
                         except AttributeError:
                             pass
             self.conditional_jobadd_actualize_image()
@@ -0,0 +1,65 @@
+"""
+Framing of the 30 byte LHYMICRO-GL payloads into the 32 byte packets written through the CH341:
+\x00, the payload, then the 8 bit onewire (Dallas/Maxim) CRC of the payload.
+
+The CRC is computed a byte at a time with a 256 entry table. Payloads are usually padded out with 'F', so the
+trailing padding is run through a precomputed table per padding length, a single lookup however long it is.
+"""
+
+PACKET_PAYLOAD = 30
+PACKET_SIZE = 32
+PADDING = 0x46  # 'F'
+
+
+def _crc_table():
+    table = bytearray(256)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0x8C
+            else:
+                crc >>= 1
+        table[i] = crc
+    return bytes(table)
+
+
+CRC_TABLE = _crc_table()
+
+
+def _padding_tables():
+    tables = [bytes(range(256))]
+    for n in range(PACKET_PAYLOAD):
+        tables.append(bytes(CRC_TABLE[crc ^ PADDING] for crc in tables[n]))
+    return tables
+
+
+PADDING_TABLES = _padding_tables()  # PADDING_TABLES[n][crc] is the crc after n more bytes of 'F' padding.
+
+
+def onewire_crc(payload):
+    """
+    :param payload: bytes to be CRC'd
+    :return: 8 bit crc of payload.
+    """
+    data = payload.rstrip(b'F')
+    table = CRC_TABLE
+    crc = 0
+    for b in data:
+        crc = table[crc ^ b]
+    return PADDING_TABLES[len(payload) - len(data)][crc]
+
+
+class PacketFramer:
+    """
+    Builds the frames in one reusable bytearray. The frame returned is only valid until the next call.
+    """
+
+    def __init__(self):
+        self.frame = bytearray(PACKET_SIZE)
+
+    def __call__(self, payload):
+        frame = self.frame
+        frame[1:31] = payload
+        frame[31] = onewire_crc(payload)
+        return frame
@@ -0,0 +1,147 @@
+import json
+import threading
+import time
+
+import LaserCommandConstants
+
+"""
+Aggregate timing profiler for the hot paths of a device.
+
+While started, the profiled methods are replaced on their objects by timing wrappers, recording the calls, the
+cumulative and maximum durations and, for the command methods, the same per laser command. When stopped the original
+methods are put back, so a device not being profiled pays nothing for it.
+"""
+
+PROFILED = (
+    ('spooler', 'execute', True),
+    ('interpreter', 'command', True),
+    ('pipe', 'process_queue', False),
+    ('pipe', 'send_packet', False),
+)  # Device component, method, whether the first argument is the laser command.
+
+COMMAND_NAMES = dict((getattr(LaserCommandConstants, name), name) for name in dir(LaserCommandConstants)
+                     if name.startswith('COMMAND_'))
+
+
+class Timing:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    def report(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+        }
+
+
+class Profiler:
+    def __init__(self, device):
+        self.device = device
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.timings = {}
+        self.commands = {}
+        self.patched = []
+        self.start_time = None
+        self.elapsed = 0.0
+
+    def start(self):
+        if self.enabled:
+            return
+        for component, method, by_command in PROFILED:
+            obj = getattr(self.device, component, None)
+            if obj is None or not hasattr(obj, method):
+                continue
+            name = "%s.%s" % (type(obj).__name__, method)
+            self.patched.append((obj, method, obj.__dict__.get(method)))
+            setattr(obj, method, self.timed(name, getattr(obj, method), by_command))
+        self.enabled = True
+        self.start_time = time.time()
+        self.device.signal('profile;state', True)
+
+    def stop(self):
+        if not self.enabled:
+            return
+        for obj, method, original in reversed(self.patched):
+            if original is None:
+                del obj.__dict__[method]
+            else:
+                setattr(obj, method, original)
+        self.patched = []
+        self.enabled = False
+        self.elapsed += time.time() - self.start_time
+        self.device.signal('profile;state', False)
+
+    def reset(self):
+        with self.lock:
+            self.timings = {}
+            self.commands = {}
+            self.elapsed = 0.0
+            if self.enabled:
+                self.start_time = time.time()
+
+    def timed(self, name, function, by_command):
+        lock = self.lock
+        perf_counter = time.perf_counter
+        timing = self.timings.setdefault(name, Timing())
+        commands = self.commands.setdefault(name, {})
+
+        def timed_function(*args, **kwargs):
+            t = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                t = perf_counter() - t
+                with lock:
+                    timing.add(t)
+                    if by_command and len(args):
+                        try:
+                            command_timing = commands[args[0]]
+                        except KeyError:
+                            command_timing = commands[args[0]] = Timing()
+                        command_timing.add(t)
+
+        return timed_function
+
+    def report(self):
+        """
+        :return: dict of the profile, JSON serializable.
+        """
+        with self.lock:
+            elapsed = self.elapsed
+            if self.enabled:
+                elapsed += time.time() - self.start_time
+            functions = {}
+            for name, timing in self.timings.items():
+                function = timing.report()
+                commands = self.commands.get(name)
+                if commands:
+                    function['commands'] = dict((COMMAND_NAMES.get(command, str(command)), command_timing.report())
+                                                for command, command_timing in commands.items())
+                functions[name] = function
+        return {'elapsed': elapsed, 'functions': functions}
+
+    def dump(self, filename=None):
+        """
+        Writes the JSON report to the file, by default a dated MeerK40t-profile file.
+
+        :return: the filename written.
+        """
+        if filename is None:
+            import datetime
+            filename = "MeerK40t-profile-{date:%Y-%m-%d_%H_%M_%S}.json".format(date=datetime.datetime.now())
+        report = self.report()
+        with open(filename, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        self.device.signal('profile', report)
+        return filename
@@ -1,3 +1,5 @@
+from bisect import bisect_right
+
 X_AXIS = 0
 TOP = 0
 LEFT = 0
@@ -9,6 +11,8 @@ RIGHT = 4
 UNIDIRECTIONAL = 8
 NO_SKIP = 16
 
+BAND_PIXELS = 1 << 20  # Default number of pixels in a band of BandedRasterPlotter.
+
 
 class RasterPlotter:
     def __init__(self, data, width, height, traversal=0, skip_pixel=0, overscan=0,
@@ -27,6 +31,19 @@ class RasterPlotter:
         self.offset_y = int(offset_y)
         self.step = step
         self.px_filter = px_filter
+
+        # Index of the first and last non-skip pixels, and the non-blank jumps. Built on first use.
+        self._row_first = None
+        self._row_last = None
+        self._row_jumps = None
+        self._column_first = None
+        self._column_last = None
+        self._column_jumps = None
+        # Run boundaries of the row and column currently being traversed.
+        self._runs_row = None
+        self._row_runs_cache = None
+        self._runs_column = None
+        self._column_runs_cache = None
         x, y = self.calculate_first_pixel()
         self.initial_x = x
         self.initial_y = y
@@ -36,37 +53,131 @@ class RasterPlotter:
             return self.px_filter(self.data[x, y])
         raise IndexError  # For some unknown reason -y pixel access values work for a while
 
+    def _scan_row_bounds(self, y):
+        """Scans the row for the leftmost and rightmost pixels not equal to the skip_pixel value."""
+        for left in range(0, self.width):
+            if self.px(left, y) != self.skip_pixel:
+                break
+        else:
+            return -1, self.width
+        for right in range(self.width - 1, left - 1, -1):
+            if self.px(right, y) != self.skip_pixel:
+                return left, right
+
+    def _scan_column_bounds(self, x):
+        """Scans the column for the topmost and bottommost pixels not equal to the skip_pixel value."""
+        for top in range(0, self.height):
+            if self.px(x, top) != self.skip_pixel:
+                break
+        else:
+            return -1, self.height
+        for bottom in range(self.height - 1, top - 1, -1):
+            if self.px(x, bottom) != self.skip_pixel:
+                return top, bottom
+
+    def _calculate_row_index(self):
+        """Returns the lists of leftmost and rightmost non-skip pixels for every row."""
+        bounds = [self._scan_row_bounds(y) for y in range(self.height)]
+        return [b[0] for b in bounds], [b[1] for b in bounds]
+
+    def _calculate_column_index(self):
+        """Returns the lists of topmost and bottommost non-skip pixels for every column."""
+        bounds = [self._scan_column_bounds(x) for x in range(self.width)]
+        return [b[0] for b in bounds], [b[1] for b in bounds]
+
+    def _calculate_row_runs(self, y):
+        """Returns the sorted x values within the row where the pixel differs from the pixel before it."""
+        changes = []
+        last = self.px(0, y)
+        for x in range(1, self.width):
+            pixel = self.px(x, y)
+            if pixel != last:
+                changes.append(x)
+                last = pixel
+        return changes
+
+    def _calculate_column_runs(self, x):
+        """Returns the sorted y values within the column where the pixel differs from the pixel before it."""
+        changes = []
+        last = self.px(x, 0)
+        for y in range(1, self.height):
+            pixel = self.px(x, y)
+            if pixel != last:
+                changes.append(y)
+                last = pixel
+        return changes
+
+    @staticmethod
+    def _nonblank_jumps(first, count):
+        """
+        For each index gives the nearest non-blank index at or after it, and at or before it.
+        None if the rest of the image in that direction is blank.
+        """
+        forward = [None] * count
+        backward = [None] * count
+        found = None
+        for i in range(count - 1, -1, -1):
+            if first[i] != -1:
+                found = i
+            forward[i] = found
+        found = None
+        for i in range(0, count):
+            if first[i] != -1:
+                found = i
+            backward[i] = found
+        return forward, backward
+
+    def _row_index(self):
+        if self._row_first is None:
+            self._row_first, self._row_last = self._calculate_row_index()
+            self._row_jumps = self._nonblank_jumps(self._row_first, self.height)
+        return self._row_first, self._row_last
+
+    def _column_index(self):
+        if self._column_first is None:
+            self._column_first, self._column_last = self._calculate_column_index()
+            self._column_jumps = self._nonblank_jumps(self._column_first, self.width)
+        return self._column_first, self._column_last
+
+    def _row_runs(self, y):
+        if not 0 <= y < self.height:
+            raise IndexError
+        if self._runs_row != y:
+            self._row_runs_cache = self._calculate_row_runs(y)
+            self._runs_row = y
+        return self._row_runs_cache
+
+    def _column_runs(self, x):
+        if not 0 <= x < self.width:
+            raise IndexError
+        if self._runs_column != x:
+            self._column_runs_cache = self._calculate_column_runs(x)
+            self._runs_column = x
+        return self._column_runs_cache
+
     def leftmost_not_equal(self, y):
         """"Determine the leftmost pixel that is not equal to the skip_pixel value."""
-        for x in range(0, self.width):
-            pixel = self.px(x, y)
-            if pixel != self.skip_pixel:
-                return x
-        return -1
+        if not 0 <= y < self.height:
+            raise IndexError
+        return self._row_index()[0][y]
 
     def topmost_not_equal(self, x):
         """Determine the topmost pixel that is not equal to the skip_pixel value"""
-        for y in range(0, self.height):
-            pixel = self.px(x, y)
-            if pixel != self.skip_pixel:
-                return y
-        return -1
+        if not 0 <= x < self.width:
+            raise IndexError
+        return self._column_index()[0][x]
 
     def rightmost_not_equal(self, y):
         """Determine the rightmost pixel that is not equal to the skip_pixel value"""
-        for x in range(self.width - 1, -1, -1):
-            pixel = self.px(x, y)
-            if pixel != self.skip_pixel:
-                return x
-        return self.width
+        if not 0 <= y < self.height:
+            raise IndexError
+        return self._row_index()[1][y]
 
     def bottommost_not_equal(self, x):
         """Determine the bottommost pixel that is not equal to the skip_pixel value"""
-        for y in range(self.height - 1, -1, -1):
-            pixel = self.px(x, y)
-            if pixel != self.skip_pixel:
-                return y
-        return self.height
+        if not 0 <= x < self.width:
+            raise IndexError
+        return self._column_index()[1][x]
 
     def nextcolor_left(self, x, y, default):
         """Determine the next pixel change going left from the (x,y) point.
@@ -80,12 +191,11 @@ class RasterPlotter:
         if self.width < x:
             return self.width
 
-        v = self.px(x, y)
-        for ix in range(x, -1, -1):
-            pixel = self.px(ix, y)
-            if pixel != v:
-                return ix
-        return 0
+        changes = self._row_runs(y)
+        i = bisect_right(changes, x)
+        if i == 0:
+            return 0
+        return changes[i - 1] - 1
 
     def nextcolor_top(self, x, y, default):
         """Determine the next pixel change going top from the (x,y) point.
@@ -99,12 +209,11 @@ class RasterPlotter:
         if self.height < y:
             return self.height
 
-        v = self.px(x, y)
-        for iy in range(y, -1, -1):
-            pixel = self.px(x, iy)
-            if pixel != v:
-                return iy
-        return 0
+        changes = self._column_runs(x)
+        i = bisect_right(changes, y)
+        if i == 0:
+            return 0
+        return changes[i - 1] - 1
 
     def nextcolor_right(self, x, y, default):
         """Determine the next pixel change going right from the (x,y) point.
@@ -118,12 +227,11 @@ class RasterPlotter:
         if self.width <= x:
             return default
 
-        v = self.px(x, y)
-        for ix in range(x, self.width):
-            pixel = self.px(ix, y)
-            if pixel != v:
-                return ix
-        return self.width - 1
+        changes = self._row_runs(y)
+        i = bisect_right(changes, x)
+        if i == len(changes):
+            return self.width - 1
+        return changes[i]
 
     def nextcolor_bottom(self, x, y, default):
         """Determine the next pixel change going bottom from the (x,y) point.
@@ -137,31 +245,31 @@ class RasterPlotter:
         if self.height <= y:
             return default
 
-        v = self.px(x, y)
-        for iy in range(y, self.height):
-            pixel = self.px(x, iy)
-            if pixel != v:
-                return iy
-        return self.height - 1
+        changes = self._column_runs(x)
+        i = bisect_right(changes, y)
+        if i == len(changes):
+            return self.height - 1
+        return changes[i]
 
     def calculate_next_horizontal_pixel(self, y, dy=1, right=False):
-        try:
-            if right:
-                while True:
-                    x = self.rightmost_not_equal(y)
-                    if x != self.width:
-                        break
-                    y += dy
-            else:
-                while True:
-                    x = self.leftmost_not_equal(y)
-                    if x != -1:
-                        break
-                    y += dy
-        except IndexError:
+        if not 0 <= y < self.height:
+            return None, None
+        self._row_index()
+        if dy == 1:
+            y = self._row_jumps[0][y]
+        elif dy == -1:
+            y = self._row_jumps[1][y]
+        else:
+            while 0 <= y < self.height and self._row_first[y] == -1:
+                y += dy
+            if not 0 <= y < self.height:
+                y = None
+        if y is None:
             # Remaining image is blank
             return None, None
-        return x, y
+        if right:
+            return self._row_last[y], y
+        return self._row_first[y], y
 
     def calculate_next_vertical_pixel(self, x, dx=1, bottom=False):
         try:
@@ -172,11 +280,19 @@ class RasterPlotter:
                         break
                     x += dx
             else:
-                while True:
-                    y = self.topmost_not_equal(x)
-                    if y != -1:
-                        break
-                    x += dx
+                if not 0 <= x < self.width:
+                    raise IndexError
+                self._column_index()
+                if dx == 1:
+                    x = self._column_jumps[0][x]
+                elif dx == -1:
+                    x = self._column_jumps[1][x]
+                else:
+                    while self.topmost_not_equal(x) == -1:
+                        x += dx
+                if x is None:
+                    raise IndexError
+                y = self._column_first[x]
         except IndexError:
             # Remaining image is blank
             return None, None
@@ -330,3 +446,152 @@ class RasterPlotter:
                 y = next_y
                 yield offset_x + x * step, offset_y + y * step, 0
                 dx = -dx
+
+
+class NumpyRasterPlotter(RasterPlotter):
+    """
+    RasterPlotter backed by a NumPy array of already filtered pixel values.
+
+    The image is converted once, the first/last non-skip pixels of the rows and columns and the run boundaries
+    within them are found with vectorized diff/nonzero calls. Only the index building is replaced, plot() and the
+    traversal logic are inherited unchanged, so the produced event stream is identical.
+    """
+
+    def __init__(self, data, width, height, traversal=0, skip_pixel=0, overscan=0,
+                 offset_x=0, offset_y=0, step=1, px_filter=None, back_filter=None):
+        import numpy as np
+        data = np.asarray(data, dtype=np.float64)
+        if data.shape != (height, width):
+            raise ValueError("Data shape %s does not match (%d, %d)" % (str(data.shape), height, width))
+        RasterPlotter.__init__(self, data, width, height, traversal, skip_pixel, overscan,
+                               offset_x, offset_y, step, None, back_filter)
+
+    def px(self, x, y):
+        if 0 <= y < self.height and 0 <= x < self.width:
+            return float(self.data[y, x])
+        raise IndexError
+
+    @staticmethod
+    def _bounds(mask, length):
+        """First and last True along axis 1 of mask, -1 and length when there are none."""
+        import numpy as np
+        found = mask.any(axis=1)
+        first = np.where(found, mask.argmax(axis=1), -1)
+        last = np.where(found, length - 1 - mask[:, ::-1].argmax(axis=1), length)
+        return first.tolist(), last.tolist()
+
+    def _calculate_row_index(self):
+        return self._bounds(self.data != self.skip_pixel, self.width)
+
+    def _calculate_column_index(self):
+        return self._bounds((self.data != self.skip_pixel).T, self.height)
+
+    @staticmethod
+    def _changes(line):
+        import numpy as np
+        return (np.flatnonzero(line[1:] != line[:-1]) + 1).tolist()
+
+    def _calculate_row_runs(self, y):
+        return self._changes(self.data[y, :])
+
+    def _calculate_column_runs(self, x):
+        return self._changes(self.data[:, x])
+
+
+class BandedRasterPlotter(NumpyRasterPlotter):
+    """
+    NumpyRasterPlotter that never holds the whole array. The filtered values are requested from the bands function
+    one band at a time, bands(x0, y0, x1, y1) must return the array of values for that region with the shape
+    (y1 - y0, x1 - x0).
+
+    Rows are banded for x-axis rastering and columns for y-axis rastering, so the traversal moves through the bands
+    in order and only the current band is held. The bounds index is built with a single pass over all the bands,
+    after that the look-ahead to the next row or column never needs pixels, so bands do not need to overlap and the
+    overscan never leaves the band of the current row or column.
+    """
+
+    def __init__(self, bands, width, height, traversal=0, skip_pixel=0, overscan=0,
+                 offset_x=0, offset_y=0, step=1, band_size=None):
+        import numpy  # The bands are NumPy arrays.
+        self.bands = bands
+        self.by_columns = (traversal & Y_AXIS) != 0
+        if band_size is None:
+            band_size = max(1, BAND_PIXELS // max(1, height if self.by_columns else width))
+        self.band_size = band_size
+        self._band_number = None
+        self._band = None
+        RasterPlotter.__init__(self, None, width, height, traversal, skip_pixel, overscan,
+                               offset_x, offset_y, step, None)
+
+    def band_count(self):
+        length = self.width if self.by_columns else self.height
+        return (length + self.band_size - 1) // self.band_size
+
+    def band_region(self, number):
+        start = number * self.band_size
+        if self.by_columns:
+            return start, 0, min(self.width, start + self.band_size), self.height
+        return 0, start, self.width, min(self.height, start + self.band_size)
+
+    def band(self, number):
+        """Returns the band, replacing the currently held band if needed."""
+        if self._band_number != number:
+            self._band = None  # Release the old band before creating the new one.
+            self._band = self.bands(*self.band_region(number))
+            self._band_number = number
+        return self._band
+
+    def px(self, x, y):
+        if 0 <= y < self.height and 0 <= x < self.width:
+            if self.by_columns:
+                number = x // self.band_size
+                return float(self.band(number)[y, x - number * self.band_size])
+            number = y // self.band_size
+            return float(self.band(number)[y - number * self.band_size, x])
+        raise IndexError
+
+    def _calculate_bounds(self, columns):
+        """Single pass over the bands merging the bounds of every row, or every column, within each band."""
+        import numpy as np
+        count = self.width if columns else self.height
+        length = self.height if columns else self.width
+        first = np.full(count, length)
+        last = np.full(count, -1)
+        for number in range(self.band_count()):
+            x0, y0, x1, y1 = self.band_region(number)
+            mask = self.band(number) != self.skip_pixel
+            if columns:
+                mask = mask.T
+                start, end, offset = x0, x1, y0
+            else:
+                start, end, offset = y0, y1, x0
+            found = mask.any(axis=1)
+            f = mask.argmax(axis=1) + offset
+            l = offset + mask.shape[1] - 1 - mask[:, ::-1].argmax(axis=1)
+            first[start:end] = np.where(found, np.minimum(first[start:end], f), first[start:end])
+            last[start:end] = np.where(found, np.maximum(last[start:end], l), last[start:end])
+        first[first == length] = -1
+        last[last == -1] = length
+        return first.tolist(), last.tolist()
+
+    def _calculate_row_index(self):
+        return self._calculate_bounds(False)
+
+    def _calculate_column_index(self):
+        return self._calculate_bounds(True)
+
+    def _calculate_row_runs(self, y):
+        if self.by_columns:
+            import numpy as np
+            line = np.concatenate([self.band(n)[y, :] for n in range(self.band_count())])
+            return self._changes(line)
+        number = y // self.band_size
+        return self._changes(self.band(number)[y - number * self.band_size, :])
+
+    def _calculate_column_runs(self, x):
+        if not self.by_columns:
+            import numpy as np
+            line = np.concatenate([self.band(n)[:, x] for n in range(self.band_count())])
+            return self._changes(line)
+        number = x // self.band_size
+        return self._changes(self.band(number)[:, x - number * self.band_size])
@@ -6,8 +6,12 @@ try:
     from collections.abc import MutableSequence  # noqa
 except ImportError:
     from collections import MutableSequence  # noqa
+from array import array
+from collections import OrderedDict
 from copy import copy
 from math import *
+from sys import getsizeof
+from threading import Lock
 
 from xml.etree.ElementTree import iterparse
 
@@ -35,6 +39,9 @@ and the Arc can do exact arc calculations if scipy is installed.
 
 MIN_DEPTH = 5
 ERROR = 1e-12
+PLOT_CACHE_BUDGET = 1 << 26  # Approximate bytes of plotted curve pixels kept by PLOT_CACHE.
+PACKED_PATH_DATA = 1 << 16  # Path data longer than this many characters is loaded as a PackedPath.
+PARSED_MATRIX_ENTRIES = 1024  # Transform strings whose parsed matrix is kept by Matrix.
 
 max_depth = 0
 
@@ -1911,7 +1918,11 @@ class Matrix:
     expect these to be treated consistently. Performing other matrix operations in a consistent
     way. However, render must be called to change these parameters into float locations prior to
     any operation which might be used to transform a point or polyline or path object.
+
+    The components parsed from transform strings are cached, so repeated transform strings are only parsed once.
     """
+    _parsed = OrderedDict()
+    _parsed_lock = Lock()
 
     def __init__(self, *components, **kwargs):
         self.a = 1.0
@@ -1926,8 +1937,7 @@ class Matrix:
         elif len_args == 1:
             m = components[0]
             if isinstance(m, str):
-                self.parse(m)
-                self.render(**kwargs)
+                self._parse_cached(m, kwargs)
             else:
                 self.a = m[0]
                 self.b = m[1]
@@ -2032,6 +2042,37 @@ class Matrix:
     def __copy__(self):
         return Matrix(self.a, self.b, self.c, self.d, self.e, self.f)
 
+    def _parse_cached(self, transform_str, kwargs):
+        """Parses and renders the transform string, reusing the components of an earlier identical parse."""
+        try:
+            key = (transform_str, tuple(sorted(kwargs.items())))
+            hash(key)
+        except TypeError:
+            key = None  # Unhashable render values, parse without the cache.
+        components = None
+        if key is not None:
+            with Matrix._parsed_lock:
+                components = Matrix._parsed.get(key)
+                if components is not None:
+                    Matrix._parsed.move_to_end(key)
+        if components is not None:
+            self.a, self.b, self.c, self.d, self.e, self.f = components
+            return
+        self.parse(transform_str)
+        self.render(**kwargs)
+        components = (self.a, self.b, self.c, self.d, self.e, self.f)
+        if key is None or not all(isinstance(v, (int, float)) for v in components):
+            return  # Lengths which could not be rendered are not cached.
+        with Matrix._parsed_lock:
+            Matrix._parsed[key] = components
+            while len(Matrix._parsed) > PARSED_MATRIX_ENTRIES:
+                Matrix._parsed.popitem(last=False)
+
+    @classmethod
+    def clear_parse_cache(cls):
+        with cls._parsed_lock:
+            cls._parsed.clear()
+
     def __str__(self):
         """
         Many of SVG's graphics operations utilize 2x3 matrices of the form:
@@ -2369,6 +2410,35 @@ class Matrix:
         v[0] = nx
         v[1] = ny
 
+    def transform_coordinates(self, coords):
+        """
+        Applies the matrix in place to a flat sequence of x, y coordinates, an array('d') or a list, with the same
+        arithmetic as point_in_matrix_space(). NumPy is used when it is available. NaN coordinates remain NaN.
+
+        :return: the coordinates.
+        """
+        a, b, c, d, e, f = self.a, self.b, self.c, self.d, self.e, self.f
+        try:
+            import numpy as np
+            if isinstance(coords, array):
+                xy = np.frombuffer(coords, dtype=np.float64).reshape(-1, 2)
+            else:
+                xy = np.array(coords, dtype=np.float64).reshape(-1, 2)
+            x = xy[:, 0].copy()
+            y = xy[:, 1].copy()
+            xy[:, 0] = x * a + y * c + 1 * e
+            xy[:, 1] = x * b + y * d + 1 * f
+            if not isinstance(coords, array):
+                coords[:] = xy.ravel().tolist()
+            del xy
+        except ImportError:
+            for i in range(0, len(coords), 2):
+                x = coords[i]
+                y = coords[i + 1]
+                coords[i] = x * a + y * c + 1 * e
+                coords[i + 1] = x * b + y * d + 1 * f
+        return coords
+
     @classmethod
     def scale(cls, sx=1.0, sy=None):
         if sy is None:
@@ -2762,6 +2832,98 @@ class Shape(GraphicObject, Transformable):
         return self.__class__.__name__
 
 
+class PlotCache:
+    """
+    Bounded cache of the pixels plotted by the curve segments, so plotting the same curve again, for a repeated pass
+    or for another job, replays the pixels rather than running the Zingl-Bresenham routine again.
+
+    The entries are keyed by the segment type and its geometry, the pixel grid is that of the segment coordinates.
+    Changing the geometry changes the key, and a segment transformed by __imul__ discards its entry. When the size
+    of the entries exceeds the budget the least recently used entries are evicted. The sizes are approximate, the
+    container and point tuples and their float values are counted.
+    """
+
+    def __init__(self, budget=PLOT_CACHE_BUDGET):
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, points):
+        points = tuple(points)
+        size = getsizeof(points)
+        for p in points:
+            size += getsizeof(p)
+            for v in p:
+                if isinstance(v, float):
+                    size += getsizeof(v)
+        if size > self.budget:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self.entries[key] = (points, size)
+            self.bytes += size
+            self._evict()
+
+    def set_budget(self, budget):
+        """Changes the budget, evicting the least recently used entries beyond it."""
+        with self.lock:
+            self.budget = budget
+            self._evict()
+
+    def _evict(self):
+        while self.bytes > self.budget:
+            evicted_key, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted[1]
+            self.evictions += 1
+
+    def discard(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry[1]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'budget': self.budget,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+PLOT_CACHE = PlotCache()
+
+
 class PathSegment:
     """
     Path Segments are the base class for all the segment within a Path.
@@ -2786,6 +2948,7 @@ class PathSegment:
     def __init__(self):
         self.start = None
         self.end = None
+        self._plot_key = None
 
     def __mul__(self, other):
         if isinstance(other, (Matrix, str)):
@@ -2796,6 +2959,28 @@ class PathSegment:
 
     __rmul__ = __mul__
 
+    def _cached_plot(self, key, plot):
+        """
+        Yields the pixels of plot() for this segment from the PLOT_CACHE. On a miss the pixels are yielded as they
+        are plotted and only stored once the plot completes.
+        """
+        self._plot_key = key
+        points = PLOT_CACHE.get(key)
+        if points is not None:
+            for p in points:
+                yield p
+            return
+        points = []
+        for p in plot():
+            points.append(p)
+            yield p
+        PLOT_CACHE.put(key, points)
+
+    def _discard_plot(self):
+        if self._plot_key is not None:
+            PLOT_CACHE.discard(self._plot_key)
+            self._plot_key = None
+
     def __iadd__(self, other):
         if isinstance(other, PathSegment):
             path = Path(self, other)
@@ -3184,6 +3369,69 @@ class Line(PathSegment):
                 err += dx
                 y0 += sy
 
+    @staticmethod
+    def plot_line_runs(x0, y0, x1, y1):
+        """
+        Zingl-Bresenham line as runs. Yields the start pixel, then the end pixel of each run of identical
+        orthogonal or diagonal steps, with the on value 1. Walking each run one step at a time gives exactly
+        the pixels of plot_line(). The length of each run is solved from the error term, so this costs
+        O(runs) rather than O(pixels).
+        """
+        x0 = int(x0)
+        y0 = int(y0)
+        x1 = int(x1)
+        y1 = int(y1)
+        dx = abs(x1 - x0)
+        dy = -abs(y1 - y0)
+
+        if x0 < x1:
+            sx = 1
+        else:
+            sx = -1
+        if y0 < y1:
+            sy = 1
+        else:
+            sy = -1
+
+        err = dx + dy  # error value e_xy
+        yield x0, y0, 1
+        while x0 != x1 or y0 != y1:
+            e2 = 2 * err
+            step_x = e2 >= dy
+            step_y = e2 <= dx
+            if step_x and step_y:
+                # Diagonal while dy <= 2 * err <= dx.
+                delta = dx + dy
+                if delta > 0:
+                    count = (dx - e2) // (2 * delta) + 1
+                elif delta < 0:
+                    count = (e2 - dy) // (-2 * delta) + 1
+                else:
+                    count = abs(x1 - x0)
+                count = min(count, abs(x1 - x0), abs(y1 - y0))
+                err += count * delta
+                x0 += count * sx
+                y0 += count * sy
+            elif step_x:
+                # Horizontal while 2 * err > dx, err falls by -dy each step.
+                if dy != 0:
+                    count = -((dx - e2) // (-2 * dy))
+                else:
+                    count = abs(x1 - x0)
+                count = min(count, abs(x1 - x0))
+                err += count * dy
+                x0 += count * sx
+            else:
+                # Vertical while 2 * err < dy, err rises by dx each step.
+                if dx != 0:
+                    count = -((e2 - dy) // (2 * dx))
+                else:
+                    count = abs(y1 - y0)
+                count = min(count, abs(y1 - y0))
+                err += count * dx
+                y0 += count * sy
+            yield x0, y0, 1
+
 
 class QuadraticBezier(PathSegment):
     """Represents Quadratic Bezier commands."""
@@ -3222,6 +3470,7 @@ class QuadraticBezier(PathSegment):
         if isinstance(other, str):
             other = Matrix(other)
         if isinstance(other, Matrix):
+            self._discard_plot()
             if self.start is not None:
                 self.start *= other
             if self.control is not None:
@@ -3303,6 +3552,10 @@ class QuadraticBezier(PathSegment):
                 return 'q %s %s' % (self.control - current_point, self.end - current_point)
 
     def plot(self):
+        key = ('Q', self.start[0], self.start[1], self.control[0], self.control[1], self.end[0], self.end[1])
+        return self._cached_plot(key, self._plot)
+
+    def _plot(self):
         for x, y in QuadraticBezier.plot_quad_bezier(self.start[0], self.start[1],
                                                      self.control[0], self.control[1],
                                                      self.end[0], self.end[1]):
@@ -3485,6 +3738,7 @@ class CubicBezier(PathSegment):
         if isinstance(other, str):
             other = Matrix(other)
         if isinstance(other, Matrix):
+            self._discard_plot()
             if self.start is not None:
                 self.start *= other
             if self.control1 is not None:
@@ -3558,6 +3812,11 @@ class CubicBezier(PathSegment):
                     self.control1 - current_point, self.control2 - current_point, self.end - current_point)
 
     def plot(self):
+        key = ('C', self.start[0], self.start[1], self.control1[0], self.control1[1],
+               self.control2[0], self.control2[1], self.end[0], self.end[1])
+        return self._cached_plot(key, self._plot)
+
+    def _plot(self):
         for e in CubicBezier.plot_cubic_bezier(self.start[0], self.start[1],
                                                self.control1[0], self.control1[1],
                                                self.control2[0], self.control2[1],
@@ -4065,6 +4324,7 @@ class Arc(PathSegment):
         if isinstance(other, str):
             other = Matrix(other)
         if isinstance(other, Matrix):
+            self._discard_plot()
             if self.start is not None:
                 self.start *= other
             if self.center is not None:
@@ -4481,10 +4741,15 @@ class Arc(PathSegment):
                 self.end - current_point)
 
     def plot(self):
+        key = ('A', self.start[0], self.start[1], self.end[0], self.end[1], self.center[0], self.center[1],
+               self.prx[0], self.prx[1], self.pry[0], self.pry[1], float(self.sweep))
+        return self._cached_plot(key, self._plot)
+
+    def _plot(self):
         # TODO: Should actually plot the arc according to the pixel-perfect standard. In this case we would plot a
         # Bernstein weighted bezier curve.
         for curve in self.as_cubic_curves():
-            for value in curve.plot():
+            for value in curve._plot():
                 yield value
 
 
@@ -5040,12 +5305,76 @@ class Path(Shape, MutableSequence):
 
         Path objects reify perfectly.
         """
-        if isinstance(self.transform, Matrix):
-            for e in self._segments:
-                e *= self.transform
+        if isinstance(self.transform, Matrix) and not self.transform.is_identity():
+            Path.transform_segments(self._segments, self.transform)
+            self._length = None
         self.transform.reset()
         return self
 
+    @staticmethod
+    def transform_segments(segments, matrix):
+        """
+        Applies the matrix to the segments in place, as segment *= matrix would. The points of all the segments are
+        gathered into one flat coordinate array and transformed together.
+        """
+        if isinstance(matrix, str):
+            matrix = Matrix(matrix)
+        if not all(isinstance(v, (int, float)) for v in (matrix.a, matrix.b, matrix.c, matrix.d, matrix.e, matrix.f)):
+            for segment in segments:
+                segment *= matrix  # Unrendered lengths.
+            return
+        flip = (matrix.value_scale_x() < 0) != (matrix.value_scale_y() < 0)
+        points = []
+        coords = []
+        for segment in segments:
+            segment._discard_plot()
+            if flip and isinstance(segment, Arc):
+                segment.sweep = -segment.sweep
+            for i in range(len(segment)):
+                p = segment[i]
+                if p is not None:
+                    points.append(p)
+                    coords.append(p.x)
+                    coords.append(p.y)
+        coords = matrix.transform_coordinates(array('d', coords))
+        for p, x, y in zip(points, coords[0::2], coords[1::2]):
+            p.x = x
+            p.y = y
+
+    @staticmethod
+    def reify_all(paths, matrix=None):
+        """
+        Reifies all the paths, post-multiplying each transform by matrix first if it is given. Paths sharing the same
+        transform have their points transformed together in one pass.
+
+        :return: the paths.
+        """
+        if isinstance(matrix, str):
+            matrix = Matrix(matrix)
+        groups = OrderedDict()
+        reified = set()
+        for path in paths:
+            if id(path) in reified:
+                continue  # Listed more than once, it is only transformed once.
+            reified.add(id(path))
+            if matrix is not None:
+                path *= matrix
+            m = path.transform
+            if isinstance(path, PackedPath) or not isinstance(m, Matrix) or m.is_identity():
+                path.reify()
+                continue
+            key = (m.a, m.b, m.c, m.d, m.e, m.f)
+            try:
+                groups.setdefault(key, []).append(path)
+            except TypeError:
+                path.reify()  # Unhashable lengths.
+        for key, group in groups.items():
+            Path.transform_segments([segment for path in group for segment in path._segments], Matrix(*key))
+            for path in group:
+                path._length = None
+                path.transform.reset()
+        return paths
+
     @staticmethod
     def svg_d(segments, relative=False, transformed=True):
         if len(segments) == 0:
@@ -5095,6 +5424,498 @@ class Path(Shape, MutableSequence):
         return self._segments
 
 
+class PackedSegments(MutableSequence):
+    """
+    Mutable sequence of path segments packed into typed arrays.
+
+    Every segment is a kind code, an offset into a flat array of x, y doubles holding its points, and for arcs a
+    sweep value. None points are stored as NaN. Segments of types with no packed form are kept as objects only.
+
+    Segment objects are built on access. Indexing builds the segment and keeps it, the kept object is authoritative
+    for that index until it is replaced or deleted so it can be modified in place as with a list of segments.
+    Iterating builds transient objects for segments that were not kept.
+    """
+    MOVE = 0
+    LINE = 1
+    CLOSE = 2
+    QUAD = 3
+    CUBIC = 4
+    ARC = 5
+    OBJECT = 255
+
+    POINTS = {MOVE: 2, LINE: 2, CLOSE: 2, QUAD: 3, CUBIC: 4, ARC: 5, OBJECT: 0}
+    END = {MOVE: 1, LINE: 1, CLOSE: 1, QUAD: 2, CUBIC: 3, ARC: 1}
+    LINEAR = (MOVE, LINE, CLOSE)
+
+    def __init__(self, segments=()):
+        self.kinds = array('B')
+        self.offsets = array('q')
+        self.coords = array('d')
+        self.sweeps = array('d')
+        self.objects = {}
+        self.extend(segments)
+
+    def __copy__(self):
+        packed = PackedSegments()
+        packed.kinds = array('B', self.kinds)
+        packed.offsets = array('q', self.offsets)
+        packed.coords = array('d', self.coords)
+        packed.sweeps = array('d', self.sweeps)
+        packed.objects = dict((i, copy(s)) for i, s in self.objects.items())
+        return packed
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __iter__(self):
+        objects = self.objects
+        for i in range(len(self.kinds)):
+            segment = objects.get(i)
+            if segment is None:
+                segment = self.segment(i)
+            yield segment
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.kinds)))]
+        if index < 0:
+            index += len(self.kinds)
+        if not 0 <= index < len(self.kinds):
+            raise IndexError('segment index out of range')
+        segment = self.objects.get(index)
+        if segment is None:
+            segment = self.segment(index)
+            self.objects[index] = segment
+        return segment
+
+    def __setitem__(self, index, segment):
+        if isinstance(index, slice):
+            segments = list(self)
+            segments[index] = segment
+            self.__init__(segments)
+            return
+        if index < 0:
+            index += len(self.kinds)
+        del self[index]
+        self.insert(index, segment)
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            segments = list(self)
+            del segments[index]
+            self.__init__(segments)
+            return
+        length = len(self.kinds)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('segment index out of range')
+        kind = self.kinds[index]
+        offset = self.offsets[index]
+        size = 2 * self.POINTS[kind]
+        del self.coords[offset:offset + size]
+        del self.kinds[index]
+        del self.offsets[index]
+        del self.sweeps[index]
+        offsets = self.offsets
+        for i in range(index, length - 1):
+            offsets[i] -= size
+        self.objects = dict((i - 1 if i > index else i, s) for i, s in self.objects.items() if i != index)
+
+    def insert(self, index, segment):
+        length = len(self.kinds)
+        if index < 0:
+            index = max(0, index + length)
+        if index >= length:
+            self.append(segment)
+            return
+        kind, points, sweep = self.pack(segment)
+        offset = self.offsets[index]
+        self.coords[offset:offset] = array('d', points)
+        self.kinds.insert(index, kind)
+        self.offsets.insert(index, offset)
+        self.sweeps.insert(index, sweep)
+        size = len(points)
+        offsets = self.offsets
+        for i in range(index + 1, length + 1):
+            offsets[i] += size
+        objects = dict((i + 1 if i >= index else i, s) for i, s in self.objects.items())
+        if kind == self.OBJECT:
+            objects[index] = segment
+        self.objects = objects
+
+    def append(self, segment):
+        kind, points, sweep = self.pack(segment)
+        if kind == self.OBJECT:
+            self.objects[len(self.kinds)] = segment
+        self.kinds.append(kind)
+        self.offsets.append(len(self.coords))
+        self.coords.extend(points)
+        self.sweeps.append(sweep)
+
+    def extend(self, segments):
+        for segment in segments:
+            self.append(segment)
+
+    def pack(self, segment):
+        """Returns the kind, flat coordinates and sweep of the segment."""
+        if isinstance(segment, Line):
+            kind, points = self.LINE, (segment.start, segment.end)
+        elif isinstance(segment, Move):
+            kind, points = self.MOVE, (segment.start, segment.end)
+        elif isinstance(segment, Close):
+            kind, points = self.CLOSE, (segment.start, segment.end)
+        elif isinstance(segment, QuadraticBezier):
+            kind, points = self.QUAD, (segment.start, segment.control, segment.end)
+        elif isinstance(segment, CubicBezier):
+            kind, points = self.CUBIC, (segment.start, segment.control1, segment.control2, segment.end)
+        elif isinstance(segment, Arc):
+            return self.ARC, self._flatten(
+                (segment.start, segment.end, segment.center, segment.prx, segment.pry)), segment.sweep
+        else:
+            return self.OBJECT, (), 0.0
+        return kind, self._flatten(points), 0.0
+
+    @staticmethod
+    def _flatten(points):
+        flat = []
+        for p in points:
+            if p is None:
+                flat.append(nan)
+                flat.append(nan)
+            else:
+                flat.append(p.x)
+                flat.append(p.y)
+        return flat
+
+    def point(self, index, position):
+        """Returns the point at position within the segment at index or None."""
+        segment = self.objects.get(index)
+        if segment is not None:
+            return segment[position]
+        offset = self.offsets[index] + 2 * position
+        x = self.coords[offset]
+        if x != x:
+            return None
+        return Point(x, self.coords[offset + 1])
+
+    def set_point(self, index, position, p):
+        """Sets the point at position within the segment at index."""
+        segment = self.objects.get(index)
+        if segment is not None:
+            if position == 0:
+                segment.start = Point(p)
+            else:
+                segment.end = Point(p)
+            return
+        offset = self.offsets[index] + 2 * position
+        self.coords[offset] = p[0]
+        self.coords[offset + 1] = p[1]
+
+    def start(self, index):
+        return self.point(index, 0)
+
+    def end(self, index):
+        if index in self.objects:
+            return self.objects[index].end
+        return self.point(index, self.END[self.kinds[index]])
+
+    def set_start(self, index, p):
+        self.set_point(index, 0, p)
+
+    def set_end(self, index, p):
+        if index in self.objects:
+            self.set_point(index, 1, p)
+        else:
+            self.set_point(index, self.END[self.kinds[index]], p)
+
+    def kind(self, index):
+        """Returns the kind of the segment, materialized segments are checked by their type."""
+        segment = self.objects.get(index)
+        if segment is not None:
+            if isinstance(segment, Move):
+                return self.MOVE
+            if isinstance(segment, Close):
+                return self.CLOSE
+            return self.OBJECT
+        return self.kinds[index]
+
+    def segment(self, index):
+        """Builds a new segment object for the packed segment at index."""
+        kind = self.kinds[index]
+        if kind == self.OBJECT:
+            return self.objects[index]
+        offset = self.offsets[index]
+        coords = self.coords
+        points = []
+        for i in range(offset, offset + 2 * self.POINTS[kind], 2):
+            x = coords[i]
+            points.append(None if x != x else (x, coords[i + 1]))
+        if kind == self.MOVE:
+            return Move(*points)
+        if kind == self.LINE:
+            return Line(*points)
+        if kind == self.CLOSE:
+            return Close(*points)
+        if kind == self.QUAD:
+            return QuadraticBezier(*points)
+        if kind == self.CUBIC:
+            return CubicBezier(*points)
+        start, end, center, prx, pry = points
+        return Arc(start, end, center, prx, pry, self.sweeps[index])
+
+    def transform(self, matrix):
+        """Applies the matrix to every segment in place."""
+        matrix.transform_coordinates(self.coords)
+        for segment in self.objects.values():
+            segment *= matrix
+        if self.ARC in self.kinds:
+            flips = (matrix.value_scale_x() < 0) != (matrix.value_scale_y() < 0)
+            if flips:
+                sweeps = self.sweeps
+                for i, kind in enumerate(self.kinds):
+                    if kind == self.ARC and i not in self.objects:
+                        sweeps[i] = -sweeps[i]
+
+    def bbox(self):
+        """Returns the bounding box of the segments, or None if there are no points."""
+        kinds = self.kinds
+        coords = self.coords
+        if self.objects or any(kind in kinds for kind in (self.QUAD, self.CUBIC, self.ARC, self.OBJECT)):
+            # Curves need their own extrema, linear segments only their points.
+            linear = array('d')
+            boxes = []
+            for i, kind in enumerate(kinds):
+                segment = self.objects.get(i)
+                if segment is None and kind in self.LINEAR:
+                    offset = self.offsets[i]
+                    linear.extend(coords[offset:offset + 4])
+                else:
+                    boxes.append((segment if segment is not None else self.segment(i)).bbox())
+        else:
+            linear = coords
+            boxes = []
+        try:
+            import numpy as np
+            xy = np.frombuffer(linear, dtype=np.float64).reshape(-1, 2)
+            xy = xy[~np.isnan(xy[:, 0])]
+            if len(xy):
+                boxes.append((xy[:, 0].min(), xy[:, 1].min(), xy[:, 0].max(), xy[:, 1].max()))
+            del xy
+        except ImportError:
+            xs = [x for x in linear[0::2] if x == x]
+            if xs:
+                ys = [y for y in linear[1::2] if y == y]
+                boxes.append((min(xs), min(ys), max(xs), max(ys)))
+        if len(boxes) == 0:
+            return None
+        return (float(min(box[0] for box in boxes)), float(min(box[1] for box in boxes)),
+                float(max(box[2] for box in boxes)), float(max(box[3] for box in boxes)))
+
+    def points(self):
+        """Yields every defining point of every segment, None points included."""
+        objects = self.objects
+        coords = self.coords
+        for i, kind in enumerate(self.kinds):
+            segment = objects.get(i)
+            if segment is not None:
+                for p in segment:
+                    yield p
+                continue
+            offset = self.offsets[i]
+            for j in range(offset, offset + 2 * self.POINTS[kind], 2):
+                x = coords[j]
+                yield None if x != x else Point(x, coords[j + 1])
+
+
+class PackedPath(Path):
+    """
+    PackedPath is a Path storing its segments in PackedSegments rather than a list of segment objects.
+
+    This is intended for very large imported paths. The memory used per segment is a few dozen bytes rather than
+    several objects, and transforms, bbox() and as_points() work over the coordinate arrays directly, with NumPy
+    when it is available. Segments accessed by index are built on demand and behave as they do within Path.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._packed = PackedSegments()
+        if len(args) == 1 and isinstance(args[0], PackedPath):
+            Shape.__init__(self, args[0], **kwargs)
+            self._length = None
+            self._lengths = None
+            self._packed = copy(args[0]._packed)
+            return
+        Path.__init__(self, *args, **kwargs)
+
+    @property
+    def _segments(self):
+        return self._packed
+
+    @_segments.setter
+    def _segments(self, segments):
+        if not isinstance(segments, PackedSegments):
+            segments = PackedSegments(segments)
+        self._packed = segments
+
+    def __copy__(self):
+        return PackedPath(self)
+
+    def _validate_subpath(self, index):
+        """ensure the subpath containing this index is valid."""
+        packed = self._packed
+        for j in range(max(index, 0), len(packed)):
+            kind = packed.kind(j)
+            if kind == PackedSegments.MOVE:
+                return  # Not a closed path, subpath is valid.
+            if kind == PackedSegments.CLOSE:
+                for k in range(index, -1, -1):
+                    if packed.kind(k) == PackedSegments.MOVE:
+                        packed.set_end(j, packed.end(k))
+                        return
+                packed.set_end(j, packed.end(0))
+                return
+
+    def _validate_move(self, index):
+        """ensure the next closed point from this index points to a valid location."""
+        packed = self._packed
+        for i in range(index + 1, len(packed)):
+            kind = packed.kind(i)
+            if kind == PackedSegments.MOVE:
+                return  # Not a closed path, the move is valid.
+            if kind == PackedSegments.CLOSE:
+                packed.set_end(i, packed.end(index))
+                return
+
+    def _validate_close(self, index):
+        """ensure the close element at this position correctly links to the previous move"""
+        packed = self._packed
+        for i in range(index, -1, -1):
+            if packed.kind(i) == PackedSegments.MOVE:
+                packed.set_end(index, packed.end(i))
+                return
+        packed.set_end(index, packed.end(0))
+
+    def _validate_connection(self, index):
+        """
+        Validates the connection at the index.
+        Connection 0 is the connection between getitem(0) and getitem(1)
+        """
+        packed = self._packed
+        if index < 0 or index + 1 >= len(packed):
+            return  # This connection doesn't exist.
+        if index not in packed.objects and index + 1 not in packed.objects:
+            # Both segments are packed, compare the coordinates as Point equality would.
+            coords = packed.coords
+            e = packed.offsets[index] + 2 * PackedSegments.END[packed.kinds[index]]
+            s = packed.offsets[index + 1]
+            ex = coords[e]
+            ey = coords[e + 1]
+            sx = coords[s]
+            if ex != ex:
+                if sx == sx:
+                    coords[e] = sx
+                    coords[e + 1] = coords[s + 1]
+            elif sx != sx or abs(ex - sx) > ERROR or abs(ey - coords[s + 1]) > ERROR:
+                coords[s] = ex
+                coords[s + 1] = ey
+            return
+        end = packed.end(index)
+        start = packed.start(index + 1)
+        if end is not None and start is None:
+            packed.set_start(index + 1, end)
+        elif end is None and start is not None:
+            packed.set_end(index, start)
+        elif end != start:
+            packed.set_start(index + 1, end)
+
+    def validate_connections(self):
+        zpoint = None
+        for i in range(len(self._packed)):
+            if zpoint is None or self._packed.kind(i) == PackedSegments.MOVE:
+                zpoint = self._packed.end(i)
+            self._validate_connection(i - 1)
+            if self._packed.kind(i) == PackedSegments.CLOSE and zpoint is not None \
+                    and self._packed.end(i) != zpoint:
+                self._packed.set_end(i, zpoint)
+
+    @property
+    def first_point(self):
+        packed = self._packed
+        if len(packed) == 0:
+            return None
+        start = packed.start(0)
+        if start is not None:
+            return Point(start)
+        return Point(packed.end(0))
+
+    @property
+    def current_point(self):
+        packed = self._packed
+        index = len(packed) - 1
+        if index < 0:
+            return None
+        if index in packed.objects:
+            return Point(packed.objects[index].end)
+        offset = packed.offsets[index] + 2 * PackedSegments.END[packed.kinds[index]]
+        x = packed.coords[offset]
+        if x != x:
+            return Point(None)
+        return Point(x, packed.coords[offset + 1])
+
+    @property
+    def z_point(self):
+        packed = self._packed
+        for i in range(len(packed) - 1, -1, -1):
+            if packed.kind(i) == PackedSegments.MOVE:
+                return packed.end(i)
+        if len(packed) == 0:
+            return None
+        return packed.end(0)
+
+    @property
+    def smooth_point(self):
+        packed = self._packed
+        if len(packed) == 0:
+            return None
+        start_pos = self.current_point
+        index = len(packed) - 1
+        if index in packed.objects:
+            return Path.smooth_point.fget(self)
+        kind = packed.kinds[index]
+        if kind == PackedSegments.QUAD:
+            return packed.point(index, 1).reflected_across(start_pos)
+        elif kind == PackedSegments.CUBIC:
+            return packed.point(index, 2).reflected_across(start_pos)
+        return start_pos
+
+    def as_points(self):
+        """Returns the list of defining points within path"""
+        for p in self._packed.points():
+            if not isinstance(p, Point):
+                yield Point(p)
+            else:
+                yield p
+
+    def reify(self):
+        """
+        Realizes the transform to the shape properties.
+
+        The coordinate arrays are transformed together.
+        """
+        if isinstance(self.transform, Matrix) and not self.transform.is_identity():
+            self._packed.transform(self.transform)
+            self._length = None
+        self.transform.reset()
+        return self
+
+    def bbox(self, transformed=True):
+        packed = self._packed
+        if transformed and not self.transform.is_identity():
+            packed = copy(packed)
+            packed.transform(self.transform)
+        return packed.bbox()
+
+
 class Rect(Shape):
     """
     SVG Rect shapes are defined in SVG2 10.2
@@ -6788,7 +7609,10 @@ class SVG:
                 elif SVG_TAG_GROUP == tag:
                     continue  # Groups are ignored.
                 elif SVG_TAG_PATH == tag:
-                    s = Path(values)
+                    if len(values.get(SVG_ATTR_DATA, '')) > PACKED_PATH_DATA:
+                        s = PackedPath(values)
+                    else:
+                        s = Path(values)
                     s.render(ppi=ppi, width=width, height=height)
                     if reify:
                         s.reify()
@@ -0,0 +1,279 @@
+"""
+Timings of the device hot paths. These are not tests and are not collected by the test run.
+
+Run from the repository root, optionally naming the benchmarks to run:
+
+    python test/benchmarks.py [name ...]
+"""
+
+from __future__ import print_function
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+from copy import copy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CH341SimulatorDriver import CH341Driver
+from Kernel import Pipe, THREAD_STATE_PAUSED
+from LaserCommandConstants import *
+from LaserOperation import CutOperation
+from LaserSpeed import LaserSpeed
+from PacketFraming import PacketFramer
+from RasterPlotter import X_AXIS
+from svgelements import CubicBezier, Matrix, PackedPath, Path, PLOT_CACHE
+
+from helpers import new_device
+from test_interpreter_writes import interpret, random_walk
+from test_k40_controller import instant_controller, process, random_commands
+from test_line_runs import interpret_commands
+from test_packed_path import random_d
+from test_packet_framing import random_payloads
+from test_raster_plotter import random_image, raster_plotter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+BENCHMARKS = []
+
+
+class CountingPipe(Pipe):
+    def __init__(self, device=None):
+        Pipe.__init__(self, device)
+        self.count = 0
+
+    def write(self, bytes_to_write):
+        self.count += len(bytes_to_write)
+
+
+def benchmark(function):
+    BENCHMARKS.append(function)
+    return function
+
+
+@benchmark
+def raster_events_per_second():
+    image = random_image("L", 400, 200, seed=1)
+    for name, vectorized in (("RasterPlotter", False), ("NumpyRasterPlotter", True)):
+        t = time.time()
+        count = 0
+        for _ in raster_plotter(image, X_AXIS, vectorized).plot():
+            count += 1
+        t = time.time() - t
+        print("%s: %d events, %f events/sec" % (name, count, count / max(t, 1e-9)))
+
+
+@benchmark
+def interpreter_path_100k():
+    operation = CutOperation()
+    operation.append(random_walk(100000))
+    device = new_device()
+    controller = device.pipe
+    device.buffer_limit = False  # Nothing is sent, the controller thread is not started.
+    for flush_size in (1, 1024):
+        controller.abort()
+        controller.state = THREAD_STATE_PAUSED
+        device.write_flush_size = flush_size
+        device.interpreter.command(COMMAND_SET_POSITION, (0, 0))
+        t = time.time()
+        interpret(device, operation)
+        t = time.time() - t
+        print("write_flush_size=%d: 100k segment path interpreted in %fs, %d bytes queued"
+              % (flush_size, t, len(controller)))
+
+
+@benchmark
+def controller_large_buffer():
+    packets = []
+    controller = instant_controller(packets)
+    controller.device.buffer_limit = False
+    data = random_commands(300000, 1)
+    t = time.time()
+    controller.write(data)
+    process(controller)
+    t = time.time() - t
+    print("PacketBuffer: %d packets from %d bytes in %fs" % (len(packets), len(data), t))
+
+
+@benchmark
+def simulated_ch341_throughput():
+    controller = new_device().pipe
+    controller.start = lambda: None
+    controller.driver = driver = CH341Driver(time_scale=1000.0)
+    controller.write(b'IBzzzS1P\n' * 200)
+    t = time.time()
+    while len(controller):
+        controller.process_queue()
+    t = time.time() - t
+    print("Simulated CH341: %d packets, %f packets/sec" % (driver.packets_accepted, driver.packets_accepted / t))
+
+
+@benchmark
+def packet_framing():
+    payloads = random_payloads(2000, 1)
+    framer = PacketFramer()
+    t = time.time()
+    for _ in range(10):
+        for payload in payloads:
+            framer(payload)
+    t = time.time() - t
+    print("Framing: %d frames/sec" % (len(payloads) * 10 / t))
+
+
+@benchmark
+def headless_signals():
+    operation = CutOperation()
+    operation.append(random_walk(20000))
+    device = new_device()
+    device.buffer_limit = False  # Nothing is sent, the controller thread is not started.
+    listener = lambda *args: None
+    for gui in (False, True):
+        if gui:
+            for code in ('interpreter;position', 'interpreter;plot', 'pipe;buffer'):
+                device.listen(code, listener)
+        device.interpreter.command(COMMAND_SET_POSITION, (0, 0))
+        t = time.time()
+        interpret(device, operation)
+        t = time.time() - t
+        print("GUI listeners %s: 20k segment path interpreted in %fs" % (gui, t))
+
+
+@benchmark
+def spooler_execute():
+    device = new_device(CountingPipe)
+    device.buffer_limit = False
+    execute = device.spooler.execute
+    commands = [(COMMAND_SET_SPEED, 30), (COMMAND_MODE_COMPACT,), (COMMAND_LASER_ON,)]
+    for i in range(20000):
+        commands.append((COMMAND_CUT, (i % 2 * 3, i % 3 * 3)))
+        commands.append((COMMAND_LASER_OFF,) if i % 2 else (COMMAND_LASER_ON,))
+    commands.append((COMMAND_MODE_DEFAULT,))
+    t = time.time()
+    for command in commands:
+        execute(*command)
+    t = time.time() - t
+    print("Spooler.execute: %d commands/sec, %d bytes" % (len(commands) / t, device.pipe.count))
+
+
+@benchmark
+def speedcode_batch():
+    speeds = [i / 100.0 for i in range(1, 24000)]
+    t = time.time()
+    scalar_codes = [LaserSpeed.get_code_from_speed(speed, board="M2") for speed in speeds]
+    t_scalar = time.time() - t
+    t = time.time()
+    LaserSpeed.get_codes_from_speeds(speeds, board="M2")
+    t_batch = time.time() - t
+    print("LaserSpeed: %d speedcodes, get_code_from_speed %fs, get_codes_from_speeds %fs (numpy: %s)"
+          % (len(speeds), t_scalar, t_batch, numpy is not None))
+    LaserSpeed.get_speed_from_code(scalar_codes[0], "M2")  # Builds the table.
+    t = time.time()
+    for speed_code in scalar_codes:
+        LaserSpeed.get_speed_from_code(speed_code, "M2")
+    print("LaserSpeed: %d speedcodes read in %fs" % (len(scalar_codes), time.time() - t))
+
+
+@benchmark
+def raster_group_runs():
+    interpreter = new_device().interpreter
+    r = random.Random(1)
+    events = [(0, 0, 0)]
+    for y in range(200):
+        x = 0
+        for i in range(20):
+            x += r.randint(1, 40)
+            events.append((x, y, r.choice((0, 1.0))))
+        events.append((x, y + 1, 0))
+        events.append((0, y + 1, 0))
+    pipelines = (("group_plots", lambda: interpreter.group_plots(0, 0, interpreter.ungroup_plots(events))),
+                 ("group_runs", lambda: interpreter.group_runs(0, 0, events)))
+    for name, generate in pipelines:
+        interpreter.pulse_total = 0.0
+        t = time.time()
+        count = len(list(generate()))
+        t = time.time() - t
+        print("%s: %d runs to %d groups in %fs" % (name, len(events), count, t))
+
+
+@benchmark
+def line_runs_cut():
+    commands = [(COMMAND_SET_SPEED, 20.0), (COMMAND_MODE_COMPACT,)]
+    for i in range(50):
+        commands.append((COMMAND_CUT, (7874, 1000 + i * 40)))  # 200mm, at 1000 dpi.
+        commands.append((COMMAND_SHIFT, (0, 1000 + i * 40 + 20)))
+    for name, per_pixel in (("plot_line", True), ("plot_line_runs", False)):
+        t = time.time()
+        data = interpret_commands(commands, per_pixel)
+        t = time.time() - t
+        print("%s: %d 200mm segments, %d bytes in %fs" % (name, len(commands) - 2, len(data), t))
+
+
+@benchmark
+def plot_cache_repeated_passes():
+    PLOT_CACHE.clear()
+    path = Path()
+    for i in range(50):
+        path.append(CubicBezier((i * 100, 0), (i * 100 + 3000, 500), (i * 100 - 2000, 2500), (i * 100, 3000)))
+    for name in ("first pass", "second pass"):
+        t = time.time()
+        count = len(list(path.plot()))
+        print("Path.plot() %s: %d pixels in %fs" % (name, count, time.time() - t))
+    print(PLOT_CACHE.stats())
+
+
+@benchmark
+def packed_path_500k():
+    d = random_d(500000)
+    for cls in (Path, PackedPath):
+        t = time.time()
+        path = cls(d)
+        t_load = time.time() - t
+        path *= Matrix("scale(2) rotate(10)")
+        t = time.time()
+        bbox = path.bbox()
+        t_bbox = time.time() - t
+        t = time.time()
+        path = abs(path)
+        t_abs = time.time() - t
+        tracemalloc.start()
+        copied = copy(path)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del copied
+        print("%s: 500k segments loaded in %fs, %d bytes, bbox %fs, abs %fs, %s"
+              % (cls.__name__, t_load, memory, t_bbox, t_abs, str(bbox)))
+
+
+@benchmark
+def reify_100k():
+    path = Path(random_d(100000))
+    path *= "scale(2) rotate(10)"
+    segments = [copy(segment) for segment in path]
+    t = time.time()
+    for segment in segments:
+        segment *= path.transform
+    t_segments = time.time() - t
+    segments = [copy(segment) for segment in path]
+    t = time.time()
+    Path.transform_segments(segments, path.transform)
+    t_batch = time.time() - t
+    print("100k segment transform: %fs per segment, %fs batched" % (t_segments, t_batch))
+    t = time.time()
+    for i in range(10000):
+        Matrix("translate(3, 4) scale(2) rotate(10)")
+    print("10000 transform strings parsed in %fs" % (time.time() - t))
+
+
+def main(names):
+    for function in BENCHMARKS:
+        if not names or function.__name__ in names:
+            function()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
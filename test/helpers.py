@@ -0,0 +1,15 @@
+from DefaultModules import K40StockBackend
+from Kernel import Kernel
+
+
+def new_device(pipe=None):
+    """
+    :param pipe: Pipe class, if given the device pipe is replaced with one made for the device.
+    :return: the default device of a new kernel with the stock K40 backend.
+    """
+    kernel = Kernel()
+    kernel.add_module('K40Stock', K40StockBackend())
+    device = kernel.devices['']
+    if pipe is not None:
+        device.pipe = pipe(device)
+    return device
@@ -0,0 +1,83 @@
+import time
+import unittest
+
+from CH341SimulatorDriver import CH341Driver
+from K40Controller import STATUS_OK, STATUS_BUSY, STATUS_FINISH, STATUS_PACKET_REJECTED
+from LaserOperation import CutOperation
+from PacketFraming import onewire_crc
+from svgelements import Path
+
+from helpers import new_device
+from test_interpreter_writes import interpret
+from test_k40_controller import reference_packets
+
+
+def frame(payload):
+    payload = payload + b'F' * (30 - len(payload))
+    return b'\x00' + payload + bytes([onewire_crc(payload)])
+
+
+class TestCH341Simulator(unittest.TestCase):
+
+    def test_rejects_bad_crc(self):
+        driver = CH341Driver(latency=0)
+        driver.open()
+        driver.write(frame(b'IPP'))
+        self.assertEqual(driver.get_status()[1], STATUS_FINISH)  # Executed at once, nothing to wait for.
+        self.assertEqual(driver.get_status()[1], STATUS_OK)
+        bad = bytearray(frame(b'IPP'))
+        bad[31] ^= 0xFF
+        driver.write(bytes(bad))
+        self.assertEqual(driver.get_status()[1], STATUS_PACKET_REJECTED)
+        self.assertEqual(driver.packets_accepted, 1)
+        self.assertEqual(driver.packets_rejected, 1)
+
+    def test_busy_then_finish(self):
+        driver = CH341Driver(fifo_packets=2, time_scale=1.0, latency=0)
+        driver.open()
+        driver.write(frame(b'IBzzzzzzzzzS1P'))  # Rapid move taking 0.57 seconds.
+        driver.write(frame(b'IPP'))
+        self.assertEqual(driver.get_status()[1], STATUS_BUSY)
+        driver.write(frame(b'IPP'))
+        self.assertEqual(driver.get_status()[1], STATUS_PACKET_REJECTED)
+        driver.time_scale = 1000.0
+        time.sleep(0.01)
+        self.assertEqual(driver.get_status()[1], STATUS_FINISH)
+        self.assertEqual(driver.get_status()[1], STATUS_OK)
+
+    def test_speedcode_timing(self):
+        driver = CH341Driver(latency=0)
+        self.assertEqual(driver.parse(b'CV1151911011002218N')[0], len(b'CV1151911011002218'))
+        self.assertAlmostEqual(driver.speed, 10.0, delta=0.5)
+        driver.parse(b'S1E')
+        self.assertAlmostEqual(driver.parse(b'394')[1], 1.0, delta=0.05)  # 10mm at 10mm/s.
+
+    def test_speedcode_split_across_packets(self):
+        driver = CH341Driver(latency=0)
+        driver.open()
+        driver.write(frame(b'I' * 29 + b'C'))
+        driver.get_status()
+        self.assertEqual(bytes(driver.fifo), b'C')  # Held until the rest of the command arrives.
+        driver.write(frame(b'V1151911011002218N'))
+        driver.get_status()
+        self.assertAlmostEqual(driver.speed, 10.0, delta=0.5)
+
+    def test_controller_against_simulator(self):
+        device = new_device()
+        controller = device.pipe
+        controller.start = lambda: None  # Processed here rather than in the controller thread.
+        controller.driver = driver = CH341Driver(fifo_packets=4, time_scale=1000.0, latency=0)
+
+        operation = CutOperation()
+        for i in range(10):
+            operation.append(Path("M%d,1000 h2000 v2000 h-2000 z" % (1000 + 10 * i)))
+        interpret(device, operation)
+        data = bytes(controller.queue)
+        t = time.time()
+        while len(controller) and time.time() - t < 30:
+            controller.process_queue()
+        self.assertEqual(len(controller), 0)
+        expected = b''.join(p for p in reference_packets(data) if len(p) == 30)
+        self.assertEqual(bytes(driver.received), expected)
+        self.assertGreater(controller.busy_time, 0.0)
+        self.assertEqual(driver.packets_rejected, 0)
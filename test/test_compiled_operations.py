@@ -0,0 +1,101 @@
+import unittest
+
+from LaserCommandConstants import *
+from LaserOperation import CutOperation, EngraveOperation
+from svgelements import Path
+
+from helpers import new_device
+from test_raster_plotter import MockPipe
+
+
+def spool(device, element):
+    """Runs the element through the interpreter the way the spooler thread does, returns the commands run."""
+    commands = []
+    for e in device.interpreter.spool(element, element.generate)():
+        commands.append(e[0] if isinstance(e, tuple) else e)
+        if isinstance(e, tuple):
+            device.interpreter.command(e[0], *e[1:])
+        else:
+            device.interpreter.command(e)
+    return commands
+
+
+class TestCompiledOperations(unittest.TestCase):
+
+    def setUp(self):
+        self.device = new_device(MockPipe)
+
+    def run_from_origin(self, element):
+        self.device.pipe.data = b''
+        self.device.interpreter.command(COMMAND_SET_POSITION, (0, 0))
+        commands = spool(self.device, element)
+        return self.device.pipe.data, commands
+
+    def operation(self):
+        operation = CutOperation()
+        operation.append(Path("M100,100 L400,120 Q500,500 100,400 Z"))
+        operation.append(Path("M600,600 h100 v100 h-100 Z", transform="rotate(10)"))
+        return operation
+
+    def test_replay_matches_generated_bytes(self):
+        operation = self.operation()
+        expected, _ = self.run_from_origin(operation)
+        end = self.device.interpreter.snapshot()
+
+        self.device.compile_operations = True
+        recorded, commands = self.run_from_origin(operation)
+        self.assertEqual(recorded, expected)
+        self.assertIn(COMMAND_PLOT, commands)
+        replayed, commands = self.run_from_origin(operation)
+        self.assertEqual(replayed, expected)
+        self.assertEqual(set(commands), {COMMAND_FUNCTION})
+        self.assertEqual(self.device.interpreter.snapshot(), end)
+
+    def test_changes_invalidate(self):
+        self.device.compile_operations = True
+        operation = self.operation()
+        self.run_from_origin(operation)
+        operation[1].transform.post_translate(5, 0)
+        _, commands = self.run_from_origin(operation)
+        self.assertIn(COMMAND_PLOT, commands)
+        operation.speed = 20.0
+        _, commands = self.run_from_origin(operation)
+        self.assertIn(COMMAND_PLOT, commands)
+        self.device.autolock = False
+        _, commands = self.run_from_origin(operation)
+        self.assertIn(COMMAND_PLOT, commands)
+        engrave = EngraveOperation(operation)
+        _, commands = self.run_from_origin(engrave)
+        self.assertIn(COMMAND_PLOT, commands)
+        _, commands = self.run_from_origin(engrave)
+        self.assertNotIn(COMMAND_PLOT, commands)
+
+    def test_aborted_run_is_not_kept(self):
+        self.device.compile_operations = True
+        operation = self.operation()
+        generate = self.device.interpreter.spool(operation, operation.generate)()
+        next(generate)
+        self.assertIs(self.device.pipe.__class__, MockPipe)  # The pipe is never replaced while recording.
+        generate.close()
+        self.assertIsNone(self.device.interpreter.recording)
+        self.assertEqual(len(self.device.interpreter.compiled), 0)
+
+    def test_abandoned_recording_ends(self):
+        self.device.compile_operations = True
+        interpreter = self.device.interpreter
+        operation = self.operation()
+        abandoned = interpreter.spool(operation, operation.generate)()
+        next(abandoned)  # Still referenced, so never closed.
+        recording = interpreter.recording
+        self.assertIsNotNone(recording)
+        operation = self.operation()
+        recorded, _ = self.run_from_origin(operation)
+        self.assertEqual(len(recording), 0)
+        abandoned.close()
+        self.assertEqual([data for data, _, _ in interpreter.compiled.values()], [recorded])
+
+    def test_disabled_by_default(self):
+        operation = self.operation()
+        self.assertFalse(self.device.compile_operations)
+        generate = operation.generate
+        self.assertIs(self.device.interpreter.spool(operation, generate), generate)
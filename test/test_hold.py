@@ -0,0 +1,84 @@
+import threading
+import time
+import unittest
+
+from Kernel import Pipe, THREAD_STATE_ABORT
+
+from helpers import new_device
+from test_k40_controller import instant_controller
+
+
+class LengthPipe(Pipe):
+    def __init__(self, device=None):
+        Pipe.__init__(self, device)
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def write(self, bytes_to_write):
+        self.length += len(bytes_to_write)
+
+
+class TestHold(unittest.TestCase):
+
+    def setUp(self):
+        self.device = new_device(LengthPipe)
+        self.pipe = self.device.pipe
+        self.device.buffer_limit = True
+        self.device.buffer_max = 1000
+
+    def hold_in_thread(self):
+        released = []
+
+        def hold():
+            try:
+                self.device.hold()
+                released.append(time.time())
+            except InterruptedError:
+                released.append(None)
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        time.sleep(0.05)
+        return thread, released
+
+    def test_no_hold_below_high_watermark(self):
+        self.pipe.length = 1000
+        t = time.time()
+        self.device.hold()
+        self.assertLess(time.time() - t, 0.01)
+
+    def test_resumes_at_low_watermark(self):
+        self.pipe.length = 1200
+        thread, released = self.hold_in_thread()
+        self.pipe.length = 800  # Below the high watermark, above the low.
+        self.device.release_hold()
+        time.sleep(0.05)
+        self.assertEqual(released, [])
+        self.pipe.length = 400
+        t = time.time()
+        self.device.release_hold()
+        thread.join(5)
+        self.assertEqual(len(released), 1)
+        self.assertLess(released[0] - t, 0.05)
+
+    def test_abort_interrupts_hold(self):
+        self.pipe.length = 1200
+        thread, released = self.hold_in_thread()
+        self.device.spooler.thread.set_state(THREAD_STATE_ABORT)
+        thread.join(5)
+        self.assertEqual(released, [None])
+
+    def test_controller_drain_releases_hold(self):
+        controller = instant_controller([])
+        device = controller.device
+        device.buffer_max = 300
+        controller.write(b'IBzzzS1P\n' * 40)
+        self.device = device
+        thread, released = self.hold_in_thread()
+        while len(controller) > 150:
+            self.assertEqual(released, [])
+            controller.process_queue()
+        thread.join(5)
+        self.assertEqual(len(released), 1)
@@ -0,0 +1,55 @@
+import unittest
+
+from Kernel import Interpreter
+from LaserCommandConstants import *
+from LhymicroInterpreter import LhymicroInterpreter
+
+from helpers import new_device
+from test_raster_plotter import MockPipe
+
+
+class TestInterpreterDispatch(unittest.TestCase):
+
+    def setUp(self):
+        self.device = new_device(MockPipe)
+
+    def test_spooled_bytes(self):
+        interpreter = self.device.interpreter
+        for command in [(COMMAND_SET_SPEED, 30), (COMMAND_MODE_COMPACT,), (COMMAND_LASER_ON,),
+                        (COMMAND_CUT, (20, 15)), (COMMAND_CUT_QUAD, (25, 25, 30, 10)), (COMMAND_LASER_OFF,),
+                        (COMMAND_SHIFT, (50, 50)), (COMMAND_MODE_DEFAULT,), (COMMAND_HOME,)]:
+            interpreter.command(*command)
+        self.assertEqual(self.device.pipe.data,
+                         b'ICV1952342031000086NBRS1EDUDMbBaMcBaMcBaMcBaMcBaMaUDMaRaMbBaaLMbLaMaLaMaLaMaLaURMaRa'
+                         b'MaRaMaRaMaRaMaRaMaRaMaRaMaRaMaRaMaRaMaRaMaRaMaRaMaRaMaRaMaRaMaRaMaRaMaRaMaRaFNSE-\n'
+                         b'IPP\n')
+
+    def test_realtime_commands(self):
+        interpreter = self.device.interpreter
+        interpreter.realtime_command(COMMAND_SET_POSITION, (10, 20))
+        self.assertEqual((self.device.current_x, self.device.current_y), (10, 20))
+        self.assertIn("x=10.000000", interpreter.realtime_command(COMMAND_STATUS))
+        self.assertIsNone(interpreter.realtime_command(COMMAND_HOME))  # Not performed in realtime.
+        self.assertEqual(self.device.pipe.data, b'')
+
+    def test_extend_handlers(self):
+        calls = []
+
+        class DwellInterpreter(LhymicroInterpreter):
+            def __init__(self, device):
+                LhymicroInterpreter.__init__(self, device)
+                self.command_handlers[COMMAND_BEEP] = calls.append
+
+        interpreter = DwellInterpreter(self.device)
+        interpreter.command(COMMAND_BEEP, 5)
+        interpreter.command(COMMAND_HOME)
+        self.assertEqual(calls, [5])
+        self.assertEqual(self.device.pipe.data, b'IPP\n')
+
+    def test_base_interpreter(self):
+        interpreter = Interpreter(self.device)
+        self.assertIs(interpreter.command(COMMAND_HOME), NotImplementedError)
+        interpreter.command_handlers[COMMAND_STATUS] = lambda values: 'ok'
+        self.assertEqual(interpreter.realtime_command(COMMAND_STATUS), 'ok')
+        interpreter.realtime_fallback = False
+        self.assertIsNone(interpreter.realtime_command(COMMAND_HOME))
@@ -0,0 +1,121 @@
+from __future__ import print_function
+
+import random
+import threading
+import unittest
+
+from LaserCommandConstants import *
+from LaserOperation import CutOperation, RasterOperation
+from svgelements import Path, Move, Line, SVGImage
+
+from helpers import new_device
+from test_raster_plotter import MockPipe, random_image, Image
+
+
+def random_walk(segments, seed=0):
+    r = random.Random(seed)
+    x, y = 1000, 1000
+    path = Path(Move((x, y)))
+    for _ in range(segments):
+        start = (x, y)
+        x += r.choice((-3, 0, 3))
+        y += r.choice((-3, 3))
+        path.append(Line(start, (x, y)))
+    return path
+
+
+def interpret(device, operation):
+    for e in operation.generate():
+        if isinstance(e, tuple):
+            device.interpreter.command(e[0], *e[1:])
+        else:
+            device.interpreter.command(e)
+
+
+class TestInterpreterWrites(unittest.TestCase):
+
+    def write_counts(self, operation, flush_size):
+        device = new_device(MockPipe)
+        pipe = device.pipe
+        writes = [0]
+        write = pipe.write
+
+        def counted_write(bytes_to_write):
+            writes[0] += 1
+            write(bytes_to_write)
+
+        pipe.write = counted_write
+        device.write_flush_size = flush_size
+        interpret(device, operation)
+        self.assertEqual(len(device.interpreter.write_buffer), 0)
+        return pipe.data, writes[0]
+
+    def test_buffered_bytes_match(self):
+        operation = CutOperation()
+        operation.append(random_walk(2000))
+        unbuffered, unbuffered_writes = self.write_counts(operation, 1)
+        buffered, buffered_writes = self.write_counts(operation, 1024)
+        self.assertEqual(unbuffered, buffered)
+        self.assertLess(buffered_writes * 10, unbuffered_writes)
+
+    @unittest.skipIf(Image is None, "Pillow is required.")
+    def test_buffered_raster_bytes_match(self):
+        operation = RasterOperation()
+        operation.append(SVGImage(image=random_image("L", 40, 30, seed=4)))
+        unbuffered, _ = self.write_counts(operation, 1)
+        buffered, _ = self.write_counts(operation, 64)
+        self.assertEqual(unbuffered, buffered)
+
+    def test_realtime_leaves_buffer(self):
+        device = new_device(MockPipe)
+        pipe = device.pipe
+        device.write_flush_size = 1 << 20
+        interpreter = device.interpreter
+        interpreter.command(COMMAND_SET_SPEED, 30)
+        interpreter.command(COMMAND_MODE_COMPACT)
+        pipe.data = b''
+        buffered = b'BBBBBBBB'
+        seen = []
+
+        def part_way():
+            interpreter.write(buffered)  # A command part way through, when the realtime command arrives.
+            thread = threading.Thread(target=interpreter.realtime_command, args=(COMMAND_SET_SPEED, 50))
+            thread.start()
+            thread.join()
+            seen.append((bytes(interpreter.write_buffer), pipe.data))
+
+        interpreter.command(COMMAND_FUNCTION, part_way)
+        buffer, realtime = seen[0]
+        self.assertEqual(buffer, buffered)
+        self.assertNotEqual(realtime, b'')
+        self.assertEqual(pipe.data, realtime + buffered)
+
+    def test_hold_flushes(self):
+        device = new_device(MockPipe)
+        pipe = device.pipe
+        device.write_flush_size = 1 << 20
+        interpreter = device.interpreter
+        seen = []
+
+        def part_way():
+            interpreter.write(b'BBBBBBBB')
+            device.hold_condition = lambda e: len(pipe.data) == 0
+            interpreter.on_plot(100, 100, 1)
+            seen.append((len(interpreter.write_buffer), pipe.data))
+
+        interpreter.command(COMMAND_FUNCTION, part_way)
+        self.assertEqual(seen, [(0, b'BBBBBBBB')])
+
+    def test_direct_calls_reach_pipe(self):
+        device = new_device(MockPipe)
+        pipe = device.pipe
+        device.write_flush_size = 1 << 20
+        interpreter = device.interpreter
+        interpreter.move_relative(100, 0)  # As jogged from the Navigation panel.
+        self.assertEqual(pipe.data, b'IB100S1P\n')
+        interpreter.home()
+        self.assertEqual(pipe.data, b'IB100S1P\nIPP\n')
+        interpreter.lock_rail()
+        interpreter.unlock_rail()
+        self.assertEqual(pipe.data, b'IB100S1P\nIPP\nIS1P\nIS2P\n')
+        self.assertEqual(len(interpreter.write_buffer), 0)
@@ -0,0 +1,200 @@
+from __future__ import print_function
+
+import random
+import threading
+import time
+import unittest
+
+from K40Controller import PacketBuffer, POLL_INTERVAL_MAX, STATUS_OK, STATUS_BUSY, STATUS_PACKET_REJECTED
+
+from helpers import new_device
+
+
+def reference_packets(data):
+    """The packets of the data as produced by slicing a bytes buffer."""
+    packets = []
+    buffer = data
+    while len(buffer):
+        find = buffer.find(b'\n', 0, 30)
+        if find == -1:
+            length = min(30, len(buffer))
+        else:
+            length = min(30, len(buffer), find + 1)
+        packet = buffer[:length]
+        if packet.endswith((b'-', b'*', b'&', b'!')):
+            packet += buffer[length:length + 1]
+            length += 1
+        if packet.endswith(b'\n'):
+            packet = packet[:-1]
+            if packet.endswith(b'-'):
+                packet = packet[:-1]
+            if len(packet) != 0:
+                packet += b'F' * (30 - len(packet))
+        packets.append(packet)
+        buffer = buffer[length:]
+    return packets
+
+
+def random_commands(size, seed=0):
+    r = random.Random(seed)
+    data = bytearray()
+    while len(data) < size:
+        data += bytes(r.choice(b'BTLRNUD0123456789') for _ in range(r.randint(0, 45)))
+        data += r.choice((b'\n', b'-\n', b'N', b'S1P\n', b''))
+    return bytes(data) + b'\n'  # Data after the last line end cannot fill a packet.
+
+
+def instant_controller(packets):
+    """
+    Controller whose queue is processed by the caller rather than by the controller thread, sending to an instant
+    mock board. The packets sent are appended to packets.
+    """
+    device = new_device()
+    device.mock = True
+    controller = device.pipe
+    controller.start = lambda: None
+    controller.send_packet = packets.append
+
+    def update_status():
+        controller.status = [255, 206, 0, 0, 0, 1]
+
+    controller.update_status = update_status
+    return controller
+
+
+def process(controller):
+    while controller.process_queue():
+        pass
+
+
+class TestK40Controller(unittest.TestCase):
+
+    def setUp(self):
+        self.packets = []
+        self.controller = instant_controller(self.packets)
+        self.device = self.controller.device
+        self.kernel = self.device.kernel
+
+    def process(self):
+        process(self.controller)
+
+    def test_packetization_matches(self):
+        for seed in range(5):
+            data = random_commands(3000, seed)
+            del self.packets[:]
+            self.controller.write(data)
+            self.process()
+            expected = [packet for packet in reference_packets(data) if len(packet) == 30]
+            self.assertEqual(self.packets, expected)
+            self.assertEqual(len(self.controller), 0)
+
+    def test_writes_between_packets(self):
+        data = random_commands(2000, 7)
+        for i in range(0, len(data), 97):
+            self.controller.write(data[i:i + 97])
+            self.controller.process_queue()
+        self.process()
+        self.assertEqual(b''.join(self.packets), b''.join(p for p in reference_packets(data) if len(p) == 30))
+
+    def test_preempt_goes_first(self):
+        self.controller.write(b'IBzzzS1P\n' * 10)
+        self.controller.process_queue()
+        self.controller.realtime_write(b'PN!\n')
+        self.controller.realtime_write(b'I*\n')
+        self.controller.pause = lambda: None
+        self.controller.abort = lambda: None
+        self.process()
+        self.assertEqual(self.packets[1], b'I' + b'F' * 29)
+        self.assertEqual(self.packets[2], b'PN' + b'F' * 28)
+        self.assertEqual(self.packets[3], b'IBzzzS1P' + b'F' * 22)
+
+    def test_write_wakes_wait(self):
+        for wake in (lambda: self.controller.write(b'I'), lambda: self.controller.realtime_write(b'I'),
+                     self.controller.pause, self.controller.resume, self.controller.abort):
+            timer = threading.Timer(0.05, wake)
+            timer.start()
+            t = time.time()
+            self.controller.wait(5)
+            self.assertLess(time.time() - t, 1.0)
+            timer.join()
+
+    def test_thread_sends_after_idle(self):
+        del self.controller.start  # Use the controller thread.
+        self.controller.start()
+        try:
+            time.sleep(0.5)
+            t = time.time()
+            self.controller.write(b'IBzzzS1P\n')
+            while len(self.packets) == 0 and time.time() - t < 5:
+                time.sleep(0.001)
+            self.assertLess(time.time() - t, 0.25)
+        finally:
+            self.controller.abort()
+            self.controller.thread.join(5)
+        self.assertFalse(self.controller.thread.is_alive())
+
+    def simulate_board(self, statuses):
+        """Board answering the status requests with the given statuses in turn, then OK."""
+        polls = [0]
+
+        def update_status():
+            polls[0] += 1
+            self.controller.status = [255, statuses.pop(0) if statuses else STATUS_OK, 0, 0, 0, 1]
+
+        self.controller.update_status = update_status
+        return polls
+
+    def test_pre_send_check_skipped_after_ok(self):
+        polls = self.simulate_board([])
+        self.controller.write(b'IBzzzS1P\n' * 20)
+        self.process()
+        self.assertEqual(len(self.packets), 20)
+        # One check before the first packet, then only the status after each packet.
+        self.assertEqual(polls[0], 21)
+
+    def test_busy_board_learns_poll_interval(self):
+        self.controller.write(b'IBzzzS1P\n')
+        self.process()
+        for _ in range(10):
+            self.simulate_board([STATUS_BUSY, STATUS_BUSY, STATUS_BUSY, STATUS_OK])
+            self.controller.accepting = False
+            self.controller.write(b'IBzzzS1P\n')
+            self.process()
+        self.assertEqual(len(self.packets), 11)
+        self.assertLess(self.controller.poll_interval, POLL_INTERVAL_MAX)
+        self.assertGreater(self.controller.busy_time, 0.0)
+
+    def test_rejected_packet_is_resent(self):
+        self.simulate_board([STATUS_OK, STATUS_PACKET_REJECTED])
+        rejected = self.device.rejected_count
+        self.controller.write(b'IBzzzS1P\n')
+        self.assertFalse(self.controller.process_queue())
+        self.assertFalse(self.controller.accepting)
+        self.process()
+        self.assertEqual(self.device.rejected_count, rejected + 1)
+        self.assertEqual(len(self.packets), 2)
+        self.assertEqual(len(self.controller), 0)
+
+    def test_statistics_signal(self):
+        self.controller.statistics_time -= 2.0
+        self.controller.write(b'IBzzzS1P\n' * 4)
+        self.process()
+        self.kernel.process_queue()
+        packets_per_second, busy_time, rejected, poll_interval = self.kernel.last_signal(';pipe;statistics')
+        self.assertGreater(packets_per_second, 0)
+        self.assertEqual(rejected, self.device.rejected_count)
+
+    def test_packet_buffer(self):
+        buffer = PacketBuffer()
+        buffer.append(b'0123456789')
+        buffer.consume(4)
+        buffer.prepend(b'ab')
+        self.assertEqual(bytes(buffer), b'ab456789')
+        buffer.prepend(b'abcdef')
+        self.assertEqual(bytes(buffer), b'abcdefab456789')
+        self.assertEqual(buffer.find(b'4', 30), 8)
+        self.assertEqual(buffer.find(b'4', 8), -1)
+        buffer.consume(12)
+        self.assertEqual(buffer.peek(30), b'89')
+        buffer.consume(3)
+        self.assertEqual(len(buffer), 0)
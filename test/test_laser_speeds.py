@@ -3289,3 +3289,81 @@ class TestLaserSpeeds(unittest.TestCase):
             determined_speed = LaserSpeed.get_speed_from_code(speed_code, board="M2", fix_speeds=True)
             determined_speed /= flaw
             self.assertAlmostEqual(speed, determined_speed, delta=speed / 100)
+
+    def test_cached_speedcode(self):
+        LaserSpeed.clear_speedcode_cache()
+        for i in range(2):
+            # First pass fills the cache, second pass reads from it.
+            for line in codes:
+                # <SpeedCode> <Board> <mm_per_second> <step_amount>
+                values = line.split(" ")
+                board = values[1]
+                mm_per_second = float(values[2])
+                step_amount = int(values[3])
+                for fix_lows in (False, True):
+                    created_speedcode = LaserSpeed.get_code_from_speed(mm_per_second, step_amount, board,
+                                                                       fix_limit=True, fix_lows=fix_lows)
+                    cached_speedcode = LaserSpeed.get_cached_code_from_speed(mm_per_second, step_amount, board,
+                                                                             fix_limit=True, fix_lows=fix_lows)
+                    encoded_speedcode = LaserSpeed.get_encoded_code_from_speed(mm_per_second, step_amount, board,
+                                                                               fix_limit=True, fix_lows=fix_lows)
+                    self.assertEqual(created_speedcode, cached_speedcode)
+                    self.assertEqual(created_speedcode.encode('utf8'), encoded_speedcode)
+
+    def test_cached_speedcode_object(self):
+        for line in codes:
+            values = line.split(" ")
+            board = values[1]
+            mm_per_second = float(values[2])
+            step_amount = int(values[3])
+            laser_speed = LaserSpeed(board, mm_per_second, step_amount, d_ratio=0.2, fix_speeds=True)
+            self.assertEqual(laser_speed.speedcode,
+                             LaserSpeed.get_code_from_speed(mm_per_second, step_amount, board, d_ratio=0.2,
+                                                            fix_speeds=True))
+            self.assertEqual(laser_speed.speedcode.encode('utf8'), laser_speed.speedcode_bytes)
+
+
+class TestLaserSpeedBatch(unittest.TestCase):
+
+    def check_batch(self, speeds, **kwargs):
+        batch_codes = LaserSpeed.get_codes_from_speeds(speeds, **kwargs)
+        batch_speeds = LaserSpeed.get_actual_speeds(speeds, **kwargs)
+        self.assertEqual(len(speeds), len(batch_codes))
+        self.assertEqual(len(speeds), len(batch_speeds))
+        for speed, batch_code, batch_speed in zip(speeds, batch_codes, batch_speeds):
+            speed_code = LaserSpeed.get_code_from_speed(speed, **kwargs)
+            self.assertEqual(speed_code, batch_code)
+            board = kwargs.get('board', 'M2')
+            fix_speeds = kwargs.get('fix_speeds', False)
+            self.assertEqual(LaserSpeed.get_speed_from_code(speed_code, board, fix_speeds), batch_speed)
+
+    def test_batch_codes(self):
+        for line in codes:
+            # <SpeedCode> <Board> <mm_per_second> <step_amount>
+            values = line.split(" ")
+            board = values[1]
+            mm_per_second = float(values[2])
+            step_amount = int(values[3])
+            self.check_batch([mm_per_second], raster_step=step_amount, board=board)
+            self.check_batch([mm_per_second], raster_step=step_amount, board=board, fix_limit=True, fix_lows=True)
+
+    def test_batch_sweep(self):
+        speeds = [i / 10.0 for i in range(0, 5000, 7)] + [7.0, 25.4, 60.0, 127.0, 240.0, 320.0]
+        boards = ["A", "B", "B1", "B2", "M", "M1", "M2"]
+        for board in boards:
+            self.check_batch(speeds, board=board)
+            self.check_batch(speeds, board=board, fix_speeds=True, fix_lows=True)
+            self.check_batch(speeds, board=board, fix_limit=True, d_ratio=0.3)
+            self.check_batch(speeds, board=board, acceleration=3, suffix_c=True)
+            self.check_batch(speeds, board=board, raster_step=2)
+            self.check_batch(speeds, board=board, raster_step=(2, 1), raster_horizontal=False)
+
+    def test_speed_table(self):
+        for board in ("B1", "B2", "M2"):
+            for accel in (1, 3, 4):
+                for suffix_c in (False, True):
+                    b, m = LaserSpeed.get_equation(board, accel=accel, suffix_c=suffix_c)
+                    table = LaserSpeed.get_speed_table(b, m)
+                    self.assertEqual(65537, len(table))
+                    for value in range(0, 65537, 13):
+                        self.assertEqual(LaserSpeed.get_speed_from_value(value, b, m), table[value])
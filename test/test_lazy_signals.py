@@ -0,0 +1,134 @@
+import time
+import unittest
+
+from Kernel import Kernel
+from LaserCommandConstants import *
+
+from helpers import new_device
+
+
+class TestLazySignals(unittest.TestCase):
+
+    def setUp(self):
+        self.device = new_device()
+        self.kernel = self.device.kernel
+
+    def test_has_listeners(self):
+        listener = lambda e: None
+        self.assertFalse(self.device.has_listeners('interpreter;position'))
+        self.device.listen('interpreter;position', listener)
+        self.assertTrue(self.device.has_listeners('interpreter;position'))  # Before the listener is added.
+        self.kernel.process_queue()
+        self.assertTrue(self.kernel.has_listeners(';interpreter;position'))
+        self.device.unlisten('interpreter;position', listener)
+        self.kernel.process_queue()
+        self.assertFalse(self.device.has_listeners('interpreter;position'))
+
+    def test_lazy_signal(self):
+        calls = []
+
+        def message():
+            calls.append(1)
+            return 5
+
+        self.kernel.lazy_signal('lazy', message)
+        self.kernel.process_queue()
+        self.assertEqual(len(calls), 0)
+        self.assertEqual(self.kernel.last_signal('lazy'), (5,))
+        self.assertEqual(len(calls), 1)
+        received = []
+        self.kernel.listen('lazy', received.append)
+        self.kernel.process_queue()
+        self.kernel.lazy_signal('lazy', message)
+        self.kernel.process_queue()
+        self.assertEqual(received, [5, 5])
+
+    def test_late_listener_gets_latest(self):
+        for i in range(3):
+            self.kernel.lazy_signal('lazy', lambda: i)
+        self.kernel.signal('lazy', 'signalled')
+        self.kernel.process_queue()
+        self.assertEqual(self.kernel.last_signal('lazy'), ('signalled',))
+        self.kernel.lazy_signal('lazy', lambda: 'lazy')
+        received = []
+        self.kernel.listen('lazy', received.append)
+        self.kernel.process_queue()
+        self.assertEqual(received, ['lazy'])
+
+    def test_late_evaluation_matches_eager(self):
+        interpreter = self.device.interpreter
+        interpreter.command(COMMAND_SET_POSITION, (0, 0))
+        interpreter.move_relative(100, 50)
+        eager = (100, 50, 0, 0)
+        interpreter.command(COMMAND_SET_POSITION, (500, 500))  # Moved again before anything evaluates it.
+        self.assertEqual(self.kernel.last_signal(';interpreter;position'), (eager,))
+
+    def test_unlisten_unknown_listener(self):
+        listener = lambda e: None
+        self.kernel.listen('code', listener)
+        self.kernel.process_queue()
+        self.kernel.unlisten('code', lambda e: None)
+        self.kernel.process_queue()
+        self.assertTrue(self.kernel.has_listeners('code'))
+        self.kernel.unlisten('code', listener)
+        self.kernel.process_queue()
+        self.assertFalse(self.kernel.has_listeners('code'))
+
+
+class TestSignalPolicies(unittest.TestCase):
+
+    def setUp(self):
+        self.kernel = Kernel()
+
+    def test_latest_value(self):
+        received = []
+        self.kernel.listen('code', received.append)
+        for i in range(5):
+            self.kernel.signal('code', i)
+        self.kernel.process_queue()
+        self.assertEqual(received, [4])
+
+    def test_batch(self):
+        received = []
+        self.kernel.listen('code', received.append, batch=3)
+        self.kernel.process_queue()
+        for i in range(5):
+            self.kernel.signal('code', i)
+        self.kernel.process_queue()
+        self.assertEqual(received, [[(2,), (3,), (4,)]])
+        self.kernel.signal('code', 5)
+        self.kernel.process_queue()
+        self.assertEqual(received[-1], [(5,)])
+        self.kernel.unlisten('code', received.append)
+        self.kernel.process_queue()
+        self.kernel.signal('code', 6)
+        self.kernel.process_queue()
+        self.assertEqual(len(received), 2)
+        self.assertNotIn('code', self.kernel.batches)
+
+    def test_batch_gets_last_message_when_added(self):
+        received = []
+        self.kernel.signal('code', 1)
+        self.kernel.process_queue()
+        self.kernel.listen('code', received.append, batch=10)
+        self.kernel.process_queue()
+        self.assertEqual(received, [[(1,)]])
+
+    def test_throttled(self):
+        received = []
+        self.kernel.listen('code', received.append, rate=20)
+        self.kernel.process_queue()
+        self.kernel.signal('code', 1)
+        self.kernel.process_queue()
+        self.kernel.signal('code', 2)
+        self.kernel.process_queue()
+        self.kernel.signal('code', 3)
+        self.kernel.process_queue()
+        self.assertEqual(received, [1])
+        time.sleep(0.06)
+        self.kernel.process_queue()  # Nothing new signalled, the held message is delivered.
+        self.assertEqual(received, [1, 3])
+        self.kernel.unlisten('code', received.append)
+        self.kernel.process_queue()
+        self.assertEqual(len(self.kernel.throttled_listeners), 0)
+        self.assertFalse(self.kernel.has_listeners('code'))
@@ -0,0 +1,84 @@
+import random
+import unittest
+
+from LaserCommandConstants import *
+from svgelements import Line
+
+from helpers import new_device
+from test_raster_plotter import MockPipe
+
+
+def walk(runs):
+    """Explodes the runs back into single pixels."""
+    pixels = []
+    x = None
+    y = None
+    for next_x, next_y, on in runs:
+        if x is None:
+            x, y = next_x, next_y
+            pixels.append((x, y))
+            continue
+        dx = (next_x > x) - (next_x < x)
+        dy = (next_y > y) - (next_y < y)
+        while x != next_x or y != next_y:
+            x += dx
+            y += dy
+            pixels.append((x, y))
+    return pixels
+
+
+def interpret_commands(commands, per_pixel):
+    """
+    :param per_pixel: whether lines are plotted a pixel at a time rather than as runs.
+    :return: the bytes the commands are interpreted into.
+    """
+    device = new_device(MockPipe)
+    interpreter = device.interpreter
+    if per_pixel:
+        interpreter.group_runs = lambda sx, sy, g: interpreter.group_plots(sx, sy, interpreter.ungroup_plots(g))
+    interpreter.command(COMMAND_SET_POSITION, (0, 0))
+    for command in commands:
+        interpreter.command(*command)
+    interpreter.command(COMMAND_MODE_DEFAULT)
+    return device.pipe.data
+
+
+class TestLineRuns(unittest.TestCase):
+
+    def setUp(self):
+        self.device = new_device()
+
+    def test_runs_match_plot_line(self):
+        for x1 in range(-20, 21):
+            for y1 in range(-20, 21):
+                self.assertEqual(list(Line.plot_line(1, -2, x1, y1)), walk(Line.plot_line_runs(1, -2, x1, y1)))
+        r = random.Random(0)
+        for i in range(100):
+            line = [r.randint(-8000, 8000) for _ in range(4)]
+            self.assertEqual(list(Line.plot_line(*line)), walk(Line.plot_line_runs(*line)), line)
+
+    def test_group_runs_match(self):
+        interpreter = self.device.interpreter
+        r = random.Random(1)
+        for i in range(500):
+            line = [r.randint(-300, 300) for _ in range(4)]
+            state = (r.choice((1000.0, 600.0, 333.3)), r.choice((0.0, 400.0, 999.0)), r.random() < 0.8,
+                     r.random() < 0.5)
+            results = []
+            for generate in (lambda: interpreter.group_plots(line[0], line[1], Line.plot_line(*line)),
+                             lambda: interpreter.group_runs(line[0], line[1], Line.plot_line_runs(*line))):
+                interpreter.power, interpreter.pulse_total, interpreter.pulse_modulation, \
+                    interpreter.group_modulation = state
+                results.append((list(generate()), interpreter.pulse_total))
+            self.assertEqual(results[0], results[1], line)
+
+    def test_interpreter_bytes_match(self):
+        r = random.Random(2)
+        for power in (1000.0, 700.0, 250.0):
+            commands = [(COMMAND_SET_SPEED, 20.0), (COMMAND_SET_POWER, power), (COMMAND_MODE_COMPACT,)]
+            for i in range(40):
+                command = r.choice((COMMAND_CUT, COMMAND_CUT, COMMAND_MOVE, COMMAND_SHIFT))
+                commands.append((command, (r.randint(0, 1000), r.randint(0, 1000))))
+                if r.random() < 0.2:
+                    commands.append((COMMAND_LASER_ON,) if r.random() < 0.5 else (COMMAND_LASER_OFF,))
+            self.assertEqual(interpret_commands(commands, True), interpret_commands(commands, False), power)
@@ -0,0 +1,102 @@
+import random
+import unittest
+from array import array
+
+from LaserOperation import CutOperation, PLOT_BATCH
+from svgelements import Arc, Circle, Matrix, PackedPath, Path
+
+from test_packed_path import PATH_D, random_d
+
+
+def random_matrix(r):
+    return Matrix(r.uniform(-3, 3), r.uniform(-3, 3), r.uniform(-3, 3), r.uniform(-3, 3),
+                  r.uniform(-99, 99), r.uniform(-99, 99))
+
+
+def points(path):
+    return [(p.x, p.y) for segment in path for p in segment if p is not None]
+
+
+def sweeps(path):
+    return [segment.sweep for segment in path if isinstance(segment, Arc)]
+
+
+class TestMatrixBatch(unittest.TestCase):
+
+    def setUp(self):
+        Matrix.clear_parse_cache()
+
+    def test_transform_coordinates(self):
+        m = Matrix("translate(3, -4) rotate(33) scale(1.5, -2)")
+        values = [1.5, 2.25, -7.0, 3.0, float('nan'), float('nan'), 0.0, 0.0]
+        expected = []
+        for i in range(0, len(values), 2):
+            p = m.point_in_matrix_space((values[i], values[i + 1]))
+            expected.extend((p.x, p.y))
+        for coords in (list(values), array('d', values)):
+            m.transform_coordinates(coords)
+            self.assertEqual(expected[:4] + expected[6:], list(coords[:4]) + list(coords[6:]))
+            self.assertNotEqual(coords[4], coords[4])
+
+    def test_transform_segments_match(self):
+        r = random.Random(3)
+        for trial in range(20):
+            d = random_d(200, seed=trial) + " " + PATH_D
+            m = random_matrix(r)
+            expected = Path(d)
+            for segment in expected:
+                segment *= m
+            path = Path(d)
+            Path.transform_segments(path, m)
+            self.assertEqual(points(expected), points(path))
+            self.assertEqual(sweeps(expected), sweeps(path))
+
+    def test_reify_all(self):
+        r = random.Random(5)
+        paths = [Path(random_d(50, seed=i)) for i in range(10)] + [PackedPath(PATH_D)]
+        for path in paths[::3]:
+            path *= random_matrix(r)
+        m = Matrix("scale(1.25, -0.5) translate(10, 20)")
+        expected = [abs(path * m) for path in paths]
+        Path.reify_all(paths, "scale(1.25, -0.5) translate(10, 20)")
+        for e, path in zip(expected, paths):
+            self.assertTrue(path.transform.is_identity())
+            self.assertEqual(points(e), points(path))
+            self.assertEqual(e.d(), path.d())
+
+    def test_reify_all_listed_twice(self):
+        path = Path("M 0,0 L 30,40")
+        Path.reify_all([path, path], "scale(2)")
+        self.assertEqual(path.d(), "M 0,0 L 60,80")
+
+    def test_operation_plots(self):
+        r = random.Random(7)
+        operation = CutOperation()
+        for i in range(PLOT_BATCH + 10):
+            path = Path(random_d(5, seed=i), transform=random_matrix(r) if i % 3 else "rotate(15)")
+            operation.append(path)
+        operation.append(Circle(cx=5, cy=5, r=3, transform="scale(2)"))
+        plots = list(operation.plots())
+        self.assertEqual([abs(e).d() for e in operation], [plot.d() for plot in plots])
+        self.assertFalse(operation[1].transform.is_identity())  # The operation's own elements are left alone.
+
+    def test_reify_resets_length(self):
+        for cls in (Path, PackedPath):
+            path = cls("M 0,0 L 30,40 Q 50,0 90,40")
+            length = path.length()
+            path *= "scale(2)"
+            path.reify()
+            self.assertAlmostEqual(2 * length, path.length())
+
+    def test_parse_cache(self):
+        m = Matrix("rotate(30) translate(5, 6)")
+        self.assertEqual(1, len(Matrix._parsed))
+        cached = Matrix("rotate(30) translate(5, 6)")
+        self.assertEqual((m.a, m.b, m.c, m.d, m.e, m.f), (cached.a, cached.b, cached.c, cached.d, cached.e, cached.f))
+        cached.post_scale(2)
+        self.assertEqual(m, Matrix("rotate(30) translate(5, 6)"))
+        self.assertEqual(1, len(Matrix._parsed))
+        Matrix("translate(50%, 20)")
+        self.assertEqual(1, len(Matrix._parsed))
+        self.assertEqual(Matrix("translate(5mm)", ppi=96.0).e, Matrix("translate(5mm)", ppi=96.0).e)
+        self.assertNotEqual(Matrix("translate(5mm)", ppi=96.0).e, Matrix("translate(5mm)", ppi=1000.0).e)
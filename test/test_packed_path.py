@@ -0,0 +1,129 @@
+import os
+import random
+import tempfile
+import tracemalloc
+import unittest
+from copy import copy
+
+from svgelements import Arc, Close, CubicBezier, Line, Move, PackedPath, Path, Point, SVG
+
+PATH_D = "M 10,10 L 20,20 Q 30,0 40,20 T 60,20 C 70,0 80,40 90,20 S 110,40 120,20 A 30,20 15 0 1 160,40 z " \
+         "m 5,5 h 10 v 10 a 5,5 0 1 0 10,10 Z L 3,3"
+
+TRANSFORMS = ("scale(-1,1) rotate(30)", "translate(5,7) scale(2,3)", "skewX(10) scale(1,-2)")
+
+
+def random_d(segments, seed=0):
+    r = random.Random(seed)
+    parts = ["M 0,0"]
+    for i in range(segments):
+        k = r.random()
+        if k < 0.7:
+            parts.append("L %d,%d" % (r.randint(0, 5000), r.randint(0, 5000)))
+        elif k < 0.9:
+            parts.append("C %d,%d %d,%d %d,%d" % tuple(r.randint(0, 5000) for _ in range(6)))
+        elif k < 0.99:
+            parts.append("Q %d,%d %d,%d" % tuple(r.randint(0, 5000) for _ in range(4)))
+        else:
+            parts.append("Z M %d,%d" % (r.randint(0, 5000), r.randint(0, 5000)))
+    return " ".join(parts)
+
+
+def defined_points(path):
+    return [p for p in path.as_points() if p.x is not None]
+
+
+class TestPackedPath(unittest.TestCase):
+
+    def assertSamePath(self, path, packed):
+        self.assertEqual(len(path), len(packed))
+        self.assertEqual(path.d(), packed.d())
+        self.assertEqual(list(path), list(packed))
+
+    def test_parse_matches(self):
+        path = Path(PATH_D)
+        packed = PackedPath(PATH_D)
+        self.assertSamePath(path, packed)
+        self.assertEqual(path, packed)
+        self.assertEqual(list(path.plot()), list(packed.plot()))
+        self.assertEqual(defined_points(path), defined_points(packed))
+        self.assertEqual(path.bbox(), packed.bbox())
+
+    def test_transform_matches(self):
+        for transform in TRANSFORMS:
+            path = Path(PATH_D)
+            packed = PackedPath(PATH_D)
+            path *= transform
+            packed *= transform
+            self.assertEqual(path.bbox(), packed.bbox())
+            self.assertEqual(path.bbox(transformed=False), packed.bbox(transformed=False))
+            self.assertEqual(path.d(), packed.d())
+            path = abs(path)
+            packed = abs(packed)
+            self.assertIsInstance(packed, PackedPath)
+            self.assertTrue(packed.transform.is_identity())
+            self.assertSamePath(path, packed)
+            self.assertEqual(defined_points(path), defined_points(packed))
+
+    def test_materialized_segments(self):
+        path = Path(PATH_D)
+        packed = PackedPath(PATH_D)
+        packed[3].end = Point(1, 2)
+        path[3].end = Point(1, 2)
+        self.assertSamePath(path, packed)
+        packed[6].sweep = -packed[6].sweep
+        path[6].sweep = -path[6].sweep
+        path *= "rotate(20) scale(-1, 1)"
+        packed *= "rotate(20) scale(-1, 1)"
+        self.assertEqual(path.bbox(), packed.bbox())
+        self.assertSamePath(abs(path), abs(packed))
+
+    def test_mutations_match(self):
+        path = Path(PATH_D)
+        packed = PackedPath(PATH_D)
+        for p in (path, packed):
+            p[2] = Line((0, 0), (1, 1))
+            del p[3]
+            p.insert(1, Move((5, 5)))
+            p.insert(-1, Close())
+            p.append(CubicBezier(None, (1, 1), (2, 2), (3, 3)))
+            p.append(Arc(start=(3, 3), end=(5, 5), center=(5, 3), prx=(3, 3), pry=(5, 5), sweep=1.5))
+            p.extend(Path("L 4,4 Z"))
+            p += "M 40,40 L 50,50"
+        self.assertSamePath(path, packed)
+        path.reverse()
+        packed.reverse()
+        self.assertSamePath(path, packed)
+        copied = copy(packed)
+        self.assertIsInstance(copied, PackedPath)
+        copied[0].end = Point(-1, -1)
+        self.assertNotEqual(copied[0].end, packed[0].end)
+        self.assertSamePath(path, packed)
+
+    def test_svg_loads_packed(self):
+        d = random_d(20000, seed=1)
+        svg = '<svg xmlns="http://www.w3.org/2000/svg"><path d="%s" transform="scale(2)"/></svg>' % d
+        fd, filename = tempfile.mkstemp(suffix=".svg")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(svg)
+            element = list(SVG(filename).elements())[-1]
+        finally:
+            os.remove(filename)
+        self.assertIsInstance(element, PackedPath)
+        path = Path(d)
+        path *= "scale(2)"
+        path.reify()
+        self.assertEqual(path.bbox(), element.bbox())
+        self.assertEqual(path.d(), element.d())
+
+    def test_packed_memory(self):
+        d = random_d(5000)
+        memory = []
+        for cls in (Path, PackedPath):
+            tracemalloc.start()
+            path = cls(d)
+            memory.append(tracemalloc.get_traced_memory()[0])
+            tracemalloc.stop()
+            del path
+        self.assertLess(memory[1] * 3, memory[0])
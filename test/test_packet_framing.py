@@ -0,0 +1,56 @@
+import random
+import unittest
+
+from PacketFraming import CRC_TABLE, PacketFramer, onewire_crc
+
+from helpers import new_device
+
+
+def random_payloads(count, seed=0):
+    r = random.Random(seed)
+    payloads = []
+    for _ in range(count):
+        length = r.randint(0, 30)
+        payloads.append(bytes(r.randint(0, 255) for _ in range(length)) + b'F' * (30 - length))
+    return payloads
+
+
+class TestPacketFraming(unittest.TestCase):
+
+    def test_crc(self):
+        self.assertEqual(onewire_crc(b'F' * 30), 0x50)
+        self.assertEqual(onewire_crc(b'\x00' * 30), 0x00)
+        self.assertEqual(onewire_crc(b'IBzzzS1P' + b'F' * 22), 0x7C)
+        self.assertEqual(onewire_crc(b'I' * 29 + b'C'), 0x42)
+
+    def test_crc_padding_tables(self):
+        for payload in random_payloads(2000):
+            crc = 0
+            for b in payload:
+                crc = CRC_TABLE[crc ^ b]
+            self.assertEqual(onewire_crc(payload), crc)
+
+    def test_frame(self):
+        framer = PacketFramer()
+        payload = b'IBzzzS1P' + b'F' * 22
+        frame = framer(payload)
+        self.assertEqual(bytes(frame), b'\x00' + payload + bytes([onewire_crc(payload)]))
+        self.assertIs(framer(b'F' * 30), frame)
+
+    def test_debug_signals_only_built_for_listeners(self):
+        device = new_device()
+        kernel = device.kernel
+        controller = device.pipe
+        controller.driver = type('Driver', (), {'write': lambda self, frame: None})()
+        payload = b'IBzzzS1P' + b'F' * 22
+        device.mock = False
+        controller.send_packet(payload)
+        kernel.process_queue()
+        self.assertNotIn(';pipe;packet', kernel.last_message)  # Only built once asked for.
+        self.assertEqual(kernel.last_signal(';pipe;packet'), (list(payload),))
+        received = []
+        device.listen('pipe;packet_text', received.append)
+        controller.send_packet(payload)
+        kernel.process_queue()
+        self.assertEqual(received, [payload])
+        self.assertIn(';pipe;packet', kernel.lazy_messages)
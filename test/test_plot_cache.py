@@ -0,0 +1,105 @@
+import unittest
+
+from Kernel import Kernel
+from svgelements import Arc, CubicBezier, Matrix, Path, PlotCache, QuadraticBezier, PLOT_CACHE, \
+    PLOT_CACHE_BUDGET
+
+
+def curves():
+    return [
+        CubicBezier((10.5, 20.25), (300.3, 5), (20, 400.7), (600.1, 300.9)),
+        QuadraticBezier((0.5, 0.2), (100.3, 5), (300.1, 300.9)),
+        Arc(start=(0, 0), end=(200, 200), center=(0, 200), prx=(0, 0), pry=(200, 200), sweep=1.5707963267948966),
+    ]
+
+
+class TestPlotCache(unittest.TestCase):
+
+    def setUp(self):
+        PLOT_CACHE.clear()
+
+    def tearDown(self):
+        PLOT_CACHE.set_budget(PLOT_CACHE_BUDGET)
+        PLOT_CACHE.clear()
+
+    def assertSamePlot(self, expected, plotted):
+        self.assertEqual(expected, plotted)
+        self.assertEqual([[type(v) for v in p] for p in expected], [[type(v) for v in p] for p in plotted])
+
+    def test_cached_plot_matches(self):
+        for curve in curves():
+            expected = list(curve._plot())
+            self.assertSamePlot(expected, list(curve.plot()))
+            self.assertSamePlot(expected, list(curve.plot()))
+        stats = PLOT_CACHE.stats()
+        self.assertEqual(3, stats['entries'])
+        self.assertEqual(3, stats['misses'])
+        self.assertEqual(3, stats['hits'])
+        self.assertGreater(stats['bytes'], 0)
+
+    def test_shared_between_copies(self):
+        path = Path()
+        for curve in curves():
+            path.append(curve)
+        list(path.plot())
+        list(Path(path).plot())
+        self.assertEqual(3, PLOT_CACHE.stats()['hits'])
+
+    def test_parsed_arc(self):
+        arc = Path("M0,0 A 30,20 15 0 1 160,40")[1]
+        self.assertSamePlot(list(arc._plot()), list(arc.plot()))
+        self.assertSamePlot(list(arc._plot()), list(arc.plot()))
+        self.assertEqual(1, PLOT_CACHE.stats()['hits'])
+
+    def test_transform_discards(self):
+        for curve in curves():
+            list(curve.plot())
+            entries = len(PLOT_CACHE)
+            curve *= Matrix("scale(0.5) translate(7, 3)")
+            self.assertEqual(entries - 1, len(PLOT_CACHE))
+            self.assertSamePlot(list(curve._plot()), list(curve.plot()))
+
+    def test_incomplete_plot_not_stored(self):
+        curve = curves()[0]
+        plot = curve.plot()
+        next(plot)
+        plot.close()
+        self.assertEqual(0, len(PLOT_CACHE))
+
+    def test_budget_eviction(self):
+        cache = PlotCache(budget=1 << 30)
+        cache.put('a', [(0, 0), (1, 1)])
+        size = cache.bytes
+        cache.budget = size * 2
+        cache.put('b', [(0, 0), (1, 1)])
+        self.assertIsNotNone(cache.get('a'))
+        cache.put('c', [(0, 0), (1, 1)])
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertEqual(1, cache.stats()['evictions'])
+        self.assertLessEqual(cache.bytes, cache.budget)
+        cache.put('d', [(float(i), float(i)) for i in range(100)])
+        self.assertIsNone(cache.get('d'))  # Larger than the budget.
+        cache.set_budget(size)
+        self.assertEqual(1, len(cache))
+        self.assertIsNotNone(cache.get('a'))
+
+    def test_kernel_budget(self):
+        kernel = Kernel()
+        for curve in curves():
+            list(curve.plot())
+        kernel.plot_cache_budget = 1
+        self.assertEqual(1, PLOT_CACHE.budget)
+        self.assertEqual(0, len(PLOT_CACHE))
+
+    def test_kernel_stats(self):
+        kernel = Kernel()
+        stats = []
+        kernel.listen('plot_cache', stats.append)
+        list(curves()[0].plot())
+        kernel.execute("Plot Cache Stats")
+        kernel.delegate_messages()
+        self.assertEqual(1, stats[0]['misses'])
+        self.assertEqual(PLOT_CACHE.budget, stats[0]['budget'])
+        kernel.execute("Plot Cache Clear")
+        self.assertEqual(0, len(PLOT_CACHE))
@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+import unittest
+
+from LaserCommandConstants import *
+from LaserOperation import CutOperation
+from svgelements import Path
+
+from helpers import new_device
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.device = new_device()
+        self.kernel = self.device.kernel
+        self.device.buffer_limit = False  # Nothing is sent, the controller thread is not started.
+        self.device.pipe.start = lambda: None
+
+    def spool(self, operation):
+        for e in operation.generate():
+            if isinstance(e, tuple):
+                self.device.spooler.execute(e[0], *e[1:])
+            else:
+                self.device.spooler.execute(e)
+
+    def test_profile_commands(self):
+        operation = CutOperation()
+        operation.append(Path("M100,100 h500 v500 h-500 z"))
+        self.device.execute("Profile Start")
+        self.spool(operation)
+        self.device.execute("Profile Stop")
+        self.spool(operation)  # Not profiled.
+        report = self.device.profiler.report()
+        functions = report['functions']
+        execute = functions['Spooler.execute']
+        command = functions['LhymicroInterpreter.command']
+        self.assertEqual(execute['count'], command['count'])
+        self.assertEqual(command['commands']['COMMAND_PLOT']['count'], 1)
+        self.assertEqual(sum(c['count'] for c in command['commands'].values()), command['count'])
+        self.assertGreaterEqual(command['max'], command['mean'])
+        self.assertEqual(functions['K40Controller.process_queue']['count'], 0)
+
+    def test_stop_restores_methods(self):
+        send_packet = self.device.pipe.send_packet = lambda packet: None
+        self.device.profiler.start()
+        self.assertIn('command', self.device.interpreter.__dict__)
+        self.device.profiler.stop()
+        self.assertNotIn('command', self.device.interpreter.__dict__)
+        self.assertNotIn('execute', self.device.spooler.__dict__)
+        self.assertIs(self.device.pipe.send_packet, send_packet)
+
+    def test_dump_json(self):
+        self.device.profiler.start()
+        self.device.spooler.execute(COMMAND_MODE_DEFAULT)
+        filename = os.path.join(tempfile.mkdtemp(), 'profile.json')
+        self.assertEqual(self.device.profiler.dump(filename), filename)
+        with open(filename) as f:
+            report = json.load(f)
+        self.device.profiler.stop()
+        self.assertEqual(report['functions']['Spooler.execute']['commands']['COMMAND_MODE_DEFAULT']['count'], 1)
+        self.kernel.process_queue()
+        self.assertEqual(self.kernel.last_signal(';profile')[0], report)
@@ -0,0 +1,311 @@
+import random
+import tracemalloc
+import unittest
+
+from Kernel import Pipe
+from LaserOperation import RasterOperation, RasterBands
+from OperationPreprocessor import OperationPreprocessor
+from RasterPlotter import BAND_PIXELS, RasterPlotter, NumpyRasterPlotter, BandedRasterPlotter, X_AXIS, Y_AXIS, TOP, BOTTOM, LEFT, RIGHT
+from svgelements import Matrix, SVGImage
+
+from helpers import new_device
+
+try:
+    import numpy
+    from PIL import Image
+except ImportError:
+    numpy = None
+    Image = None
+
+TRAVERSALS = (
+    X_AXIS | TOP | LEFT,
+    X_AXIS | TOP | RIGHT,
+    X_AXIS | BOTTOM | LEFT,
+    X_AXIS | BOTTOM | RIGHT,
+    Y_AXIS | TOP | LEFT,
+    Y_AXIS | TOP | RIGHT,
+    Y_AXIS | BOTTOM | LEFT,
+    Y_AXIS | BOTTOM | RIGHT,
+)
+
+
+class MockPipe(Pipe):
+    def __init__(self, device=None):
+        Pipe.__init__(self, device)
+        self.data = b''
+
+    def write(self, bytes_to_write):
+        self.data += bytes_to_write
+
+    def realtime_write(self, bytes_to_write):
+        self.data += bytes_to_write
+
+
+def random_image(mode, width, height, blank_rows=(), seed=0):
+    r = random.Random(seed)
+    image = Image.new("L", (width, height), 255)
+    pixels = image.load()
+    for y in range(height):
+        if y in blank_rows:
+            continue
+        x = r.randint(0, width - 1)
+        while x < width:
+            run = r.randint(1, max(1, width // 4))
+            value = r.choice((0, 0, 64, 255))
+            for i in range(x, min(width, x + run)):
+                pixels[i, y] = value
+            x += run
+    if mode == "RGBA":
+        image = image.convert("RGBA")
+        alpha = Image.new("L", image.size, 200)
+        image.putalpha(alpha)
+        return image
+    return image.convert(mode)
+
+
+def interpret(operation):
+    device = new_device(MockPipe)
+    for e in operation.generate():
+        if isinstance(e, tuple):
+            device.interpreter.command(e[0], *e[1:])
+        else:
+            device.interpreter.command(e)
+    return device.pipe.data
+
+
+def raster_plotter(image, traversal, vectorized=False, overscan=20):
+    width, height = image.size
+    if vectorized:
+        return NumpyRasterPlotter(RasterOperation.filtered_array(image), width, height,
+                                  traversal, 0, overscan, 100, 200, 2)
+    image_filter = lambda pixel: (255 - pixel) / 255.0
+    return RasterPlotter(image.load(), width, height, traversal, 0, overscan, 100, 200, 2, image_filter)
+
+
+def random_runs(r):
+    """Random plot() style events, each ending an orthogonal or diagonal run from the previous event."""
+    x = r.randint(-3, 3)
+    y = r.randint(-3, 3)
+    events = [(x, y, 0)]
+    for i in range(r.randint(0, 40)):
+        ux, uy = r.choice(((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, -1), (1, -1), (0, 0)))
+        n = r.randint(0, 12)
+        x += ux * n
+        y += uy * n
+        events.append((x, y, r.choice((0, 0, 1.0, 0.25, 0.5, 1.0 / 3.0))))
+    return events
+
+
+class TestRasterRuns(unittest.TestCase):
+
+    def setUp(self):
+        self.interpreter = new_device().interpreter
+        self.plots = []
+        self.interpreter.on_plot = lambda x, y, on: self.plots.append((x, y, on))
+
+    def group(self, generate, state):
+        interpreter = self.interpreter
+        interpreter.power, interpreter.pulse_total, interpreter.pulse_modulation, interpreter.group_modulation = state
+        self.plots = []
+        events = []
+        try:
+            for e in generate:
+                events.append(e)
+        except ValueError as error:
+            events.append(str(error))
+        return events, self.plots, interpreter.pulse_total
+
+    def test_group_runs_match(self):
+        interpreter = self.interpreter
+        for seed in range(2000):
+            r = random.Random(seed)
+            events = random_runs(r)
+            state = (r.choice((1000.0, 500.0, 333.3, 0.0, 1500.0)), r.choice((0.0, 500.0, 999.0, -200.0, 0.5)),
+                     r.random() < 0.8, r.random() < 0.5)
+            sx = r.randint(-3, 3)
+            sy = r.randint(-3, 3)
+            pixels = self.group(interpreter.group_plots(sx, sy, interpreter.ungroup_plots(events)), state)
+            runs = self.group(interpreter.group_runs(sx, sy, events), state)
+            self.assertEqual(pixels, runs, seed)
+
+    @unittest.skipIf(Image is None, "Pillow is required.")
+    def test_interpreter_bytes_match(self):
+        def rasterize(operation, group_modulation, per_pixel):
+            device = new_device(MockPipe)
+            interpreter = device.interpreter
+            interpreter.group_modulation = group_modulation
+            if per_pixel:
+                interpreter.group_runs = lambda sx, sy, g: interpreter.group_plots(sx, sy, interpreter.ungroup_plots(g))
+            for e in operation.generate():
+                interpreter.command(e[0], *e[1:])
+            return device.pipe.data
+
+        for direction in range(4):
+            image = random_image("L", 40, 30, blank_rows=(3, 4, 20), seed=direction)
+            for power in (1000.0, 700.0):
+                for step in (1, 2):
+                    operation = RasterOperation(SVGImage(image=image))
+                    operation.raster_direction = direction
+                    operation.raster_step = step
+                    operation.power = power
+                    for group_modulation in (False, True):
+                        self.assertEqual(rasterize(operation, group_modulation, True),
+                                         rasterize(operation, group_modulation, False))
+
+
+@unittest.skipIf(numpy is None, "NumPy and Pillow are required.")
+class TestNumpyRasterPlotter(unittest.TestCase):
+
+    def plotters(self, image, traversal):
+        return raster_plotter(image, traversal), raster_plotter(image, traversal, True)
+
+    def test_plot_events_match(self):
+        for traversal in TRAVERSALS:
+            for size in ((31, 17), (17, 31), (24, 24)):
+                image = random_image("L", size[0], size[1], blank_rows=(0, 5, 6, size[1] - 1), seed=traversal)
+                plotter, vector = self.plotters(image, traversal)
+                self.assertEqual(list(plotter.plot()), list(vector.plot()))
+                self.assertEqual(plotter.initial_position_in_scene(), vector.initial_position_in_scene())
+
+    def test_blank_image(self):
+        image = Image.new("L", (20, 10), 255)
+        plotter, vector = self.plotters(image, X_AXIS)
+        self.assertIsNone(vector.initial_x)
+        self.assertEqual(list(plotter.plot()), list(vector.plot()))
+
+    def test_filtered_array_matches_filters(self):
+        for mode in ("1", "L", "P", "RGB", "RGBA"):
+            image = random_image(mode, 13, 7)
+            operation = RasterOperation(SVGImage(image=image))
+            operation.raster_step = 1
+            vectorized = RasterOperation(operation)
+            vectorized.vectorized = True
+            self.assertEqual(interpret(operation), interpret(vectorized), mode)
+
+    def test_interpreter_bytes_match(self):
+        for direction in range(4):
+            image = random_image("L", 40, 30, blank_rows=(3, 4, 20), seed=direction)
+            operation = RasterOperation(SVGImage(image=image))
+            operation.raster_direction = direction
+            operation.raster_step = 2
+            vectorized = RasterOperation(operation)
+            vectorized.vectorized = True
+            self.assertEqual(interpret(operation), interpret(vectorized), direction)
+
+
+@unittest.skipIf(Image is None, "Pillow is required.")
+class TestRasterPlotterIndex(unittest.TestCase):
+
+    def test_index_is_lazy_and_scans_once(self):
+        image = Image.new("L", (50, 40), 255)
+        image.paste(0, (10, 30, 20, 32))
+        calls = [0]
+
+        def image_filter(pixel):
+            calls[0] += 1
+            return (255 - pixel) / 255.0
+
+        plotter = RasterPlotter(image.load(), 50, 40, X_AXIS, 0, 20, 0, 0, 1, image_filter)
+        self.assertEqual(plotter.initial_position(), (10, 30))
+        self.assertIsNone(plotter._column_first)
+        events = list(plotter.plot())
+        self.assertIsNone(plotter._column_first)
+        self.assertEqual(events[0], (10, 30, 0))
+        self.assertEqual(events[-1][1], 31)
+        # Blank rows are scanned once for the index, the two content rows once more for their runs.
+        self.assertLessEqual(calls[0], 50 * 40 + 2 * 50)
+
+    def test_jumps_over_blank_columns(self):
+        image = Image.new("L", (30, 10), 255)
+        image.paste(0, (25, 2, 27, 4))
+        plotter = RasterPlotter(image.load(), 30, 10, Y_AXIS, 0, 0, 0, 0, 1, lambda p: (255 - p) / 255.0)
+        self.assertEqual(plotter.initial_position(), (25, 2))
+        self.assertEqual(plotter.calculate_next_vertical_pixel(0, 1), (25, 2))
+        self.assertEqual(plotter.calculate_next_vertical_pixel(24, -1), (None, None))
+        self.assertEqual(plotter.calculate_next_horizontal_pixel(4, 1), (None, None))
+        self.assertEqual(plotter.calculate_next_horizontal_pixel(9, -1, True), (26, 3))
+
+
+@unittest.skipIf(numpy is None, "NumPy and Pillow are required.")
+class TestBandedRasterPlotter(unittest.TestCase):
+
+    def test_plot_events_match(self):
+        for traversal in TRAVERSALS:
+            image = random_image("L", 37, 29, blank_rows=(0, 6, 7, 28), seed=traversal)
+            array = RasterOperation.filtered_array(image)
+            full = NumpyRasterPlotter(array, 37, 29, traversal, 0, 20, 5, 7, 2)
+            banded = BandedRasterPlotter(lambda x0, y0, x1, y1: array[y0:y1, x0:x1], 37, 29,
+                                         traversal, 0, 20, 5, 7, 2, band_size=4)
+            self.assertEqual(list(full.plot()), list(banded.plot()), traversal)
+
+    def test_tiled_interpreter_bytes_match(self):
+        for direction in range(4):
+            image = random_image("L", 40, 30, blank_rows=(3, 4, 20), seed=direction)
+            operation = RasterOperation(SVGImage(image=image))
+            operation.raster_direction = direction
+            operation.raster_step = 1
+            tiled = RasterOperation(operation)
+            tiled.tiled = True
+            self.assertEqual(interpret(operation), interpret(tiled), direction)
+
+    def test_band_matches_actualized_image(self):
+        transforms = ("translate(30, 40) scale(3)", "translate(30, 40) rotate(30) scale(2.5)", "rotate(-17) scale(3, 2)")
+        for mode in ("L", "RGBA"):
+            for transform in transforms:
+                for step in (1, 2, 3):
+                    image = random_image(mode, 20, 10, seed=3)
+                    element = SVGImage(image=image)
+                    element.transform = Matrix(transform)
+                    bands = RasterBands(element, step)
+                    actual = SVGImage(image=image)
+                    actual.transform = Matrix(transform)
+                    OperationPreprocessor.make_actual(actual, step)
+                    self.assertEqual(actual.image.size, (bands.width, bands.height))
+                    self.assertAlmostEqual(actual.transform.value_trans_x(), bands.offset_x)
+                    self.assertAlmostEqual(actual.transform.value_trans_y(), bands.offset_y)
+                    whole = RasterOperation.filtered_array(actual.image)
+                    for y0 in range(0, bands.height, 7):
+                        y1 = min(bands.height, y0 + 7)
+                        # Inexact coefficients can round a resampled channel differently by one level, both the
+                        # color and the alpha of RGBA.
+                        difference = numpy.abs(bands(0, y0, bands.width, y1) - whole[y0:y1])
+                        self.assertLessEqual(difference.max(), 2.0 / 255.0 + 1e-9)
+
+    def test_band_background_is_off(self):
+        image = Image.new("L", (20, 10), 0)
+        element = SVGImage(image=image)
+        element.transform = Matrix("scale(3)")
+        for mode in ("1", "L", "RGB", "P"):
+            element.image = image.convert(mode)
+            bands = RasterBands(element, 2)
+            values = bands(0, 0, bands.width, bands.height)
+            # A black image has no crop box, only the 30x15 image burns, not the canvas around it.
+            self.assertAlmostEqual(30 * 15, values.sum(), delta=30 + 15, msg=mode)
+
+    def test_memory_high_water(self):
+        width, height = 6000, 4000
+        image = Image.new("L", (width, height), 255)
+        for y in range(0, height, 500):
+            image.paste(0, (y, y, y + 500, y + 3))
+        for transform in ("", "scale(2)"):
+            element = SVGImage(image=image)
+            element.transform = Matrix(transform)
+            operation = RasterOperation(element)
+            operation.raster_step = 1
+            operation.tiled = True
+            tracemalloc.start()
+            try:
+                events = 0
+                for e in operation.generate():
+                    if isinstance(e, tuple) and isinstance(e[1], BandedRasterPlotter):
+                        bands = e[1].bands
+                        for _ in e[1].plot():
+                            events += 1
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            self.assertGreater(events, 0)
+            # PIL images are not traced, the region images made for the bands are bounded by their size.
+            self.assertLessEqual(bands.largest_region, BAND_PIXELS)
+            # The NumPy arrays are traced, the full array of values would be 192MB to 768MB.
+            self.assertLess(peak, 64 * 1024 * 1024)
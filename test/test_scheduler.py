@@ -0,0 +1,139 @@
+import time
+import unittest
+
+from Kernel import Kernel, Scheduler, JOB_POOL, JOB_SKIP_IF_RUNNING
+
+
+def wait_for(condition, timeout=5.0):
+    """Waits until condition() is true rather than sleeping a fixed time, so loaded machines only take longer."""
+    end = time.time() + timeout
+    while not condition() and time.time() < end:
+        time.sleep(0.005)
+    return condition()
+
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.kernel = Kernel()
+        self.scheduler = Scheduler(self.kernel)
+        self.scheduler.start()
+
+    def tearDown(self):
+        self.scheduler.stop()
+        self.scheduler.join(5)
+        self.assertFalse(self.scheduler.is_alive())
+
+    def test_timing_accuracy(self):
+        times = []
+        start = time.time()
+        self.scheduler.add_job(lambda: times.append(time.time()), interval=0.05, times=10)
+        self.assertTrue(wait_for(lambda: len(times) == 10))
+        time.sleep(0.1)
+        self.assertEqual(len(times), 10)
+        # Each run is interval after the end of the previous, never early.
+        late = [b - a - 0.05 for a, b in zip([start] + times, times)]
+        self.assertGreater(min(late), -0.005)
+        self.assertLess(max(late), 0.2)
+
+    def test_times_and_args(self):
+        calls = []
+        self.scheduler.add_job(calls.append, args=5, interval=0, times=3)
+        self.scheduler.add_job(lambda a, b: calls.append(a + b), args=(1, 2), interval=0, times=1)
+        self.assertTrue(wait_for(lambda: len(self.scheduler.jobs) == 0))
+        self.assertEqual(sorted(calls), [3, 5, 5, 5])
+
+    def test_add_job_wakes_scheduler(self):
+        calls = []
+        self.scheduler.add_job(lambda: None, interval=60.0)
+        time.sleep(0.05)
+        t = time.time()
+        self.scheduler.add_job(lambda: calls.append(time.time()), interval=0.01, times=1)
+        self.assertTrue(wait_for(lambda: len(calls) == 1))
+        self.assertLess(calls[0] - t, 0.5)  # Not waiting out the 60 second job.
+
+    def test_cancel(self):
+        calls = []
+        job = self.scheduler.add_job(lambda: calls.append(1), interval=0.02)
+        self.assertTrue(wait_for(lambda: len(calls) > 0))
+        job.cancel()
+        time.sleep(0.05)  # A run already under way when cancelled may still finish.
+        count = len(calls)
+        time.sleep(0.1)
+        self.assertEqual(len(calls), count)
+        self.assertEqual(len(self.scheduler.jobs), 0)
+
+    def test_times_zero_stops_job(self):
+        calls = []
+        job = self.scheduler.add_job(lambda: calls.append(1), interval=0.02)
+        time.sleep(0.05)
+        job.times = 0
+        time.sleep(0.05)
+        count = len(calls)
+        time.sleep(0.1)
+        self.assertEqual(len(calls), count)
+
+    def test_pause_resume(self):
+        calls = []
+        self.scheduler.add_job(lambda: calls.append(1), interval=0.01)
+        self.scheduler.pause()
+        time.sleep(0.05)
+        count = len(calls)
+        time.sleep(0.1)
+        self.assertEqual(len(calls), count)
+        self.scheduler.resume()
+        self.assertTrue(wait_for(lambda: len(calls) > count))
+
+    def test_idle_cpu(self):
+        self.scheduler.add_job(lambda: None, interval=0.05)
+        cpu = time.process_time()
+        time.sleep(1.0)
+        cpu = time.process_time() - cpu
+        self.assertLess(cpu, 0.5)  # Busy polling would take most of the second.
+
+    def test_pool_job_does_not_delay_inline_jobs(self):
+        calls = []
+        self.scheduler.add_job(lambda: time.sleep(0.3), interval=0.01, times=1, execution=JOB_POOL)
+        time.sleep(0.02)
+        t = time.time()
+        self.scheduler.add_job(lambda: calls.append(time.time()), interval=0.01, times=1)
+        self.assertTrue(wait_for(lambda: len(calls) == 1))
+        self.assertLess(calls[0] - t, 0.25)  # Before the 0.3 second pool job ends.
+
+    def test_skip_if_running(self):
+        running = []
+        job = self.scheduler.add_job(lambda: (running.append(1), time.sleep(0.1)), interval=0.01,
+                                     execution=JOB_SKIP_IF_RUNNING)
+        time.sleep(0.35)
+        job.cancel()
+        self.assertLessEqual(len(running), 4)
+        self.assertGreater(job.skipped, 0)
+        self.assertGreater(job.overruns, 0)
+
+    def test_job_signal(self):
+        self.kernel.listen('job', lambda *args: None)
+        self.kernel.process_queue()
+
+        def slow_job():
+            time.sleep(0.02)
+
+        self.scheduler.add_job(slow_job, interval=0.01, times=1, execution=JOB_POOL)
+
+        def signalled():
+            self.kernel.process_queue()
+            return self.kernel.last_signal('job') is not None
+
+        self.assertTrue(wait_for(signalled))
+        (name, runtime, overruns, skipped), = self.kernel.last_signal('job')
+        self.assertEqual(name, 'slow_job')
+        self.assertGreaterEqual(runtime, 0.02)
+        self.assertEqual(overruns, 1)
+        self.assertEqual(skipped, 0)
+
+    def test_shutdown_stops_pool(self):
+        future = self.kernel.submit(time.sleep, 0.05)
+        executor = self.kernel.executor
+        self.kernel.shutdown()
+        self.assertTrue(future.done())
+        self.assertIsNone(self.kernel.executor)
+        self.assertRaises(RuntimeError, executor.submit, time.sleep, 0)
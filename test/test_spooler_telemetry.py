@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from Kernel import SPOOLER_HISTORY
+from LaserOperation import CutOperation
+from svgelements import Path
+
+from helpers import new_device
+from test_raster_plotter import MockPipe
+
+
+class TestSpoolerTelemetry(unittest.TestCase):
+
+    def setUp(self):
+        self.device = new_device(MockPipe)
+        self.kernel = self.device.kernel
+
+    def run_jobs(self, jobs):
+        spooler = self.device.spooler
+        spooler.send_job(jobs)
+        spooler.thread.join(10)
+        self.assertFalse(spooler.thread.is_alive())
+
+    def operation(self):
+        operation = CutOperation()
+        operation.append(Path("M100,100 h500 v500 h-500 z"))
+        return operation
+
+    def test_element_telemetry(self):
+        calls = []
+
+        def hold_condition(v):
+            calls.append(time.time())
+            return time.time() < calls[1] + 0.25 if len(calls) > 1 else False  # Holds the first element.
+
+        self.device.hold_condition = hold_condition
+        self.device.resume_condition = None
+
+        def slow():
+            time.sleep(0.1)
+            yield self.operation().generate
+
+        self.run_jobs([self.operation(), slow])
+        first, second = self.device.spooler.telemetry()
+        self.assertEqual(first['bytes'], len(self.device.pipe.data) - second['bytes'])
+        self.assertGreater(first['commands'], 0)
+        self.assertGreaterEqual(first['hold_time'], 0.2)
+        self.assertGreaterEqual(first['first_byte_time'], first['hold_time'])
+        self.assertGreaterEqual(first['total_time'], first['first_byte_time'])
+        self.assertEqual(second['bytes'], 0)
+        self.assertIsNone(second['first_byte_time'])
+        self.assertGreaterEqual(second['generate_time'], 0.1)
+        self.assertEqual(second['commands'], 1)
+
+        self.kernel.process_queue()
+        self.assertEqual(self.kernel.last_signal(';spooler;job')[0], second)
+
+    def test_history_is_bounded(self):
+        self.run_jobs([lambda: iter(())] * (SPOOLER_HISTORY + 5))
+        self.assertEqual(len(self.device.spooler.history), SPOOLER_HISTORY)
+
+    def test_dump(self):
+        self.run_jobs([self.operation()])
+        filename = os.path.join(tempfile.mkdtemp(), 'telemetry.json')
+        self.device.spooler.dump_telemetry(filename)
+        with open(filename) as f:
+            self.assertEqual(json.load(f), self.device.spooler.telemetry())
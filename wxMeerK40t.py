@@ -532,7 +532,7 @@ class MeerK40t(wx.Frame):
             device.listen('pipe;usb_status', self.on_usb_status)
             device.listen('pipe;thread', self.on_pipe_state)
             device.listen('spooler;thread', self.on_spooler_state)
-            device.listen('interpreter;position', self.update_position)
+            device.listen('interpreter;position', self.update_position, batch=1000)
             device.listen('interpreter;mode', self.on_interpreter_mode)
             device.listen('bed_size', self.bed_changed)
 
@@ -654,13 +654,14 @@ class MeerK40t(wx.Frame):
         self.guide_lines = None
         self.request_refresh()
 
-    def update_position(self, pos):
-        self.laserpath[0][self.laserpath_index][0] = pos[0]
-        self.laserpath[0][self.laserpath_index][1] = pos[1]
-        self.laserpath[1][self.laserpath_index][0] = pos[2]
-        self.laserpath[1][self.laserpath_index][1] = pos[3]
-        self.laserpath_index += 1
-        self.laserpath_index %= len(self.laserpath[0])
+    def update_position(self, messages):
+        for pos, in messages:
+            self.laserpath[0][self.laserpath_index][0] = pos[0]
+            self.laserpath[0][self.laserpath_index][1] = pos[1]
+            self.laserpath[1][self.laserpath_index][0] = pos[2]
+            self.laserpath[1][self.laserpath_index][1] = pos[3]
+            self.laserpath_index += 1
+            self.laserpath_index %= len(self.laserpath[0])
         self.request_refresh_for_animation()
 
     def space_changed(self, units):